@@ -1,8 +1,115 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import Competition, Participant, Match, ParticipantStats
 
 
-admin.site.register(Competition)
-admin.site.register(Participant)
-admin.site.register(Match)
-admin.site.register(ParticipantStats)
\ No newline at end of file
+def estimated_count(model, using):
+    """The database's row estimate of a table, None when it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif connection.vendor == 'sqlite':
+            # Filled in by ANALYZE, the first number of an index's stat is the table's row count.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered changelist with the database's estimate when the
+    table has more than settings.ADMIN_ESTIMATED_COUNT_MIN rows, instead of
+    an exact COUNT(*) over all of them. Filtered lists are counted exactly,
+    through the index of the filter.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > getattr(settings, 'ADMIN_ESTIMATED_COUNT_MIN', 100_000):
+                return estimate
+        return super().count
+
+
+class CompetitionIdFilter(admin.SimpleListFilter):
+    """Filter by a competition id typed in, rather than a choice of every competition."""
+    title = 'competition id'
+    parameter_name = 'competition_id'
+    template = 'admin/api/input_filter.html'
+    lookup = 'competition_id'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # The other filters of the changelist, kept by the form of the template.
+        self.hidden_params = [(key, value) for key in request.GET if key != self.parameter_name
+                              for value in request.GET.getlist(key)]
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(**{self.lookup: value})
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Defaults for tables with millions of rows: no full counts, no <select> of every related row."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_filter = [CompetitionIdFilter]
+
+
+@admin.register(Competition)
+class CompetitionAdmin(ScalableAdmin):
+    list_display = ('id', 'name', 'created_by', 'scoring', 'deferred_ratings', 'created_at')
+    list_select_related = ('created_by',)
+    raw_id_fields = ('created_by',)
+    list_filter = []
+
+
+@admin.register(Participant)
+class ParticipantAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'competition', 'elo_rating')
+    list_select_related = ('user', 'competition')
+    raw_id_fields = ('user', 'competition')
+
+
+@admin.register(Match)
+class MatchAdmin(ScalableAdmin):
+    list_display = ('id', 'competition', 'participant1', 'participant2', 'winner', 'played_at', 'rating_pending')
+    list_select_related = ('competition', 'participant1__user', 'participant1__competition',
+                           'participant2__user', 'participant2__competition')
+    raw_id_fields = ('competition', 'participant1', 'participant2')
+
+
+@admin.register(ParticipantStats)
+class ParticipantStatsAdmin(ScalableAdmin):
+    list_display = ('id', 'competition', 'matches_played', 'wins', 'losses', 'draws', 'win_rate', 'current_streak')
+    list_select_related = ('id__user', 'id__competition', 'competition')
+    raw_id_fields = ('id', 'competition')
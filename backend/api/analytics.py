@@ -0,0 +1,147 @@
+"""
+Rating distribution and rating change analytics of a competition.
+
+Ratings are integers with a few hundred distinct values even in the largest
+competitions, so the database groups them (through the (competition,
+elo_rating) index) and NumPy works on the compact (rating, count) arrays:
+the histogram, summary and tier cut-offs cost O(distinct ratings) rather
+than O(participants). Rating changes are grouped by week and change the same
+way, at most 2 * K_FACTOR + 1 values per week.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from api.archive import archived_matches
+from api.models import Match, Participant
+
+DEFAULT_TIERS = (1, 5, 10, 25, 50)  # top percent
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def summarize(values, counts):
+    """Summary of `values` (ascending) each repeated `counts` times; percentiles are nearest-rank."""
+    values, counts = np.asarray(values, dtype=np.int64), np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    summary = {'count': total}
+    if not total:
+        return dict(summary, mean=None, std=None, min=None, max=None, **{f'p{q}': None for q in PERCENTILES})
+
+    mean = float(np.dot(values, counts)) / total
+    cumulative = np.cumsum(counts)
+    summary.update(
+        mean=round(mean, 2),
+        std=round(float(np.sqrt(np.dot((values - mean) ** 2, counts) / total)), 2),
+        min=int(values[0]),
+        max=int(values[-1]),
+    )
+    for q in PERCENTILES:
+        rank = max(1, int(np.ceil(q / 100 * total)))
+        summary[f'p{q}'] = int(values[np.searchsorted(cumulative, rank)])
+    return summary
+
+
+def histogram(values, counts, bucket_size):
+    """Counts of `bucket_size` wide buckets from the lowest to the highest value, empty buckets included."""
+    if not len(values):
+        return []
+    values = np.asarray(values, dtype=np.int64)
+    low = values[0] // bucket_size * bucket_size
+    buckets = np.bincount((values - low) // bucket_size, weights=counts).astype(np.int64)
+    return [
+        {'min_rating': int(low + i * bucket_size), 'max_rating': int(low + (i + 1) * bucket_size - 1), 'count': int(count)}
+        for i, count in enumerate(buckets)
+    ]
+
+
+def tier_cutoffs(values, counts, tiers):
+    """
+    The lowest rating of the top `percent`% of participants for each tier,
+    and how many participants are rated at least that (ties may add more).
+    """
+    values, counts = np.asarray(values, dtype=np.int64), np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if not total:
+        return [{'top_percent': percent, 'min_rating': None, 'participants': 0} for percent in tiers]
+    cumulative = np.cumsum(counts)
+    cutoffs = []
+    for percent in tiers:
+        rank = max(1, int(np.ceil(percent / 100 * total)))  # from the top
+        index = int(np.searchsorted(cumulative, total - rank + 1))
+        cutoffs.append({
+            'top_percent': percent,
+            'min_rating': int(values[index]),
+            'participants': int(total - cumulative[index] + counts[index]),
+        })
+    return cutoffs
+
+
+def rating_distribution(competition_id, bucket_size=50, tiers=DEFAULT_TIERS):
+    rows = list(
+        Participant.objects.filter(competition_id=competition_id)
+        .values('elo_rating').annotate(count=Count('pk')).order_by('elo_rating')
+        .values_list('elo_rating', 'count')
+    )
+    values = np.array([rating for rating, _ in rows], dtype=np.int64)
+    counts = np.array([count for _, count in rows], dtype=np.int64)
+    return {
+        'summary': summarize(values, counts),
+        'bucket_size': bucket_size,
+        'histogram': histogram(values, counts, bucket_size),
+        'tiers': tier_cutoffs(values, counts, tiers),
+    }
+
+
+def week_start(value):
+    """The Monday of the week of a datetime, in the current time zone like TruncWeek."""
+    day = timezone.localtime(value).date()
+    return day - timedelta(days=day.weekday())
+
+
+def first_week(weeks):
+    """The Monday starting the last `weeks` weeks, this one included."""
+    return week_start(timezone.now()) - timedelta(weeks=weeks - 1)
+
+
+def rating_changes_by_week(competition_id, weeks=12):
+    """Distribution of the Elo changes of both sides of the matches of the last `weeks` weeks."""
+    start = first_week(weeks)
+    bounds = [timezone.make_aware(datetime.combine(start + timedelta(weeks=i), time.min)) for i in range(weeks + 1)]
+    since = bounds[0]
+    changes = [Counter() for _ in range(weeks)]
+
+    # The week number is a CASE over the week boundaries rather than a date
+    # truncation function, which SQLite runs in Python for every row.
+    week = Case(*[When(played_at__lt=bound, then=Value(i)) for i, bound in enumerate(bounds[1:])],
+                output_field=IntegerField())
+    matches = (Match.objects.filter(competition_id=competition_id, rating_pending=False,
+                                    played_at__gte=since, played_at__lt=bounds[-1])
+               .exclude(winner="not_played").annotate(week=week).order_by())
+    # One scan for both sides: the two changes of a match mirror each other, so the pairs stay few.
+    rows = (matches.values('week', 'participant1_elo_change', 'participant2_elo_change').annotate(count=Count('pk'))
+            .values_list('week', 'participant1_elo_change', 'participant2_elo_change', 'count'))
+    for i, change1, change2, count in rows:
+        changes[i][change1] += count
+        changes[i][change2] += count
+
+    for match in archived_matches(competition_id, since=since):
+        played_at = datetime.fromisoformat(match['played_at'])
+        if played_at >= since:
+            i = (week_start(played_at) - start).days // 7
+            if i < weeks:
+                changes[i][match['participant1_elo_change']] += 1
+                changes[i][match['participant2_elo_change']] += 1
+
+    result = []
+    for i, counter in enumerate(changes):
+        values = sorted(counter)
+        counts = [counter[value] for value in values]
+        result.append({
+            'week': start + timedelta(weeks=i),
+            'summary': summarize(values, counts),
+            'histogram': [{'change': value, 'count': count} for value, count in zip(values, counts)],
+        })
+    return result
@@ -0,0 +1,133 @@
+"""
+Cold storage for played matches.
+
+Archiving moves played matches out of the hot `Match` table into
+`MatchArchive` rows, each holding a chunk of matches as zlib compressed,
+column oriented JSON plus per-participant aggregates of the chunk. Ratings,
+ParticipantStats and Standings are maintained incrementally, so they stay
+correct without the archived rows.
+"""
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import router, transaction
+
+from api import sharding
+from api.caching import bump_competition_version
+from api.listing import MATCH_FIELDS, datetime_formatter, participant_rows
+from api.models import Match, MatchArchive, Participant
+
+# Columns kept for every archived match; `competition` and `rating_pending`
+# are implied by the archive row.
+ARCHIVED_COLUMNS = tuple(name for name in MATCH_FIELDS if name not in ('competition', 'rating_pending'))
+
+
+def archive_matches(competition_id, before=None, after=None, chunk_size=10_000):
+    """Archive the played matches of a competition (optionally within a date range). Returns the count."""
+    with sharding.competition_context(competition_id):
+        return _archive_matches(competition_id, before, after, chunk_size)
+
+
+def _archive_matches(competition_id, before, after, chunk_size):
+    matches = Match.objects.filter(competition_id=competition_id, rating_pending=False).exclude(winner="not_played")
+    if before is not None:
+        matches = matches.filter(played_at__lt=before)
+    if after is not None:
+        matches = matches.filter(played_at__gte=after)
+
+    archived = 0
+    while True:
+        with transaction.atomic(using=router.db_for_write(Match)):
+            rows = list(matches.order_by('played_at', 'id').values_list(*ARCHIVED_COLUMNS)[:chunk_size])
+            if not rows:
+                break
+            columns = dict(zip(ARCHIVED_COLUMNS, map(list, zip(*rows))))
+            played_at = columns['played_at']
+            columns['played_at'] = [value.isoformat() for value in played_at]
+
+            MatchArchive.objects.create(
+                competition_id=competition_id,
+                first_played_at=played_at[0],
+                last_played_at=played_at[-1],
+                match_count=len(rows),
+                data=zlib.compress(json.dumps(columns, separators=(',', ':')).encode()),
+                summary=_summarize(columns),
+            )
+            # The archived matches have no pending rating work (nothing else
+            # references them), so skip the collector and its per-row signals.
+            ids = columns['id']
+            Match.objects.filter(pk__in=ids)._raw_delete(router.db_for_write(Match))
+            bump_competition_version(competition_id)
+        archived += len(rows)
+    return archived
+
+
+def _summarize(columns):
+    """Per participant aggregates (rating checkpoint) of an archived chunk."""
+    summary = defaultdict(lambda: {'matches': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'elo_change': 0})
+    results = {"1": ('wins', 'losses'), "2": ('losses', 'wins'), "draw": ('draws', 'draws')}
+    for participant1, participant2, winner, change1, change2 in zip(
+            columns['participant1'], columns['participant2'], columns['winner'],
+            columns['participant1_elo_change'], columns['participant2_elo_change']):
+        for participant, result, change in ((participant1, results[winner][0], change1),
+                                            (participant2, results[winner][1], change2)):
+            summary[participant]['matches'] += 1
+            summary[participant][result] += 1
+            summary[participant]['elo_change'] += change
+    return {str(participant): totals for participant, totals in summary.items()}
+
+
+def renumber_participants(archive, new_ids):
+    """Rewrite the participant ids stored inside an archive row (old id -> new id)."""
+    columns = json.loads(zlib.decompress(archive.data))
+    for name in ('participant1', 'participant2'):
+        columns[name] = [new_ids.get(participant, participant) for participant in columns[name]]
+    archive.data = zlib.compress(json.dumps(columns, separators=(',', ':')).encode())
+    archive.summary = {str(new_ids.get(int(key), key)): totals for key, totals in archive.summary.items()}
+
+
+def archived_matches(competition_id, since=None):
+    """
+    Yield archived matches of a competition as dicts of ARCHIVED_COLUMNS,
+    oldest first. `since` skips the chunks that end before it (matches of
+    the first chunk it returns may still be older).
+    """
+    archives = MatchArchive.objects.filter(competition_id=competition_id).order_by('first_played_at', 'id')
+    if since is not None:
+        archives = archives.filter(last_played_at__gte=since)
+    for data in archives.values_list('data', flat=True).iterator():
+        columns = json.loads(zlib.decompress(data))
+        for values in zip(*(columns[name] for name in ARCHIVED_COLUMNS)):
+            yield dict(zip(ARCHIVED_COLUMNS, values))
+
+
+def archived_match_rows(competition_id, fields=MATCH_FIELDS, expand=()):
+    """Archived matches in the same format as listing.match_rows()."""
+    to_representation = datetime_formatter()
+    rows = []
+    for match in archived_matches(competition_id):
+        match['played_at'] = to_representation(datetime.fromisoformat(match['played_at']))
+        match['competition'] = competition_id
+        match['rating_pending'] = False
+        rows.append({name: match[name] for name in fields})
+
+    sides = [name for name in expand if '.' not in name]
+    if rows and sides:
+        # The participants aren't part of the archive, look them all up at once.
+        ids = {row[side] for row in rows for side in sides}
+        participants = {
+            participant['id']: participant
+            for participant in participant_rows(Participant.objects.filter(id__in=ids), expand=('user',))
+        }
+        for row in rows:
+            for side in sides:
+                participant = participants.get(row[side])
+                if participant is None:
+                    # Deleted after the match was archived, keep the bare id.
+                    continue
+                if side + '.user' not in expand:
+                    participant = {**participant, 'user': participant['user']['id']}
+                row[side] = participant
+    return rows
@@ -0,0 +1,52 @@
+"""
+Per-competition cache versioning.
+
+Every competition has a version number stored in the cache which is bumped
+(after commit) whenever one of its matches or participants changes. Derived
+results are cached under a key containing the version, so a change makes all
+of them stale at once without having to track the individual keys.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from api import sharding
+
+
+def _version_key(competition_id):
+    return f'competition-version:{competition_id}'
+
+
+def competition_version(competition_id):
+    key = _version_key(competition_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from a fresh, time based value so that an evicted version can
+        # never bring back results cached under an older one.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_competition_version(competition_id, using=None):
+    def bump():
+        try:
+            cache.incr(_version_key(competition_id))
+        except ValueError:
+            cache.add(_version_key(competition_id), time.time_ns(), timeout=None)
+
+    # Bump once the transaction on the competition's shard commits.
+    transaction.on_commit(bump, using=using or sharding.current_shard())
+
+
+def cached_for_competition(competition_id, name, params, compute, timeout=None):
+    """Return compute(), cached until the competition next changes."""
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+    key = f'{name}:{competition_id}:{competition_version(competition_id)}:{digest}'
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, timeout=timeout if timeout is not None else 24 * 60 * 60)
+    return result
@@ -0,0 +1,126 @@
+"""
+Per-competition change log for delta syncs.
+
+Creates, updates and deletes of matches and participants (including rating
+changes) are appended to ChangeLogEntry with a sequence number taken from
+Competition.change_seq. The counter is bumped with an UPDATE in the writing
+transaction, which locks the competition row until commit, so the entries of
+a competition become visible in sequence order and a client reading
+`/changes/?since=<seq>` never skips one.
+
+Writes made inside `collect()` (Match.save, the rating worker) are coalesced
+to one entry per object and stored with a single counter bump and insert.
+Fixtures created in bulk (schedules, pairing rounds) are logged as one
+`schedule` entry telling clients to re-fetch the matches of that period.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.listing import MATCH_DATETIME_FIELDS, MATCH_FIELDS, PARTICIPANT_FIELDS, datetime_formatter
+
+_batch = contextvars.ContextVar('change_batch', default=None)
+
+
+def _snapshot(instance, fields, datetime_fields=()):
+    to_representation = datetime_formatter()
+    data = {}
+    for name in fields:
+        value = getattr(instance, instance._meta.get_field(name).attname)
+        data[name] = to_representation(value) if name in datetime_fields else value
+    return data
+
+
+def match_data(match):
+    """A match in the format of the match list."""
+    return _snapshot(match, MATCH_FIELDS, MATCH_DATETIME_FIELDS)
+
+
+def participant_data(participant):
+    """A participant in the format of the participant list."""
+    return _snapshot(participant, PARTICIPANT_FIELDS)
+
+
+def record(competition_id, kind, object_id, action, data=None):
+    batch = _batch.get()
+    if batch is None or batch['competition_id'] != competition_id:
+        write(competition_id, [(kind, object_id, action, data)])
+        return
+
+    key = (kind, object_id)
+    previous = batch['entries'].get(key)
+    if previous is not None and previous[0] == 'create':
+        if action == 'delete':
+            # Created and deleted again before anyone could see it.
+            del batch['entries'][key]
+            return
+        action = 'create'
+    batch['entries'][key] = (action, data)
+
+
+def write(competition_id, entries):
+    """Append (kind, object_id, action, data) entries to the log of a competition."""
+    from api.models import ChangeLogEntry, Competition
+
+    if not entries:
+        return
+    with transaction.atomic(using=router.db_for_write(ChangeLogEntry)):
+        competition = Competition._base_manager.filter(pk=competition_id)
+        competition.update(change_seq=F('change_seq') + len(entries))
+        last = competition.values_list('change_seq', flat=True).first()
+        if last is None:
+            # The competition itself is being deleted.
+            return
+        _insert(competition_id, last - len(entries) + 1, entries)
+
+
+def _insert(competition_id, first_seq, entries, chunk_size=1000):
+    # A schedule logs tens of thousands of entries at once, so they are written in chunks.
+    from api.models import ChangeLogEntry
+
+    created_at = timezone.now()
+    ChangeLogEntry.objects.bulk_create(
+        [
+            ChangeLogEntry(competition_id=competition_id, seq=seq, kind=kind, object_id=object_id, action=action,
+                           data=data, created_at=created_at)
+            for seq, (kind, object_id, action, data) in enumerate(entries, start=first_seq)
+        ],
+        batch_size=chunk_size
+    )
+
+
+def write_rows(competition_id, kind, rows, action='create'):
+    """Log many rows (dicts with an 'id', as produced by api.listing) at once."""
+    write(competition_id, [(kind, row['id'], action, row) for row in rows])
+
+
+def write_schedule(competition_id, matches, first_played_at, last_played_at):
+    """Log `matches` not_played matches created at once between the two times as a single entry."""
+    to_representation = datetime_formatter()
+    data = {
+        'matches': matches,
+        'first_played_at': to_representation(first_played_at),
+        'last_played_at': to_representation(last_played_at),
+    }
+    write(competition_id, [('schedule', competition_id, 'create', data)])
+
+
+@contextmanager
+def collect(competition_id):
+    """Coalesce the changes recorded inside the block and write them once at the end."""
+    outer = _batch.get()
+    if outer is not None and outer['competition_id'] == competition_id:
+        yield
+        return
+
+    batch = {'competition_id': competition_id, 'entries': {}}
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    write(competition_id, [(kind, object_id, action, data)
+                           for (kind, object_id), (action, data) in batch['entries'].items()])
@@ -0,0 +1,92 @@
+"""
+Inactivity rating decay.
+
+Participants of a competition with `decay_after_days` set who have played
+before but have no match in the last `decay_after_days` days lose
+`decay_points` of rating, never going below `decay_floor`, each time the
+decay_ratings command runs, at most once per `decay_after_days` of
+inactivity. Activity is read from Match with indexed EXISTS subqueries, and
+the ratings of a competition are lowered with one set-based UPDATE.
+
+Every run is a RatingDecay with one RatingDecayEntry per participant holding
+the points taken, so the decay shows in the competition's decay history and
+change feed, and revert() gives the points back the same way.
+"""
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.db.models import Exists, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from api import changes, profiles
+from api.caching import bump_competition_version
+from api.listing import participant_rows
+from api.models import Match, Participant, RatingDecay, RatingDecayEntry
+
+
+def inactive_participants(competition, now):
+    """Participants due for decay at `now`, with the points they lose annotated as `amount`."""
+    inactive_since = now - timedelta(days=competition.decay_after_days)
+    recent = Match.objects.filter(played_at__gte=inactive_since).exclude(winner="not_played")
+    recently_decayed = RatingDecayEntry.objects.filter(participant=OuterRef('pk'),
+                                                       decay__created_at__gte=inactive_since)
+    return (
+        Participant.objects.filter(competition=competition, elo_rating__gt=competition.decay_floor)
+        # Played at some point (archived matches included), but not since `inactive_since`.
+        .filter(participantstats__last_played_at__isnull=False)
+        .exclude(Exists(recent.filter(participant1=OuterRef('pk'))))
+        .exclude(Exists(recent.filter(participant2=OuterRef('pk'))))
+        .exclude(Exists(recently_decayed))
+        .annotate(amount=Least(Value(competition.decay_points),
+                               F('elo_rating') - competition.decay_floor, output_field=IntegerField()))
+    ), inactive_since
+
+
+def decay_competition(competition, now=None):
+    """Apply the decay of one competition. Returns the RatingDecay, None when nobody was due."""
+    now = now or timezone.now()
+    with transaction.atomic(using=router.db_for_write(Participant)):
+        participants, inactive_since = inactive_participants(competition, now)
+        due = list(participants.select_for_update(of=('self',)).values_list('id', 'amount'))
+        if not due:
+            return None
+
+        decay = RatingDecay.objects.create(competition=competition, created_at=now, inactive_since=inactive_since,
+                                           points=competition.decay_points, floor=competition.decay_floor,
+                                           participant_count=len(due))
+        RatingDecayEntry.objects.bulk_create(
+            [RatingDecayEntry(decay=decay, participant_id=participant_id, competition=competition, amount=amount)
+             for participant_id, amount in due],
+            batch_size=1000
+        )
+        # The rows are locked, so this takes exactly the recorded amounts.
+        decayed = Participant.objects.filter(rating_decays__decay=decay)
+        decayed.update(elo_rating=Greatest(F('elo_rating') - decay.points, Value(decay.floor)))
+        _after_rating_change(competition.id, decay)
+    return decay
+
+
+def revert(decay):
+    """Give the participants of a decay their points back."""
+    with transaction.atomic(using=router.db_for_write(Participant)):
+        decay = RatingDecay.objects.select_for_update().get(pk=decay.pk)
+        if decay.reverted_at is not None:
+            return decay
+        amount = RatingDecayEntry.objects.filter(decay=decay, participant=OuterRef('pk')).values('amount')[:1]
+        Participant.objects.filter(rating_decays__decay=decay).update(
+            elo_rating=F('elo_rating') + Subquery(amount, output_field=IntegerField())
+        )
+        decay.reverted_at = timezone.now()
+        decay.save(update_fields=['reverted_at'])
+        _after_rating_change(decay.competition_id, decay)
+    return decay
+
+
+def _after_rating_change(competition_id, decay):
+    # The work the participant post_save signals do for a single rating change.
+    participants = Participant.objects.filter(rating_decays__decay=decay)
+    changes.write_rows(competition_id, 'participant', participant_rows(participants), action='update')
+    profiles.refresh(competition_id, participants.values('id'))
+    bump_competition_version(competition_id)
+
@@ -0,0 +1,52 @@
+"""
+Elo rating maths, free of any database access.
+"""
+import numpy as np
+
+K_FACTOR = 32
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def actual_scores(winner):
+    if winner == "1":
+        return 1, 0
+    elif winner == "2":
+        return 0, 1
+    return 0.5, 0.5  # In case of a draw
+
+
+def rating_changes(rating1, rating2, winner, k=K_FACTOR):
+    """Elo changes of both participants for a result ("1", "2" or "draw")."""
+    expected1 = expected_score(rating1, rating2)
+    expected2 = expected_score(rating2, rating1)
+    actual1, actual2 = actual_scores(winner)
+    return round(k * (actual1 - expected1)), round(k * (actual2 - expected2))
+
+
+def expected_matrix(ratings):
+    """matrix[i][j] is the expected score of participant i against participant j."""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    return 1.0 / (1.0 + 10.0 ** ((ratings[np.newaxis, :] - ratings[:, np.newaxis]) / 400.0))
+
+
+def preview_results(ratings, results, k=K_FACTOR):
+    """
+    Apply hypothetical results in order to a copy of `ratings` ({id: rating}).
+
+    `results` is a list of (participant1, participant2, winner) tuples.
+    Returns (expected score of participant1, change1, change2) for every
+    result, and the final ratings.
+    """
+    ratings = dict(ratings)
+    previews = []
+    for participant1, participant2, winner in results:
+        expected1 = expected_score(ratings[participant1], ratings[participant2])
+        change1, change2 = rating_changes(ratings[participant1], ratings[participant2], winner, k)
+        ratings[participant1] += change1
+        ratings[participant2] += change2
+        previews.append((expected1, change1, change2))
+    return previews, ratings
+
@@ -0,0 +1,98 @@
+"""
+Streak, form and win rate metrics of ParticipantStats.
+
+The metrics only depend on a participant's results in played order, so a new
+result at the end of the history (the common case) is folded into the stored
+state by advance() in O(1). Corrected results, resets and results entered
+out of order change the history behind the current state; those participants
+are recomputed by replaying their results, as the rebuild_form command does
+for whole competitions.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+FORM_LENGTH = 5
+RESULTS = {"1": ("W", "L"), "2": ("L", "W"), "draw": ("D", "D")}
+METRIC_FIELDS = ['current_streak', 'longest_win_streak', 'form', 'last_played_at']
+
+WIN_RATE = Case(
+    When(matches_played=0, then=Value(0.0)),
+    default=Cast(F('wins'), FloatField()) / F('matches_played'),
+    output_field=FloatField(),
+)
+
+
+def advance(current_streak, longest_win_streak, form, result):
+    """The metrics after one more result ("W", "D" or "L")."""
+    if result == "W":
+        current_streak = current_streak + 1 if current_streak > 0 else 1
+        longest_win_streak = max(longest_win_streak, current_streak)
+    elif result == "L":
+        current_streak = current_streak - 1 if current_streak < 0 else -1
+    else:
+        current_streak = 0
+    return current_streak, longest_win_streak, (result + form)[:FORM_LENGTH]
+
+
+def replay(results):
+    """The metrics of a history of results, oldest first."""
+    state = (0, 0, '')
+    for result in results:
+        state = advance(*state, result)
+    return state
+
+
+def results_by_participant(competition_id, participant_ids=None, include=None):
+    """
+    (played_at, match id, result) of every played match per participant,
+    oldest first, archived matches included. Results still waiting for the
+    rating worker are left out, except for the match `include` being applied.
+    """
+    from api.archive import archived_matches
+    from api.models import Match
+
+    wanted = set(participant_ids) if participant_ids is not None else None
+    results = defaultdict(list)
+
+    def add(participant1, participant2, winner, played_at, match_id):
+        for participant_id, result in zip((participant1, participant2), RESULTS[winner]):
+            if wanted is None or participant_id in wanted:
+                results[participant_id].append((played_at, match_id, result))
+
+    for match in archived_matches(competition_id):
+        add(match['participant1'], match['participant2'], match['winner'],
+            datetime.fromisoformat(match['played_at']), match['id'])
+
+    matches = Match.objects.filter(competition_id=competition_id).exclude(winner="not_played")
+    matches = matches.filter(Q(rating_pending=False) | Q(pk=include))
+    if wanted is not None:
+        matches = matches.filter(Q(participant1_id__in=wanted) | Q(participant2_id__in=wanted))
+    for row in matches.values_list('participant1_id', 'participant2_id', 'winner', 'played_at', 'id').iterator():
+        add(*row)
+
+    for history in results.values():
+        history.sort()
+    return results
+
+
+def recompute(competition_id, participant_ids=None, include=None):
+    """Replay the metrics of some (default: all) participants of a competition. Returns the number updated."""
+    from api.models import ParticipantStats
+
+    stats = ParticipantStats.objects.filter(competition_id=competition_id)
+    if participant_ids is not None:
+        stats = stats.filter(id__in=participant_ids)
+    # Locking the rows first makes results saved meanwhile wait, and then extend the replayed state.
+    rows = list(stats.select_for_update().only('id', *METRIC_FIELDS))
+    results = results_by_participant(competition_id, participant_ids, include)
+
+    for row in rows:
+        history = results.get(row.pk, [])
+        row.current_streak, row.longest_win_streak, row.form = replay(result for _, _, result in history)
+        row.last_played_at = history[-1][0] if history else None
+    ParticipantStats.objects.bulk_update(rows, METRIC_FIELDS, batch_size=1000)
+    stats.update(win_rate=WIN_RATE)
+    return len(rows)
@@ -0,0 +1,91 @@
+"""
+Idempotency-Key support for create and update endpoints.
+
+A client sends the same `Idempotency-Key` header with every retry of a
+write. The first request runs normally and its response is stored in the
+cache (settings.IDEMPOTENCY_KEY_TTL, default one day); retries get the stored
+response back without running the view again, so e.g. a retried match POST
+never applies Elo twice. Keys are scoped to the authenticated user. The
+write throttles let requests with a stored response through, so a replay
+costs no tokens.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+METHODS = ('POST', 'PUT', 'PATCH')
+# How long a request holds its key while it runs, longer than any request should take.
+LOCK_TIMEOUT = 60
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.content_type or ''):
+        digest.update(part.encode() + b'\0')
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _cache_key(request, key):
+    return f'idempotency:{request.user.pk}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def has_stored_response(request):
+    """Whether the Idempotency-Key of the request already has a stored response to answer it with."""
+    key = request.headers.get(HEADER)
+    if request.method not in METHODS or not key or len(key) > 255:
+        return False
+    return cache.get(_cache_key(request, key)) is not None
+
+
+def idempotent(view):
+    """Replay the stored response of a write retried with the same Idempotency-Key."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method not in METHODS or not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'detail': f'{HEADER} must be at most 255 characters.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Read the body before the view parses it, it can't be read afterwards.
+        fingerprint = _fingerprint(request)
+        cache_key = _cache_key(request, key)
+        lock_key = cache_key + ':lock'
+        token = uuid.uuid4().hex
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            if not cache.add(lock_key, token, timeout=LOCK_TIMEOUT):
+                # The original request may have finished in the meantime.
+                stored = cache.get(cache_key)
+                if stored is None:
+                    return Response({'detail': f'A request with this {HEADER} is still in progress.'},
+                                    status=status.HTTP_409_CONFLICT)
+        if stored is not None:
+            stored_fingerprint, status_code, data = stored
+            if stored_fingerprint != fingerprint:
+                return Response({'detail': f'{HEADER} was already used for a different request.'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            response = view(request, *args, **kwargs)
+            # Server errors are not stored so that the client can retry them.
+            if response.status_code < 500:
+                cache.set(cache_key, (fingerprint, response.status_code, response.data),
+                          timeout=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+            return response
+        finally:
+            # The lock may have expired and been taken by a retry, which keeps it.
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    return wrapper
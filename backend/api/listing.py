@@ -0,0 +1,124 @@
+"""
+Read-only fast path for the list endpoints.
+
+Rows are pulled with `values_list()` and turned into plain dicts instead of
+going through `ModelSerializer(many=True)`. The output has exactly the same
+keys, order and value formatting as the matching serializers.
+
+Clients can ask for less or more: `?fields=id,winner` selects only those
+columns, and `?expand=participant1.user` inlines related objects by
+selecting their columns through the same (joined) query.
+"""
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+# Same (readable) fields, in the same order, as MatchSerializer and ParticipantSerializer.
+MATCH_FIELDS = ('id', 'competition', 'participant1', 'participant2', 'winner', 'played_at',
+                'participant1_elo_change', 'participant2_elo_change', 'rating_pending',
+                'participant1_score', 'participant2_score')
+MATCH_DATETIME_FIELDS = ('played_at',)
+
+PARTICIPANT_FIELDS = ('id', 'user', 'competition', 'elo_rating')
+USER_FIELDS = ('id', 'username')
+
+# Related objects that ?expand= can inline: name -> (lookup prefix, fields).
+MATCH_EXPANSIONS = {
+    'participant1': ('participant1__', PARTICIPANT_FIELDS),
+    'participant1.user': ('participant1__user__', USER_FIELDS),
+    'participant2': ('participant2__', PARTICIPANT_FIELDS),
+    'participant2.user': ('participant2__user__', USER_FIELDS),
+}
+PARTICIPANT_EXPANSIONS = {
+    'user': ('user__', USER_FIELDS),
+}
+
+_datetime_field = serializers.DateTimeField()
+
+
+def datetime_formatter():
+    """
+    Return a function formatting datetimes like `serializers.DateTimeField`.
+
+    The common configuration (ISO 8601 output with time zone support) gets a
+    specialised version, everything else goes through the field itself.
+    """
+    output_format = api_settings.DATETIME_FORMAT
+    if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+        return _datetime_field.to_representation
+
+    current_timezone = timezone.get_current_timezone()
+
+    def to_representation(value):
+        if not value:
+            return None
+        if timezone.is_naive(value):
+            return _datetime_field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return to_representation
+
+
+def parse_fields(value, fields):
+    """The requested subset of `fields` (in their usual order), all of them when `value` is empty."""
+    if not value:
+        return fields
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(fields)
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+    return tuple(name for name in fields if name in requested)
+
+
+def parse_expand(value, expansions, fields):
+    """The requested expansions (parents included, parents first) of fields that are selected."""
+    if not value:
+        return ()
+    requested = set()
+    for name in (name.strip() for name in value.split(',') if name.strip()):
+        if name not in expansions:
+            raise ValidationError({'expand': f"Cannot expand '{name}', expected one of {', '.join(expansions)}."})
+        parts = name.split('.')
+        requested.update('.'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+    return tuple(name for name in expansions if name in requested and name.split('.')[0] in fields)
+
+
+def serialize_rows(queryset, fields, datetime_fields=(), expand=(), expansions=None):
+    positions = [fields.index(name) for name in datetime_fields if name in fields]
+    to_representation = datetime_formatter()
+
+    columns = list(fields)
+    nested = []
+    for name in expand:
+        prefix, related_fields = expansions[name]
+        nested.append((name.split('.'), related_fields, len(columns)))
+        columns += [prefix + field for field in related_fields]
+
+    data = []
+    for row in queryset.values_list(*columns):
+        if positions:
+            row = list(row)
+            for position in positions:
+                row[position] = to_representation(row[position])
+        item = dict(zip(fields, row))
+        # Parents come first, so the object a nested one goes into already exists.
+        for path, related_fields, start in nested:
+            parent = item
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = dict(zip(related_fields, row[start:start + len(related_fields)]))
+        data.append(item)
+    return data
+
+
+def match_rows(queryset, fields=MATCH_FIELDS, expand=()):
+    return serialize_rows(queryset, fields, MATCH_DATETIME_FIELDS, expand, MATCH_EXPANSIONS)
+
+
+def participant_rows(queryset, fields=PARTICIPANT_FIELDS, expand=()):
+    return serialize_rows(queryset, fields, (), expand, PARTICIPANT_EXPANSIONS)
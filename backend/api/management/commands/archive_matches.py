@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from api import sharding
+from api.archive import archive_matches
+from api.models import Competition
+
+
+class Command(BaseCommand):
+    help = "Move played matches into compressed archive storage, keeping the hot Match table small."
+
+    def add_arguments(self, parser):
+        parser.add_argument('competitions', nargs='*', type=int, help="Competition ids (default: all).")
+        parser.add_argument('--before', help="Only archive matches played before this datetime.")
+        parser.add_argument('--after', help="Only archive matches played at or after this datetime.")
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Matches per archive row.")
+
+    def parse(self, value):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def handle(self, *args, **options):
+        before, after = self.parse(options['before']), self.parse(options['after'])
+        competition_ids = options['competitions'] or [
+            competition_id
+            for shard in sharding.shard_aliases()
+            for competition_id in Competition.objects.using(shard).values_list('id', flat=True)
+        ]
+        for competition_id in competition_ids:
+            archived = archive_matches(competition_id, before, after, options['chunk_size'])
+            if archived:
+                self.stdout.write(f"Competition {competition_id}: archived {archived} match(es)")
@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import views
+from api.models import Competition, Participant
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Time POST /schedule/ for a league and POST /pairings/ for an open event and fail when either takes "
+            "longer than its budget. Seed data is created inside a transaction that is rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=200, help="Participants of the round-robin league.")
+        parser.add_argument('--open', type=int, default=50_000, help="Participants of the open event to pair.")
+        parser.add_argument('--schedule-budget', type=float, default=1.0, help="Seconds allowed for the schedule.")
+        parser.add_argument('--pairings-budget', type=float, default=2.0, help="Seconds allowed for the pairings.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.owner = User.objects.create(username='__benchmark_owner__')
+                timings = [
+                    self.run('schedule', views.create_schedule, options['league'], options['schedule_budget']),
+                    self.run('pairings', views.list_create_pairings, options['open'], options['pairings_budget']),
+                ]
+                raise Rollback
+        except Rollback:
+            pass
+
+        over = [f"{label} took {elapsed:.2f}s (budget {budget:.2f}s)" for label, elapsed, budget in timings
+                if elapsed > budget]
+        if over:
+            raise CommandError("; ".join(over))
+
+    def run(self, name, view, size, budget):
+        competition = Competition.objects.create(name=f'benchmark {name}', created_by=self.owner)
+        users = User.objects.bulk_create(
+            [User(username=f'__benchmark_{name}_{i}__') for i in range(size)], batch_size=5000
+        )
+        Participant.objects.bulk_create(
+            [Participant(user=user, competition=competition) for user in users], batch_size=5000
+        )
+
+        request = APIRequestFactory().post(f'/api/competitions/{competition.id}/{name}/', {}, format='json')
+        force_authenticate(request, user=self.owner)
+        start = time.perf_counter()
+        response = view(request, competition_id=competition.id)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 201:
+            raise CommandError(f"{name} answered {response.status_code}: {response.data}")
+
+        label = f"{name:<9} x{size}"
+        self.stdout.write(f"{label}: {elapsed * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)")
+        return label, elapsed, budget
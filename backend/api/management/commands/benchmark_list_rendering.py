@@ -0,0 +1,88 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.listing import match_rows, participant_rows
+from api.models import Competition, Match, Participant, ParticipantStats
+from api.renderers import FastJSONRenderer
+from api.serializers import MatchSerializer, ParticipantSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Compare ModelSerializer(many=True) + JSONRenderer against the fast list path. "
+            "Seed data is created inside a transaction that is rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('sizes', nargs='*', type=int, default=[10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N timings.")
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self.run(size, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, size, repeat):
+        owner = User.objects.create(username='__benchmark_owner__')
+        competition = Competition.objects.create(name='benchmark', created_by=owner)
+
+        users = User.objects.bulk_create(
+            [User(username=f'__benchmark_{i}__') for i in range(size)], batch_size=5000
+        )
+        participants = Participant.objects.bulk_create(
+            [Participant(user=user, competition=competition) for user in users], batch_size=5000
+        )
+        ParticipantStats.objects.bulk_create(
+            [ParticipantStats(id=participant, competition=competition) for participant in participants],
+            batch_size=5000
+        )
+        played_at = timezone.now()
+        Match.objects.bulk_create(
+            [Match(competition=competition, participant1=participants[i], participant2=participants[(i + 1) % size],
+                   played_at=played_at, winner="1")
+             for i in range(size)],
+            batch_size=5000
+        )
+
+        matches = Match.objects.filter(competition=competition)
+        self.compare(
+            f"matches      x{size}", repeat,
+            lambda: JSONRenderer().render(MatchSerializer(matches, many=True).data),
+            lambda: FastJSONRenderer().render(match_rows(matches)),
+        )
+        participants = Participant.objects.filter(competition=competition)
+        self.compare(
+            f"participants x{size}", repeat,
+            lambda: JSONRenderer().render(ParticipantSerializer(participants, many=True).data),
+            lambda: FastJSONRenderer().render(participant_rows(participants)),
+        )
+
+    def compare(self, label, repeat, slow, fast):
+        slow_time, slow_output = self.best_of(repeat, slow)
+        fast_time, fast_output = self.best_of(repeat, fast)
+        if slow_output != fast_output:
+            raise CommandError(f"{label}: fast path output differs from the serializer output")
+        self.stdout.write(
+            f"{label}: serializer {slow_time * 1000:8.1f} ms  fast {fast_time * 1000:8.1f} ms  "
+            f"speed-up x{slow_time / fast_time:.1f}"
+        )
+
+    def best_of(self, repeat, func):
+        best, output = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.models import Competition, Match, Participant
+from api.query_plans import SUPPORTED_VENDORS, check_plan, hot_queries
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the hot queries of the views and Match.save and fail on full table scans or "
+            "temporary B-tree sorts over more than --max-rows estimated rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database (or shard) to check.")
+        parser.add_argument('--max-rows', type=int, default=1000,
+                            help="Scans and sorts of up to this many estimated rows are accepted.")
+        parser.add_argument('--competition', type=int,
+                            help="Competition to take the sample rows from (default: the one of the newest match).")
+        parser.add_argument('--analyze', action='store_true',
+                            help="Run ANALYZE first so the planner (and the SQLite estimates) see current statistics.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        if connection.vendor not in SUPPORTED_VENDORS:
+            self.stderr.write(f"Plans of {connection.vendor} are printed but not checked.")
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        competition_id = options['competition'] or (
+            Match.objects.using(using).order_by('-id').values_list('competition_id', flat=True).first()
+            or Competition.all_objects.using(using).values_list('id', flat=True).first()
+        )
+        if competition_id is None:
+            raise CommandError("No competition to take sample rows from, create one or pass --competition.")
+        participant_ids = list(Participant.objects.using(using).filter(competition_id=competition_id)
+                               .order_by('id').values_list('id', flat=True)[:2]) or [0]
+        user = get_user_model().objects.using(using).order_by('id').first() or get_user_model()(pk=0)
+        match_id = (Match.objects.using(using).filter(competition_id=competition_id)
+                    .values_list('id', flat=True).first() or 0)
+
+        failed = 0
+        for name, queryset in hot_queries(competition_id, participant_ids, user, match_id):
+            plan, problems = check_plan(queryset.using(using), options['max_rows'])
+            if problems:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"ok   {name}")
+            if problems or options['verbosity'] > 1:
+                self.stdout.write('\n'.join(f"       {line}" for line in plan.splitlines()))
+        if failed:
+            raise CommandError(f"{failed} hot quer{'y' if failed == 1 else 'ies'} lost their index.")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import decay, sharding
+from api.models import Competition, RatingDecay
+
+
+class Command(BaseCommand):
+    help = ("Lower the rating of participants who haven't played for `decay_after_days` days in the competitions "
+            "with inactivity decay enabled. Run it periodically, e.g. daily.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('competitions', nargs='*', type=int, help="Competition ids (default: all with decay enabled).")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many participants are due.")
+        parser.add_argument('--revert', type=int, metavar='DECAY_ID',
+                            help="Give back the points of a decay of the (single) given competition.")
+
+    def handle(self, *args, **options):
+        if options['revert'] is not None:
+            if len(options['competitions']) != 1:
+                raise CommandError("--revert needs the id of the decay's competition.")
+            competition_id = options['competitions'][0]
+            with sharding.competition_context(competition_id):
+                try:
+                    event = RatingDecay.objects.get(pk=options['revert'], competition_id=competition_id)
+                except RatingDecay.DoesNotExist:
+                    raise CommandError(f"Decay {options['revert']} of competition {competition_id} not found.")
+                if event.reverted_at is not None:
+                    raise CommandError(f"Decay {event.id} was already reverted at {event.reverted_at}.")
+                decay.revert(event)
+            self.stdout.write(f"Competition {competition_id}: reverted decay {event.id} "
+                              f"({event.participant_count} participant(s))")
+            return
+
+        competition_ids = options['competitions'] or [
+            competition_id
+            for shard in sharding.shard_aliases()
+            for competition_id in Competition.objects.using(shard).filter(decay_after_days__gt=0)
+            .values_list('id', flat=True)
+        ]
+        for competition_id in competition_ids:
+            with sharding.competition_context(competition_id):
+                competition = Competition.objects.filter(pk=competition_id).first()
+                if competition is None or not competition.decay_after_days:
+                    self.stderr.write(f"Competition {competition_id}: not found or decay not enabled")
+                    continue
+                if options['dry_run']:
+                    participants, _ = decay.inactive_participants(competition, timezone.now())
+                    self.stdout.write(f"Competition {competition_id}: {participants.count()} participant(s) due")
+                    continue
+                event = decay.decay_competition(competition)
+            if event is None:
+                self.stdout.write(f"Competition {competition_id}: nobody due")
+            else:
+                self.stdout.write(f"Competition {competition_id}: decay {event.id} lowered "
+                                  f"{event.participant_count} participant(s) by up to {event.points}")
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema of this code version into settings.SCHEMA_FILE (run once per deploy)."
+
+    def handle(self, *args, **options):
+        path = getattr(settings, 'SCHEMA_FILE', None)
+        if not path:
+            raise CommandError("Set SCHEMA_FILE to the path the schema should be written to.")
+        version = schema.code_version()
+        schema.write(path, version, schema.generate())
+        self.stdout.write(f"Wrote the schema of version {version} to {path}")
@@ -0,0 +1,131 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from api import sharding
+from api.archive import renumber_participants
+from api.purge import delete_rows
+from api.models import ChangeLogEntry, Competition, CompetitionShard, Match, MatchArchive, Participant
+
+
+class Command(BaseCommand):
+    help = ("Move a competition to another shard. Reads keep being served from the old shard while it is "
+            "copied; writes to the competition are refused with 503 until the move completes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('competition', type=int)
+        parser.add_argument('shard', help="Target database alias, one of settings.COMPETITION_SHARDS.")
+        parser.add_argument('--renumber', action='store_true',
+                            help="Let the target shard assign new participant/match ids when the current ones are taken there.")
+        parser.add_argument('--grace', type=float, default=None,
+                            help="Seconds to wait for in-flight writes after the competition is marked as moving, "
+                                 "at least (and by default) the placement cache TTL so every worker sees the move.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        competition_id, target = options['competition'], options['shard']
+        if target not in sharding.shards():
+            raise CommandError(f"{target} is not one of settings.COMPETITION_SHARDS")
+
+        placement, _ = CompetitionShard.objects.get_or_create(pk=competition_id, defaults={'shard': DEFAULT_DB_ALIAS})
+        source = placement.shard
+        if source == target:
+            raise CommandError(f"Competition {competition_id} is already on {target}")
+        grace = sharding.placement_ttl() if options['grace'] is None else options['grace']
+        if grace < sharding.placement_ttl():
+            raise CommandError(f"--grace must be at least the placement cache TTL ({sharding.placement_ttl()}s)")
+        if not Competition._base_manager.using(source).filter(pk=competition_id).exists():
+            raise CommandError(f"Competition {competition_id} not found on {source}")
+
+        self.set_moving(placement, True)
+        try:
+            time.sleep(grace)
+            with transaction.atomic(using=target):
+                copied = self.copy(competition_id, source, target, options['renumber'], options['batch_size'])
+            placement.shard = target
+            self.set_moving(placement, False)
+        except BaseException:
+            self.set_moving(placement, False)
+            raise
+
+        # Chunked raw deletes like purge_competitions: no collector, no per-row signals.
+        delete_rows(competition_id, source, options['batch_size'])
+        self.stdout.write(f"Moved competition {competition_id} from {source} to {target} ({copied} rows)")
+
+    def set_moving(self, placement, moving):
+        placement.moving = moving
+        placement.save()
+        sharding.forget_placement(placement.pk)
+
+    def copy(self, competition_id, source, target, renumber, batch_size):
+        # old id -> new id of every renumbered row, per model
+        new_ids = {}
+        copied = 0
+        # The change log refers to matches and participants by plain ids, copy it last so they can be renumbered.
+        models = sorted(sharding.sharded_models_in_dependency_order(), key=lambda model: model is ChangeLogEntry)
+        for model in models:
+            rows = sharding.competition_rows(model, competition_id).using(source).order_by('pk')
+            # Competition ids are global, and rows keyed by a participant follow its new id.
+            renumbered = renumber and model is not Competition and not model._meta.pk.is_relation
+            if not renumber:
+                self.check_free(model, rows, target)
+
+            mapping = new_ids.setdefault(model, {})
+            last_pk = None
+            while True:
+                batch = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+                objects = list(batch[:batch_size])
+                if not objects:
+                    break
+                last_pk = objects[-1].pk
+                old_pks = [obj.pk for obj in objects]
+
+                if renumber:
+                    for obj in objects:
+                        self.remap(obj, new_ids)
+                        if renumbered:
+                            obj.pk = None
+                model._base_manager.using(target).bulk_create(objects)
+                mapping.update(zip(old_pks, (obj.pk for obj in objects)))
+                copied += len(objects)
+
+        if not renumber:
+            # Rows were inserted with explicit ids, so move the target's sequences past them.
+            connection = connections[target]
+            sql = connection.ops.sequence_reset_sql(no_style(), sharding.sharded_models_in_dependency_order())
+            with connection.cursor() as cursor:
+                for statement in sql:
+                    cursor.execute(statement)
+        return copied
+
+    def check_free(self, model, rows, target):
+        # The ids come from another database, so they are compared in chunks rather than a subquery.
+        pks = list(rows.values_list('pk', flat=True))
+        for start in range(0, len(pks), 1000):
+            taken = model._base_manager.using(target).filter(pk__in=pks[start:start + 1000])
+            if taken.exists():
+                raise CommandError(
+                    f"{model.__name__} ids of this competition are already used on the target shard, "
+                    f"use --renumber to assign new ones"
+                )
+
+    def remap(self, obj, new_ids):
+        for field in obj._meta.concrete_fields:
+            if field.is_relation and field.related_model in new_ids:
+                value = getattr(obj, field.attname)
+                if value is not None:
+                    setattr(obj, field.attname, new_ids[field.related_model].get(value, value))
+
+        if isinstance(obj, MatchArchive):
+            renumber_participants(obj, new_ids[Participant])
+        elif isinstance(obj, ChangeLogEntry):
+            participants = new_ids[Participant]
+            objects = participants if obj.kind == 'participant' else new_ids[Match]
+            obj.object_id = objects.get(obj.object_id, obj.object_id)
+            if obj.data:
+                obj.data['id'] = obj.object_id
+                for name in ('participant1', 'participant2'):
+                    if name in obj.data:
+                        obj.data[name] = participants.get(obj.data[name], obj.data[name])
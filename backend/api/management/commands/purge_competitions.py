@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.purge import purge
+
+
+class Command(BaseCommand):
+    help = "Remove the rows of deleted competitions in chunks, in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Rows deleted per transaction.")
+        parser.add_argument('--interval', type=float, default=10.0, help="Seconds to sleep when nothing is deleted.")
+        parser.add_argument('--once', action='store_true', help="Purge the deleted competitions once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = purge(chunk_size=options['chunk_size'])
+            if deleted:
+                self.stdout.write(f"Deleted {deleted} row(s) of deleted competitions")
+            if options['once']:
+                return
+            if not deleted:
+                time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rating_queue import drain
+
+
+class Command(BaseCommand):
+    help = "Apply queued match results to ratings and stats (competitions with deferred ratings)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Competitions processed in parallel.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Tasks applied per transaction.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = drain(workers=options['workers'], batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Applied {processed} rating task(s)")
+            if options['once']:
+                return
+            if not processed:
+                time.sleep(options['interval'])
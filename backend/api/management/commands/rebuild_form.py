@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from api import form, profiles, sharding
+from api.models import Competition, ParticipantStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the streak, form and win rate of every participant from the match history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('competitions', nargs='*', type=int, help="Competition ids (default: all).")
+
+    def handle(self, *args, **options):
+        competition_ids = options['competitions'] or [
+            competition_id
+            for shard in sharding.shard_aliases()
+            for competition_id in Competition.objects.using(shard).values_list('id', flat=True)
+        ]
+        for competition_id in competition_ids:
+            with sharding.competition_context(competition_id), \
+                    transaction.atomic(using=router.db_for_write(ParticipantStats)):
+                updated = form.recompute(competition_id)
+                profiles.refresh(competition_id)
+            self.stdout.write(f"Competition {competition_id}: rebuilt {updated} participant(s)")
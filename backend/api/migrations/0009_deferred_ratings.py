@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_match_participant1_elo_change_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='deferred_ratings',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='rating_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='RatingTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_winner', models.CharField(choices=[('1', '1'), ('2', '2'), ('draw', 'Draw'), ('not_played', 'Not Played')], max_length=20)),
+                ('winner', models.CharField(choices=[('1', '1'), ('2', '2'), ('draw', 'Draw'), ('not_played', 'Not Played')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_tasks', to='api.competition')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_tasks', to='api.match')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['competition', 'id'], name='api_ratingt_competi_e361d2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_deferred_ratings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['competition', 'played_at'], name='api_match_competi_192d43_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['competition', '-elo_rating'], name='api_partici_competi_dfe329_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_standings(apps, schema_editor):
+    Participant = apps.get_model('api', 'Participant')
+    Match = apps.get_model('api', 'Match')
+    Standing = apps.get_model('api', 'Standing')
+    alias = schema_editor.connection.alias
+
+    standings = {
+        participant_id: Standing(participant_id=participant_id, competition_id=competition_id)
+        for participant_id, competition_id in Participant.objects.using(alias).values_list('id', 'competition_id')
+    }
+    results = {"1": ("wins", "losses"), "2": ("losses", "wins"), "draw": ("draws", "draws")}
+    for participant1, participant2, winner in Match.objects.using(alias).exclude(winner="not_played").values_list(
+            'participant1_id', 'participant2_id', 'winner'):
+        for participant_id, column in zip((participant1, participant2), results[winner]):
+            standing = standings[participant_id]
+            standing.played += 1
+            setattr(standing, column, getattr(standing, column) + 1)
+
+    for standing in standings.values():
+        standing.points = standing.wins * 3 + standing.draws
+    Standing.objects.using(alias).bulk_create(standings.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_competition_summary_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='points_draw',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='points_loss',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='points_win',
+            field=models.IntegerField(default=3),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='scoring',
+            field=models.CharField(choices=[('elo', 'Elo'), ('points', 'Points')], default='elo', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='tiebreakers',
+            field=models.CharField(default='head_to_head,score_difference,wins', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='participant1_score',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='participant2_score',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Standing',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='standing', serialize=False, to='api.participant')),
+                ('points', models.IntegerField(default=0)),
+                ('played', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('draws', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('score_for', models.IntegerField(default=0)),
+                ('score_against', models.IntegerField(default=0)),
+                ('score_difference', models.IntegerField(default=0)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='api.competition')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['competition', '-points', '-score_difference', '-wins'], name='api_standin_competi_8119bc_idx')],
+            },
+        ),
+        migrations.RunPython(create_standings, migrations.RunPython.noop),
+    ]
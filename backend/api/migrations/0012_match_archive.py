@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_points_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_played_at', models.DateTimeField()),
+                ('last_played_at', models.DateTimeField()),
+                ('match_count', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('summary', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_archives', to='api.competition')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['competition', 'first_played_at'], name='api_matchar_competi_5ce5d4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_match_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompetitionShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.CharField(max_length=100)),
+                ('moving', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
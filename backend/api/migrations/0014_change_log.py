@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_competition_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('match', 'Match'), ('participant', 'Participant')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=20)),
+                ('data', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='api.competition')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('competition', 'seq'), name='unique_change_seq')],
+            },
+        ),
+    ]
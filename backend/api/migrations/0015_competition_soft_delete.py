@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='purge_total',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='purged_rows',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
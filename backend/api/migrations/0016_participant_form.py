@@ -0,0 +1,78 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast
+
+
+def fill_competition_and_win_rate(apps, schema_editor):
+    # Streaks and form need the archived matches too, `manage.py rebuild_form` fills them in.
+    Participant = apps.get_model('api', 'Participant')
+    ParticipantStats = apps.get_model('api', 'ParticipantStats')
+    ParticipantStats.objects.using(schema_editor.connection.alias).update(
+        competition_id=Subquery(Participant.objects.filter(pk=OuterRef('id_id')).values('competition_id')[:1]),
+        win_rate=Case(
+            When(matches_played=0, then=Value(0.0)),
+            default=Cast(F('wins'), FloatField()) / F('matches_played'),
+            output_field=FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_competition_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participantstats',
+            name='competition',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='participant_stats', to='api.competition'),
+        ),
+        migrations.AddField(
+            model_name='participantstats',
+            name='current_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participantstats',
+            name='form',
+            field=models.CharField(blank=True, default='', max_length=5),
+        ),
+        migrations.AddField(
+            model_name='participantstats',
+            name='last_played_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='participantstats',
+            name='longest_win_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='participantstats',
+            name='win_rate',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_competition_and_win_rate, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='participantstats',
+            name='competition',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participant_stats', to='api.competition'),
+        ),
+        migrations.AddIndex(
+            model_name='participantstats',
+            index=models.Index(fields=['competition', '-win_rate'], name='api_partici_competi_6f9de0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participantstats',
+            index=models.Index(fields=['competition', '-current_streak'], name='api_partici_competi_b55b4b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participantstats',
+            index=models.Index(fields=['competition', '-longest_win_streak'], name='api_partici_competi_3f5f4a_idx'),
+        ),
+    ]
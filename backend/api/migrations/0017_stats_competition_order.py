@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_participant_form'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participantstats',
+            index=models.Index(fields=['competition', 'id'], name='api_partici_competi_c5f183_idx'),
+        ),
+    ]
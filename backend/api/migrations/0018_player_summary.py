@@ -0,0 +1,72 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_summaries(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Participant = apps.get_model('api', 'Participant')
+    ParticipantStats = apps.get_model('api', 'ParticipantStats')
+    PlayerSummary = apps.get_model('api', 'PlayerSummary')
+    Standing = apps.get_model('api', 'Standing')
+
+    batch = []
+    for participant_id, user_id, competition_id in Participant.objects.using(using).values_list(
+            'id', 'user_id', 'competition_id').iterator(chunk_size=5000):
+        batch.append(PlayerSummary(participant_id=participant_id, user_id=user_id, competition_id=competition_id))
+        if len(batch) == 5000:
+            PlayerSummary.objects.using(using).bulk_create(batch)
+            batch = []
+    PlayerSummary.objects.using(using).bulk_create(batch)
+
+    # Same copy as api.profiles.refresh, with the historical models.
+    # Participants created without stats or a standing keep the summary defaults.
+    def copy(queryset, name):
+        field = PlayerSummary._meta.get_field(name)
+        return Coalesce(Subquery(queryset.values(name)[:1]), Value(field.get_default()), output_field=field)
+
+    stats = ParticipantStats.objects.using(using).filter(pk=OuterRef('participant_id'))
+    values = {name: copy(stats, name) for name in (
+        'matches_played', 'wins', 'draws', 'losses', 'win_rate', 'current_streak', 'longest_win_streak', 'form',
+        'last_played_at')}
+    values['elo_rating'] = copy(Participant.objects.filter(pk=OuterRef('participant_id')), 'elo_rating')
+    values['points'] = copy(Standing.objects.filter(participant_id=OuterRef('participant_id')), 'points')
+    PlayerSummary.objects.using(using).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_stats_competition_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerSummary',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.participant')),
+                ('elo_rating', models.IntegerField(default=1200)),
+                ('points', models.IntegerField(default=0)),
+                ('matches_played', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('draws', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('win_rate', models.FloatField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_win_streak', models.IntegerField(default=0)),
+                ('form', models.CharField(blank=True, default='', max_length=5)),
+                ('last_played_at', models.DateTimeField(blank=True, null=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_summaries', to='api.competition')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'competition'], name='api_players_user_id_cb5498_idx')],
+            },
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
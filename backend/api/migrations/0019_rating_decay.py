@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_player_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='decay_after_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='decay_floor',
+            field=models.IntegerField(default=1200),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='decay_points',
+            field=models.PositiveIntegerField(default=25),
+        ),
+        migrations.CreateModel(
+            name='RatingDecay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('inactive_since', models.DateTimeField()),
+                ('points', models.IntegerField()),
+                ('floor', models.IntegerField()),
+                ('participant_count', models.IntegerField(default=0)),
+                ('reverted_at', models.DateTimeField(blank=True, null=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_decays', to='api.competition')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RatingDecayEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_decay_entries', to='api.competition')),
+                ('decay', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='api.ratingdecay')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_decays', to='api.participant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ratingdecay',
+            index=models.Index(fields=['competition', '-created_at'], name='api_ratingd_competi_7593b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingdecayentry',
+            index=models.Index(fields=['participant', 'decay'], name='api_ratingd_partici_a74fa9_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_rating_decay'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='byes',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_participant_byes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelogentry',
+            name='kind',
+            field=models.CharField(choices=[('match', 'Match'), ('participant', 'Participant'), ('schedule', 'Schedule')], max_length=20),
+        ),
+    ]
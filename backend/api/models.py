@@ -1,15 +1,87 @@
 import django.contrib.auth
 import django.contrib.auth.models
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 import django.contrib
 from django.db.models import F
+from django.utils import timezone
+from api import changes, elo, form, profiles, sharding
+
+class CompetitionManager(models.Manager):
+    def get_queryset(self):
+        # Deleted competitions are hidden everywhere while purge_competitions removes their rows.
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 # Create your models here.
 class Competition(models.Model):
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(django.contrib.auth.models.User, on_delete=models.CASCADE, related_name='competitions')
+    # When enabled, results are committed straight away and the rating/stats
+    # work is queued for the rating_worker management command.
+    deferred_ratings = models.BooleanField(default=False)
+
+    # Classic points table settings. Standings are kept up to date in both
+    # modes; `scoring` decides which one ranks the competition.
+    ScoringChoices = models.TextChoices("ScoringChoices", ["elo", "points"])
+    scoring = models.CharField(max_length=20, choices=ScoringChoices.choices, default="elo")
+    points_win = models.IntegerField(default=3)
+    points_draw = models.IntegerField(default=1)
+    points_loss = models.IntegerField(default=0)
+    TIEBREAKERS = ["head_to_head", "score_difference", "score_for", "wins"]
+    tiebreakers = models.CharField(max_length=100, default="head_to_head,score_difference,wins")
+    # Inactivity decay, applied by the decay_ratings command (api/decay.py): participants without a
+    # match for `decay_after_days` lose `decay_points`, never going below `decay_floor`.
+    decay_after_days = models.PositiveIntegerField(null=True, blank=True)
+    decay_points = models.PositiveIntegerField(default=25)
+    decay_floor = models.IntegerField(default=1200)
+    # Sequence number of the last ChangeLogEntry, see api/changes.py.
+    change_seq = models.BigIntegerField(default=0)
+    # Set by DELETE; the rows are then removed in chunks by purge_competitions (api/purge.py).
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    purge_total = models.BigIntegerField(null=True, blank=True)
+    purged_rows = models.BigIntegerField(default=0)
+
+    # Columns only ever changed with UPDATE statements, never written back by save().
+    DATABASE_MAINTAINED_FIELDS = ('change_seq', 'deleted_at', 'purge_total', 'purged_rows')
+
+    objects = CompetitionManager()
+    all_objects = models.Manager()
+
+    def tiebreaker_list(self):
+        return [name for name in self.tiebreakers.split(',') if name]
+
+    def recompute_points(self):
+        # Points are derived from the stored results, so new point values are
+        # applied with a single set-based UPDATE.
+        self.standings.update(
+            points=F('wins') * self.points_win + F('draws') * self.points_draw + F('losses') * self.points_loss
+        )
+        profiles.refresh(self.id)
+
+    def points_for(self, result):
+        return {"win": self.points_win, "draw": self.points_draw, "loss": self.points_loss}[result]
+
+    def defers_ratings(self):
+        # Keep queueing while older results are still pending so that rating
+        # updates are always applied in the order they were recorded.
+        return self.deferred_ratings or self.rating_tasks.exists()
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and sharding.enabled():
+            # The global lookup table hands out competition ids, so ids stay
+            # unique across shards and the router can find the new row.
+            placement = CompetitionShard.objects.create(shard=sharding.choose_shard())
+            self.pk = placement.pk
+            kwargs.update(force_insert=True, using=placement.shard)
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            # Don't overwrite the database maintained columns with stale values.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DATABASE_MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -18,9 +90,11 @@ class Participant(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='participations')
     competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='participants')
     elo_rating = models.IntegerField(default=1200)
+    byes = models.IntegerField(default=0)  # rounds sat out, see api/pairing.py
 
     class Meta:
         unique_together = ('user', 'competition')
+        indexes = [models.Index(fields=['competition', '-elo_rating'])]
     def __str__(self):
         return f"{self.user.username} in {self.competition.name}"
 
@@ -37,19 +111,79 @@ class Match(models.Model):
     played_at = models.DateTimeField()
     participant1_elo_change = models.IntegerField(default=0)  # Elo change for participant1
     participant2_elo_change = models.IntegerField(default=0)  # Elo change for participant2
+    rating_pending = models.BooleanField(default=False)  # Result queued for the rating worker
+    participant1_score = models.IntegerField(null=True, blank=True)
+    participant2_score = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['competition', 'played_at'])]
 
     def save(self, *args, **kwargs):
+        created = self.pk is None
         # Check if the instance already exists in the database
-        if self.pk is not None:
+        if not created:
             previous_match = Match.objects.get(pk=self.pk)
             previous_winner = previous_match.winner
+            previous_scores = (previous_match.participant1_score, previous_match.participant2_score)
         else:
             previous_winner = "not_played"
+            previous_scores = (None, None)
 
-        # Call the superclass save method to save the match
-        super().save(*args, **kwargs)
+        needs_rating = self.winner != "not_played" or self.winner != previous_winner
+        deferred = needs_rating and self.competition.defers_ratings()
+        if deferred:
+            self.rating_pending = True
+
+        with transaction.atomic(using=router.db_for_write(Match, instance=self)), changes.collect(self.competition_id):
+            # Call the superclass save method to save the match
+            super().save(*args, **kwargs)
+
+            if deferred:
+                RatingTask.objects.create(
+                    competition_id=self.competition_id,
+                    match=self,
+                    previous_winner=previous_winner,
+                    winner=self.winner
+                )
+            elif needs_rating:
+                self.apply_result(previous_winner)
+
+            # The points table is cheap to maintain and always updated in the
+            # same transaction as the result, even when ratings are deferred.
+            self.update_standings(previous_winner, previous_scores)
+            if needs_rating or previous_scores != (self.participant1_score, self.participant2_score):
+                profiles.refresh(self.competition_id, [self.participant1_id, self.participant2_id])
+            changes.record(self.competition_id, 'match', self.pk, 'create' if created else 'update',
+                           changes.match_data(self))
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=router.db_for_write(Match, instance=self)):
+            # The stored result, the instance may be stale.
+            stored = (Match.objects.select_for_update().filter(pk=self.pk)
+                      .values_list('winner', 'participant1_score', 'participant2_score', 'rating_pending').first())
+            deleted = super().delete(*args, **kwargs)
+            if stored is not None and stored[0] != "not_played":
+                self.remove_result(*stored)
+        return deleted
+
+    def remove_result(self, winner, score1, score2, rating_pending):
+        """Take a deleted match's result back out of the standings, stats and summaries."""
+        ids = (self.participant1_id, self.participant2_id)
+        for participant_id, deltas in zip(ids, self.standing_deltas(winner, (score1, score2), -1)):
+            Standing.objects.filter(participant_id=participant_id).update(
+                **{name: F(name) + value for name, value in deltas.items() if value}
+            )
+        # A pending result hasn't reached the stats yet.
+        if not rating_pending:
+            columns = {"1": ("wins", "losses"), "2": ("losses", "wins"), "draw": ("draws", "draws")}[winner]
+            for participant_id, column in zip(ids, columns):
+                ParticipantStats.objects.filter(id=participant_id).update(
+                    matches_played=F('matches_played') - 1, **{column: F(column) - 1}
+                )
+            form.recompute(self.competition_id, ids)
+        profiles.refresh(self.competition_id, ids)
+
+    def apply_result(self, previous_winner):
         # Update Elo ratings if the match is played
         if self.winner != "not_played":
             self.update_elo_ratings(previous_winner)
@@ -86,38 +220,79 @@ class Match(models.Model):
             ParticipantStats.objects.filter(id=self.participant1_id).update(matches_played=F('matches_played') + 1)
             ParticipantStats.objects.filter(id=self.participant2_id).update(matches_played=F('matches_played') + 1)
         # Decrement matches_played for both participants if the match is being marked as not played
-        # elif self.winner == "not_played" and previous_winner != "not_played":
-            # ParticipantStats.objects.filter(id=self.participant1_id).update(matches_played=F('matches_played') - 1)
-            # ParticipantStats.objects.filter(id=self.participant2_id).update(matches_played=F('matches_played') - 1)
+        elif self.winner == "not_played" and previous_winner != "not_played":
+            ParticipantStats.objects.filter(id=self.participant1_id).update(matches_played=F('matches_played') - 1)
+            ParticipantStats.objects.filter(id=self.participant2_id).update(matches_played=F('matches_played') - 1)
 
-    def update_elo_ratings(self, previous_winner):
-        K = 32  # Elo K-factor
+        self.update_form(previous_winner)
+
+    def update_form(self, previous_winner):
+        # A new result after everything the participant played so far extends
+        # the stored streak and form; anything else means replaying the history.
+        ids = (self.participant1_id, self.participant2_id)
+        stats = {
+            row[0]: row[1:] for row in ParticipantStats.objects.select_for_update().filter(id__in=ids)
+            .values_list('id', 'current_streak', 'longest_win_streak', 'form', 'last_played_at')
+        }
+        stale = []
+        for participant_id, result in zip(ids, form.RESULTS.get(self.winner, (None, None))):
+            current_streak, longest_win_streak, recent, last_played_at = stats[participant_id]
+            if previous_winner != "not_played" or result is None or (
+                    last_played_at is not None and self.played_at < last_played_at):
+                stale.append(participant_id)
+                continue
+            current_streak, longest_win_streak, recent = form.advance(current_streak, longest_win_streak, recent, result)
+            ParticipantStats.objects.filter(id=participant_id).update(
+                current_streak=current_streak, longest_win_streak=longest_win_streak, form=recent,
+                last_played_at=self.played_at, win_rate=form.WIN_RATE
+            )
+        if stale:
+            form.recompute(self.competition_id, stale, include=self.pk)
+
+    def standing_deltas(self, winner, scores, sign):
+        """Per participant Standing column deltas of one result, negated when sign is -1."""
+        if winner == "not_played":
+            return {}, {}
+        results = {"1": ("win", "loss"), "2": ("loss", "win"), "draw": ("draw", "draw")}[winner]
+        columns = {"win": "wins", "draw": "draws", "loss": "losses"}
+        score1, score2 = scores[0] or 0, scores[1] or 0
+        deltas = []
+        for result, score_for, score_against in ((results[0], score1, score2), (results[1], score2, score1)):
+            deltas.append({
+                'played': sign,
+                columns[result]: sign,
+                'points': sign * self.competition.points_for(result),
+                'score_for': sign * score_for,
+                'score_against': sign * score_against,
+                'score_difference': sign * (score_for - score_against),
+            })
+        return deltas[0], deltas[1]
+
+    def update_standings(self, previous_winner, previous_scores):
+        scores = (self.participant1_score, self.participant2_score)
+        if previous_winner == self.winner and previous_scores == scores:
+            return
 
-        # Reverse previous Elo changes if the winner has changed
+        old1, old2 = self.standing_deltas(previous_winner, previous_scores, -1)
+        new1, new2 = self.standing_deltas(self.winner, scores, 1)
+        for participant_id, old, new in ((self.participant1_id, old1, new1), (self.participant2_id, old2, new2)):
+            deltas = {name: old.get(name, 0) + new.get(name, 0) for name in old.keys() | new.keys()}
+            deltas = {name: value for name, value in deltas.items() if value}
+            if deltas:
+                Standing.objects.filter(participant_id=participant_id).update(
+                    **{name: F(name) + value for name, value in deltas.items()}
+                )
+
+    def update_elo_ratings(self, previous_winner):
+        # Reverse previous Elo changes if the winner has changed (saved together with the new ones)
         if previous_winner != "not_played":
             self.participant1.elo_rating -= self.participant1_elo_change
             self.participant2.elo_rating -= self.participant2_elo_change
-            self.participant1.save()
-            self.participant2.save()
 
         # Calculate new Elo changes
-        rating1 = self.participant1.elo_rating
-        rating2 = self.participant2.elo_rating
-
-        expected1 = 1 / (1 + 10 ** ((rating2 - rating1) / 400))
-        expected2 = 1 / (1 + 10 ** ((rating1 - rating2) / 400))
-
-        # Determine actual scores based on the winner
-        if self.winner == "1":
-            actual1, actual2 = 1, 0
-        elif self.winner == "2":
-            actual1, actual2 = 0, 1
-        else:
-            actual1, actual2 = 0.5, 0.5  # In case of a draw
-
-        # Update Elo ratings
-        self.participant1_elo_change = round(K * (actual1 - expected1))
-        self.participant2_elo_change = round(K * (actual2 - expected2))
+        self.participant1_elo_change, self.participant2_elo_change = elo.rating_changes(
+            self.participant1.elo_rating, self.participant2.elo_rating, self.winner
+        )
 
         self.participant1.elo_rating += self.participant1_elo_change
         self.participant2.elo_rating += self.participant2_elo_change
@@ -137,11 +312,26 @@ class Match(models.Model):
 
 class ParticipantStats(models.Model):
     id = models.OneToOneField(Participant, on_delete=models.CASCADE, primary_key=True)
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='participant_stats')
     matches_played = models.IntegerField(default=0)
     wins = models.IntegerField(default=0)
     losses = models.IntegerField(default=0)
     draws = models.IntegerField(default=0)
     peak_elo = models.IntegerField(default=1200)
+    # Maintained with every result, see api/form.py
+    current_streak = models.IntegerField(default=0)  # consecutive wins (> 0) or losses (< 0)
+    longest_win_streak = models.IntegerField(default=0)
+    form = models.CharField(max_length=form.FORM_LENGTH, blank=True, default='')  # last results, newest first
+    win_rate = models.FloatField(default=0)
+    last_played_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['competition', '-win_rate']),
+            models.Index(fields=['competition', '-current_streak']),
+            models.Index(fields=['competition', '-longest_win_streak']),
+            models.Index(fields=['competition', 'id']),
+        ]
 
     def update_stats(self, result):
         if result == "win":
@@ -154,4 +344,169 @@ class ParticipantStats(models.Model):
         self.save()
 
     def __str__(self):
-        return f"Stats of participant: {self.id}"
\ No newline at end of file
+        return f"Stats of participant: {self.id}"
+
+
+class Standing(models.Model):
+    """Materialized points table row, updated in the same transaction as every result."""
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, primary_key=True, related_name='standing')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='standings')
+    points = models.IntegerField(default=0)
+    played = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    score_for = models.IntegerField(default=0)
+    score_against = models.IntegerField(default=0)
+    score_difference = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['competition', '-points', '-score_difference', '-wins'])]
+
+    def __str__(self):
+        return f"Standing of participant: {self.participant_id}"
+
+
+class PlayerSummary(models.Model):
+    """
+    Materialized profile row of one participation, copied from the
+    participant, its stats and standing with every result (api/profiles.py),
+    so a user's profile is a single read of the (user, competition) index.
+    """
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='player_summaries')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='player_summaries')
+    elo_rating = models.IntegerField(default=1200)
+    points = models.IntegerField(default=0)
+    matches_played = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    win_rate = models.FloatField(default=0)
+    current_streak = models.IntegerField(default=0)
+    longest_win_streak = models.IntegerField(default=0)
+    form = models.CharField(max_length=form.FORM_LENGTH, blank=True, default='')
+    last_played_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'competition'])]
+
+    def __str__(self):
+        return f"Summary of participant: {self.participant_id}"
+
+
+class RatingDecay(models.Model):
+    """One inactivity decay run over a competition, see api/decay.py."""
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='rating_decays')
+    created_at = models.DateTimeField(default=timezone.now)
+    inactive_since = models.DateTimeField()  # participants without a match since then were decayed
+    points = models.IntegerField()
+    floor = models.IntegerField()
+    participant_count = models.IntegerField(default=0)
+    reverted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['competition', '-created_at'])]
+
+    def __str__(self):
+        return f"Rating decay {self.id} of competition {self.competition_id}"
+
+
+class RatingDecayEntry(models.Model):
+    """The rating points one participant lost in a RatingDecay."""
+    decay = models.ForeignKey(RatingDecay, on_delete=models.CASCADE, related_name='entries')
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='rating_decays')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='rating_decay_entries')
+    amount = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['participant', 'decay'])]
+
+    def __str__(self):
+        return f"Decay of participant {self.participant_id} by {self.amount}"
+
+
+class MatchArchive(models.Model):
+    """A chunk of archived (played) matches of a competition, see api/archive.py."""
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='match_archives')
+    first_played_at = models.DateTimeField()
+    last_played_at = models.DateTimeField()
+    match_count = models.IntegerField()
+    data = models.BinaryField()  # zlib compressed, column oriented JSON
+    summary = models.JSONField(default=dict)  # per participant totals and Elo change of the chunk
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['competition', 'first_played_at'])]
+
+    def __str__(self):
+        return f"{self.match_count} archived matches of competition {self.competition_id}"
+
+
+class RatingTask(models.Model):
+    """A match result waiting to be applied to ratings and stats.
+
+    Tasks are drained by the rating_worker command strictly in id order
+    within a competition; different competitions are processed in parallel.
+    """
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='rating_tasks')
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='rating_tasks')
+    previous_winner = models.CharField(max_length=20, choices=Match.WinnerChoices.choices)
+    winner = models.CharField(max_length=20, choices=Match.WinnerChoices.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['competition', 'id'])]
+
+    def apply(self):
+        # Earlier tasks of the batch may have changed the same participants
+        # and Elo changes, so always start from the locked current rows.
+        match = (Match.objects.select_for_update().select_related('competition', 'participant1', 'participant2')
+                 .get(pk=self.match_id))
+        with changes.collect(self.competition_id):
+            # Replay the result exactly as it was recorded, later tasks for the
+            # same match carry any subsequent changes.
+            match.winner = self.winner
+            match.apply_result(self.previous_winner)
+            profiles.refresh(self.competition_id, [match.participant1_id, match.participant2_id])
+            self.delete()
+
+            if not RatingTask.objects.filter(match_id=match.pk).exists():
+                Match.objects.filter(pk=match.pk).update(rating_pending=False)
+                match.rating_pending = False
+            changes.record(self.competition_id, 'match', match.pk, 'update', changes.match_data(match))
+
+    def __str__(self):
+        return f"Rating task {self.id} for match {self.match_id}"
+
+
+class ChangeLogEntry(models.Model):
+    """A create, update or delete of a match or participant, see api/changes.py."""
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='changes')
+    seq = models.BigIntegerField()
+    KindChoices = models.TextChoices("KindChoices", ["match", "participant", "schedule"])
+    kind = models.CharField(max_length=20, choices=KindChoices.choices)
+    object_id = models.BigIntegerField()
+    ActionChoices = models.TextChoices("ActionChoices", ["create", "update", "delete"])
+    action = models.CharField(max_length=20, choices=ActionChoices.choices)
+    data = models.JSONField(null=True)  # the object as listed by the API, None for deletes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['competition', 'seq'], name='unique_change_seq')]
+
+    def __str__(self):
+        return f"{self.action} {self.kind} {self.object_id} (#{self.seq})"
+
+
+class CompetitionShard(models.Model):
+    """Which database (settings.COMPETITION_SHARDS) holds a competition, see api/sharding.py.
+
+    Lives on the default database only; its id is the competition id.
+    """
+    shard = models.CharField(max_length=100)
+    # Set while manage.py move_competition copies the competition, writes are refused meanwhile.
+    moving = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Competition {self.pk} on {self.shard}"
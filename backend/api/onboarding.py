@@ -0,0 +1,74 @@
+"""
+Adding many participants to a competition at once.
+
+The single participant POST costs a user lookup and four INSERTs (the
+participant, then its stats, standing and summary from the post_save signal)
+per person. add_participants resolves all usernames with one query and
+bulk-creates the participants, stats, standings and summaries, so onboarding
+a whole department takes a constant number of queries. bulk_create sends no
+post_save, so the work of the signals (stats, standing, summary, change log
+and cache invalidation) is done here for the whole batch.
+"""
+from django.contrib.auth.models import User
+from django.db import router, transaction
+
+from api import changes
+from api.caching import bump_competition_version
+from api.models import Participant, ParticipantStats, PlayerSummary, Standing
+
+UNKNOWN_USER = "User with this username does not exist."
+ALREADY_PARTICIPANT = "User is already a participant."
+
+
+def add_participants(competition, usernames):
+    """
+    Add the users named in `usernames` to `competition`.
+
+    Returns (participants, errors): the created participants in the order of
+    `usernames`, and a list of {'username', 'error'} for the names that were
+    skipped. Repeated names are only added once.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    users = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+    with transaction.atomic(using=router.db_for_write(Participant)):
+        existing = set(Participant.objects.filter(competition=competition, user_id__in=users.values())
+                       .values_list('user_id', flat=True))
+        errors = []
+        new = []
+        for username in usernames:
+            user_id = users.get(username)
+            if user_id is None:
+                errors.append({'username': username, 'error': UNKNOWN_USER})
+            elif user_id in existing:
+                errors.append({'username': username, 'error': ALREADY_PARTICIPANT})
+            else:
+                new.append(Participant(user_id=user_id, competition=competition))
+
+        if new:
+            participants = Participant.objects.bulk_create(new, batch_size=1000)
+            if participants[0].pk is None:
+                # Backends without INSERT ... RETURNING (MySQL) don't set the ids.
+                ids = dict(Participant.objects.filter(competition=competition, user_id__in=[p.user_id for p in new])
+                           .values_list('user_id', 'id'))
+                for participant in participants:
+                    participant.pk = ids[participant.user_id]
+            ParticipantStats.objects.bulk_create(
+                [ParticipantStats(id=participant, competition=competition) for participant in participants],
+                batch_size=1000
+            )
+            Standing.objects.bulk_create(
+                [Standing(participant=participant, competition=competition) for participant in participants],
+                batch_size=1000
+            )
+            PlayerSummary.objects.bulk_create(
+                [PlayerSummary(participant=participant, user_id=participant.user_id, competition=competition)
+                 for participant in participants],
+                batch_size=1000
+            )
+            changes.write_rows(competition.id, 'participant',
+                               [changes.participant_data(participant) for participant in participants])
+            bump_competition_version(competition.id)
+        else:
+            participants = []
+    return participants, errors
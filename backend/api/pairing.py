@@ -0,0 +1,53 @@
+"""
+Rating-aware pairings for the next round of a competition.
+
+Participants are sorted by rating once (O(n log n)) and paired with their
+neighbour, which minimises the total rating gap of the round. A recent
+opponent is swapped for one of the next few unpaired players instead, so the
+whole pass stays O(n * lookahead). The bye of an odd field goes to the lowest
+rated participant among those with the fewest earlier byes.
+"""
+
+
+def propose_pairings(participants, recent_pairs=frozenset(), lookahead=4, byes=None):
+    """
+    participants: iterable of (participant_id, rating).
+    recent_pairs: set of frozenset({id1, id2}) that should not meet again.
+    byes: participant_id -> byes had so far (Participant.byes), missing ids count as none.
+
+    Returns (pairs, bye) where pairs is a list of (id1, id2) with the higher
+    rated participant first, and bye is the id left out of an odd field.
+    """
+    ordered = [participant_id for participant_id, rating in sorted(participants, key=lambda p: (-p[1], p[0]))]
+
+    bye = None
+    if len(ordered) % 2:
+        # The lowest rated participant among those with the fewest byes sits the round out.
+        byes = byes or {}
+        fewest = min(byes.get(participant_id, 0) for participant_id in ordered)
+        index = next(i for i in reversed(range(len(ordered))) if byes.get(ordered[i], 0) == fewest)
+        bye = ordered.pop(index)
+
+    paired = [False] * len(ordered)
+    pairs = []
+    for i, participant in enumerate(ordered):
+        if paired[i]:
+            continue
+        paired[i] = True
+
+        candidates = []
+        j = i + 1
+        while j < len(ordered) and len(candidates) < lookahead:
+            if not paired[j]:
+                candidates.append(j)
+            j += 1
+
+        # Nearest unpaired opponent that isn't a recent rematch, else the nearest one.
+        opponent = next(
+            (j for j in candidates if frozenset((participant, ordered[j])) not in recent_pairs),
+            candidates[0]
+        )
+        paired[opponent] = True
+        pairs.append((participant, ordered[opponent]))
+
+    return pairs, bye
@@ -0,0 +1,29 @@
+"""
+Materialized per-user summaries for cross-competition profiles.
+
+A profile lists every participation of a user with its rating, points,
+stats and form. Those live in three tables of each competition, so they are
+copied into one PlayerSummary row per participation whenever a result
+changes them (Match.save, the rating worker and form recomputes), with one
+set-based UPDATE. Reading a profile is then a single read of the (user,
+competition) index per shard, see queries.player_profile.
+"""
+
+SUMMARY_STATS_FIELDS = ['matches_played', 'wins', 'draws', 'losses', 'win_rate', 'current_streak',
+                        'longest_win_streak', 'form', 'last_played_at']
+
+
+def refresh(competition_id, participant_ids=None):
+    """Copy the rating, points and stats of some (default: all) participants into their summaries."""
+    from django.db.models import OuterRef, Subquery
+    from api.models import Participant, ParticipantStats, PlayerSummary, Standing
+
+    summaries = PlayerSummary.objects.filter(competition_id=competition_id)
+    if participant_ids is not None:
+        summaries = summaries.filter(participant_id__in=participant_ids)
+
+    stats = ParticipantStats.objects.filter(id=OuterRef('participant_id'))
+    values = {name: Subquery(stats.values(name)[:1]) for name in SUMMARY_STATS_FIELDS}
+    values['elo_rating'] = Subquery(Participant.objects.filter(pk=OuterRef('participant_id')).values('elo_rating')[:1])
+    values['points'] = Subquery(Standing.objects.filter(participant_id=OuterRef('participant_id')).values('points')[:1])
+    return summaries.update(**values)
@@ -0,0 +1,65 @@
+"""
+Background removal of deleted competitions.
+
+Deleting a competition only sets `deleted_at`, which hides it from every
+endpoint straight away. purge_competitions then removes its rows table by
+table, children first, in chunks of primary keys deleted with raw DELETEs:
+nothing is loaded into memory beyond one chunk of ids and no per-row signals
+fire. Each chunk is its own transaction and adds to `purged_rows`, so the
+owner can follow the progress.
+"""
+from django.db import router, transaction
+from django.db.models import F
+
+from api import sharding
+from api.models import Competition, CompetitionShard
+
+
+def deleted_competition_ids():
+    return sorted(
+        competition_id
+        for shard in sharding.shard_aliases()
+        for competition_id in Competition.all_objects.using(shard)
+        .filter(deleted_at__isnull=False).values_list('id', flat=True)
+    )
+
+
+def purge_competition(competition_id, chunk_size=10_000):
+    """Remove a deleted competition with everything in it. Returns the number of rows deleted."""
+    with sharding.competition_context(competition_id):
+        competition = Competition.all_objects.filter(pk=competition_id, deleted_at__isnull=False)
+        if not competition.exists():
+            return 0
+        deleted = delete_rows(competition_id, router.db_for_write(Competition), chunk_size)
+    CompetitionShard.objects.filter(pk=competition_id).delete()
+    sharding.forget_placement(competition_id)
+    return deleted
+
+
+def delete_rows(competition_id, using, chunk_size=10_000):
+    """Delete a competition and its rows from the `using` database in chunks. Returns the rows deleted."""
+    competition = Competition.all_objects.using(using).filter(pk=competition_id)
+    models = [model for model in reversed(sharding.sharded_models_in_dependency_order()) if model is not Competition]
+
+    if competition.filter(purge_total__isnull=True).exists():
+        total = sum(sharding.competition_rows(model, competition_id).using(using).count() for model in models)
+        competition.update(purge_total=total)
+
+    deleted = 0
+    for model in models:
+        rows = sharding.competition_rows(model, competition_id).using(using)
+        while True:
+            with transaction.atomic(using=using):
+                pks = list(rows.values_list('pk', flat=True)[:chunk_size])
+                if not pks:
+                    break
+                model._base_manager.using(using).filter(pk__in=pks)._raw_delete(using)
+                competition.update(purged_rows=F('purged_rows') + len(pks))
+            deleted += len(pks)
+
+    competition._raw_delete(using)
+    return deleted
+
+
+def purge(chunk_size=10_000):
+    return sum(purge_competition(competition_id, chunk_size) for competition_id in deleted_competition_ids())
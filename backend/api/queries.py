@@ -0,0 +1,171 @@
+"""
+Annotated querysets and read helpers shared by the views.
+
+Listings are single SQL statements: the per-row figures are computed with
+correlated subqueries instead of follow-up queries per competition.
+"""
+from itertools import chain
+
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from api.archive import archived_matches
+from api.models import Competition, Match, Participant, PlayerSummary, Standing
+
+
+def subquery_count(queryset, group_by):
+    counted = queryset.order_by().values(group_by).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def competition_summaries(user):
+    """Every competition the user owns or plays in, with counts, the user's standing and the leader."""
+    participants = Participant.objects.filter(competition=OuterRef('pk'))
+    mine = participants.filter(user=user)
+    leader = participants.order_by('-elo_rating', 'id')
+    # Competitions in points mode are ranked by the points table instead.
+    standings = Standing.objects.filter(competition=OuterRef('pk'))
+    points_leader = standings.order_by('-points', '-score_difference', '-wins', 'participant_id')
+    points_mode = Q(scoring="points")
+
+    competitions = Competition.objects.filter(
+        Q(created_by=user) | Q(pk__in=Participant.objects.filter(user=user).values('competition_id'))
+    )
+    return competitions.annotate(
+        participant_count=subquery_count(participants, 'competition'),
+        match_count=subquery_count(Match.objects.filter(competition=OuterRef('pk')), 'competition'),
+        last_activity=Subquery(
+            Match.objects.filter(competition=OuterRef('pk'))
+            .exclude(winner="not_played")
+            .order_by('-played_at')
+            .values('played_at')[:1]
+        ),
+        my_participant=Subquery(mine.values('id')[:1]),
+        my_rating=Subquery(mine.values('elo_rating')[:1]),
+        my_points=Subquery(standings.filter(participant__user=user).values('points')[:1]),
+        # In points mode the rank counts participants strictly ahead on points.
+        my_rank=Case(
+            When(my_rating__isnull=True, then=None),
+            When(points_mode, then=subquery_count(
+                standings.filter(points__gt=OuterRef('my_points')), 'competition'
+            ) + 1),
+            default=subquery_count(
+                participants.filter(elo_rating__gt=OuterRef('my_rating')), 'competition'
+            ) + 1,
+            output_field=IntegerField(),
+        ),
+        leader_participant=Case(
+            When(points_mode, then=Subquery(points_leader.values('participant_id')[:1])),
+            default=Subquery(leader.values('id')[:1]),
+            output_field=IntegerField(),
+        ),
+        leader_username=Case(
+            When(points_mode, then=Subquery(points_leader.values('participant__user__username')[:1])),
+            default=Subquery(leader.values('user__username')[:1]),
+        ),
+        leader_rating=Case(
+            When(points_mode, then=Subquery(points_leader.values('participant__elo_rating')[:1])),
+            default=Subquery(leader.values('elo_rating')[:1]),
+        ),
+        leader_points=Case(
+            When(points_mode, then=Subquery(points_leader.values('points')[:1])),
+            default=Subquery(leader.values('standing__points')[:1]),
+        ),
+    ).order_by('id')
+
+
+def player_profile(user, viewer):
+    """
+    The PlayerSummary rows of every participation of `user` (in the
+    competitions `viewer` owns or plays in, unless it is the user), with the
+    current rank annotated: by rating, or by points in points mode.
+    """
+    summaries = PlayerSummary.objects.filter(user=user, competition__deleted_at__isnull=True)
+    if viewer != user:
+        summaries = summaries.filter(
+            Q(competition__created_by=viewer) |
+            Q(competition_id__in=Participant.objects.filter(user=viewer).values('competition_id'))
+        )
+    participants = Participant.objects.filter(competition=OuterRef('competition_id'))
+    standings = Standing.objects.filter(competition=OuterRef('competition_id'))
+    return summaries.select_related('competition').annotate(
+        rank=Case(
+            When(competition__scoring="points", then=subquery_count(
+                standings.filter(points__gt=OuterRef('points')), 'competition'
+            ) + 1),
+            default=subquery_count(
+                participants.filter(elo_rating__gt=OuterRef('elo_rating')), 'competition'
+            ) + 1,
+            output_field=IntegerField(),
+        ),
+    ).order_by('competition_id')
+
+
+def standings_table(competition):
+    """
+    The points table of a competition, best first.
+
+    Standings are read in one ordered range scan of the (competition, points)
+    index. Head-to-head, which depends on which tied participants played each
+    other, is resolved afterwards with one extra query per group of
+    participants level on points.
+    """
+    tiebreakers = competition.tiebreaker_list()
+    order = ['-points'] + ['-' + name for name in tiebreakers if name != 'head_to_head'] + ['participant_id']
+    standings = list(
+        Standing.objects.filter(competition=competition).select_related('participant__user').order_by(*order)
+    )
+
+    if 'head_to_head' in tiebreakers:
+        table, start = [], 0
+        while start < len(standings):
+            end = start
+            while end < len(standings) and standings[end].points == standings[start].points:
+                end += 1
+            table += _break_ties(competition, standings[start:end], tiebreakers)
+            start = end
+        standings = table
+
+    for position, standing in enumerate(standings, start=1):
+        standing.position = position
+    return standings
+
+
+def _break_ties(competition, group, tiebreakers):
+    if len(group) < 2:
+        return group
+
+    if not any(standing.played for standing in group):
+        return group
+
+    ids = [standing.participant_id for standing in group]
+    head_to_head = dict.fromkeys(ids, 0)
+    matches = Match.objects.filter(competition=competition).exclude(winner="not_played")
+    if len(ids) <= 500:
+        matches = matches.filter(participant1_id__in=ids, participant2_id__in=ids)
+    # Archived matches count too, or archiving would reorder the table.
+    archived = ((match['participant1'], match['participant2'], match['winner'])
+                for match in archived_matches(competition.id))
+    results = chain(matches.values_list('participant1_id', 'participant2_id', 'winner'), archived)
+    for participant1, participant2, winner in results:
+        if participant1 not in head_to_head or participant2 not in head_to_head:
+            continue
+        if winner == "1":
+            head_to_head[participant1] += competition.points_win
+            head_to_head[participant2] += competition.points_loss
+        elif winner == "2":
+            head_to_head[participant2] += competition.points_win
+            head_to_head[participant1] += competition.points_loss
+        else:
+            head_to_head[participant1] += competition.points_draw
+            head_to_head[participant2] += competition.points_draw
+
+    def key(standing):
+        values = [
+            head_to_head[standing.participant_id] if name == 'head_to_head' else getattr(standing, name)
+            for name in tiebreakers
+        ]
+        return [-value for value in values] + [standing.participant_id]
+
+    return sorted(group, key=key)
+
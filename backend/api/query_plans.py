@@ -0,0 +1,146 @@
+"""
+EXPLAIN checks for the hot queries of the API.
+
+hot_queries() builds the queries that the views and Match.save run on every
+request with the same ORM calls (UPDATEs by the SELECT of their WHERE
+clause). check_plan() runs EXPLAIN for one of them and reports the two ways a
+query degrades when it loses its index: a full scan of a table, and a sort
+of the rows through a temporary B-tree, when more than `max_rows` rows are
+estimated to be scanned or sorted.
+
+SQLite plans carry no row estimates, so table sizes are counted and index
+selectivity is taken from sqlite_stat1 (filled by ANALYZE) when present.
+PostgreSQL plans are read with their own estimates.
+"""
+import re
+
+from django.db import connections
+from django.db.models import F
+
+from api.listing import MATCH_FIELDS, PARTICIPANT_FIELDS
+from api.models import ChangeLogEntry, Competition, Match, Participant, ParticipantStats, PlayerSummary, RatingTask, Standing
+from api.queries import competition_summaries, player_profile
+
+SUPPORTED_VENDORS = ('sqlite', 'postgresql')
+
+
+def hot_queries(competition_id, participant_ids, user, match_id):
+    """(name, queryset) of the hot queries, for the given sample rows (two participant ids)."""
+    participant_id = participant_ids[0]
+    participants = Participant.objects.filter(competition_id=competition_id)
+    matches = Match.objects.filter(competition_id=competition_id)
+    stats = ParticipantStats.objects.filter(competition_id=competition_id).annotate(elo_rating=F('id__elo_rating'))
+    return [
+        ('competition lookup', Competition.objects.filter(id=competition_id)),
+        ('membership check', Participant.objects.filter(user=user, competition_id=competition_id)),
+        ('participant lookup', Participant.objects.filter(id=participant_id)),
+        ('participant list', participants.values(*PARTICIPANT_FIELDS)),
+        ('ratings by participant', participants.order_by('id').values_list('id', 'elo_rating')),
+        ('match list', matches.values(*MATCH_FIELDS)),
+        ('recent pairings', matches.order_by('-played_at', '-id').values_list('participant1_id', 'participant2_id')),
+        ('unplayed fixtures', matches.filter(winner="not_played").values_list('participant1_id', 'participant2_id')),
+        ('Match.save: previous result', Match.objects.filter(pk=match_id)),
+        ('Match.save: stats update', ParticipantStats.objects.filter(id=participant_id)),
+        ('Match.save: form lock', ParticipantStats.objects.filter(id__in=participant_ids)),
+        ('Match.save: standing update', Standing.objects.filter(participant_id=participant_id)),
+        ('Match.save: summary refresh', PlayerSummary.objects.filter(competition_id=competition_id,
+                                                                     participant_id__in=participant_ids)),
+        ('stats lookup', ParticipantStats.objects.filter(id=participant_id)),
+        ('stats batch', stats.order_by('id')),
+        ('stats by win rate', stats.order_by('-win_rate', 'id')),
+        ('stats by streak', stats.order_by('-current_streak', 'id')),
+        ('standings', Standing.objects.filter(competition_id=competition_id)
+         .select_related('participant__user').order_by('-points', '-score_difference', '-wins')),
+        ('change feed', ChangeLogEntry.objects.filter(competition_id=competition_id, seq__gt=0).order_by('seq')),
+        ('rating queue', RatingTask.objects.filter(competition_id=competition_id).order_by('id')),
+        ('my competitions', competition_summaries(user)),
+        ('player profile', player_profile(user, user)),
+    ]
+
+
+def check_plan(queryset, max_rows=1000):
+    """Returns (plan, problems) of a queryset, problems being readable strings."""
+    connection = connections[queryset.db]
+    plan = queryset.explain()
+    if connection.vendor == 'sqlite':
+        return plan, _sqlite_problems(connection, queryset, plan, max_rows)
+    if connection.vendor == 'postgresql':
+        return plan, _postgresql_problems(connection, plan, max_rows)
+    return plan, []
+
+
+# SQLite: "<id> <parent> <notused> <detail>", e.g. "3 0 0 SEARCH api_match USING INDEX ... (competition_id=?)"
+SQLITE_LINE = re.compile(r'^(\d+) (\d+) \d+ (.*)$')
+SQLITE_LOOP = re.compile(r'^(SCAN|SEARCH) (\S+)(?: USING (?:COVERING )?INDEX (\S+)(?: \((.*)\))?)?')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)$')
+
+
+def _sqlite_problems(connection, queryset, plan, max_rows):
+    sql, _ = queryset.query.sql_with_params()
+    aliases = {alias: table for table, alias in re.findall(r'"(\w+)" ([A-Z]\d+)\b', sql)}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        stat1 = {}
+        if cursor.fetchone():
+            cursor.execute("SELECT idx, stat FROM sqlite_stat1")
+            stat1 = {index: [int(part) for part in stat.split() if part.isdigit()] for index, stat in cursor.fetchall()}
+
+        table_rows = {}
+
+        def count(table):
+            if table not in table_rows:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                table_rows[table] = cursor.fetchone()[0]
+            return table_rows[table]
+
+        problems = []
+        loop_rows = {}  # parent id -> estimated rows of the loops below it
+        for line in plan.splitlines():
+            match = SQLITE_LINE.match(line)
+            if not match:
+                continue
+            parent, detail = match.group(2), match.group(3)
+            loop = SQLITE_LOOP.match(detail)
+            if loop:
+                kind, name, index, constraints = loop.groups()
+                table = aliases.get(name, name)
+                if kind == 'SCAN':
+                    rows = count(table)
+                    if rows > max_rows:
+                        problems.append(f"full scan of {table} (~{rows} rows)")
+                elif 'INTEGER PRIMARY KEY' in detail:
+                    rows = 1
+                else:
+                    equalities = len(re.findall(r'=\?', constraints or ''))
+                    stat = stat1.get(index)
+                    rows = stat[equalities] if stat and len(stat) > equalities else count(table)
+                loop_rows[parent] = max(loop_rows.get(parent, 0), rows)
+                continue
+            sort = SQLITE_SORT.match(detail)
+            if sort:
+                rows = loop_rows.get(parent, 0)
+                if rows > max_rows:
+                    problems.append(f"temporary B-tree for {sort.group(1)} (~{rows} rows)")
+    return problems
+
+
+POSTGRESQL_SCAN = re.compile(r'Seq Scan on (\w+)')
+POSTGRESQL_SORT = re.compile(r'(?<!Incremental )Sort +\(cost=\S+ rows=(\d+)')
+
+
+def _postgresql_problems(connection, plan, max_rows):
+    problems = []
+    with connection.cursor() as cursor:
+        for line in plan.splitlines():
+            scan = POSTGRESQL_SCAN.search(line)
+            if scan:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [scan.group(1)])
+                row = cursor.fetchone()
+                rows = row[0] if row else 0
+                if rows > max_rows:
+                    problems.append(f"full scan of {scan.group(1)} (~{rows} rows)")
+                continue
+            sort = POSTGRESQL_SORT.search(line)
+            if sort and int(sort.group(1)) > max_rows:
+                problems.append(f"sort of ~{sort.group(1)} rows")
+    return problems
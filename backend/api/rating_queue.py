@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from api import changes, sharding
+from api.models import Competition, RatingTask
+
+
+def pending_competition_ids():
+    return sorted(
+        competition_id
+        for shard in sharding.shard_aliases()
+        for competition_id in RatingTask.objects.using(shard).filter(competition__deleted_at__isnull=True)
+        .values_list('competition_id', flat=True).distinct()
+    )
+
+
+def drain_competition(competition_id, batch_size=100):
+    """Apply every queued rating task of a competition in the order they were recorded."""
+    with sharding.competition_context(competition_id):
+        return _drain_competition(competition_id, batch_size)
+
+
+def _drain_competition(competition_id, batch_size):
+    processed = 0
+    while True:
+        with transaction.atomic(using=router.db_for_write(RatingTask)), changes.collect(competition_id):
+            # Lock the competition row so that only one worker drains it at a time.
+            # (SQLite ignores the lock but serialises writers anyway.)
+            Competition.objects.select_for_update().filter(id=competition_id).exists()
+            # RatingTask.apply loads its match and participants itself.
+            tasks = list(RatingTask.objects.filter(competition_id=competition_id).order_by('id')[:batch_size])
+            for task in tasks:
+                task.apply()
+        processed += len(tasks)
+        if len(tasks) < batch_size:
+            return processed
+
+
+def _drain_in_thread(competition_id, batch_size):
+    try:
+        return drain_competition(competition_id, batch_size)
+    finally:
+        connections.close_all()
+
+
+def drain(workers=1, batch_size=100):
+    """Drain the queue once, running up to `workers` competitions in parallel."""
+    competition_ids = pending_competition_ids()
+    if workers <= 1 or len(competition_ids) <= 1:
+        return sum(drain_competition(competition_id, batch_size) for competition_id in competition_ids)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_drain_in_thread, competition_ids, [batch_size] * len(competition_ids)))
+
+
+def queue_lag(competition_id):
+    summary = RatingTask.objects.filter(competition_id=competition_id).aggregate(
+        pending=Count('id'), oldest_pending_at=Min('created_at')
+    )
+    oldest = summary['oldest_pending_at']
+    summary['lag_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return summary
@@ -0,0 +1,82 @@
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+def _encoder_default(obj):
+    # Anything orjson can't encode natively (lazy strings, decimals, ...)
+    # is converted the same way DRF's own encoder would do it.
+    return encoders.JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte identical to JSONRenderer for compact,
+    unicode output (DRF's defaults); any other configuration, or data orjson
+    can't handle, falls back to the standard renderer.
+    """
+    use_orjson = orjson is not None and JSONRenderer.compact and not JSONRenderer.ensure_ascii
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not self.use_orjson or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encoder_default,
+                option=(orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+                        | orjson.OPT_NON_STR_KEYS),
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same javascript-safe escaping as JSONRenderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders to MessagePack, selected with `Accept: application/msgpack`.
+    Only available when the optional `msgpack` package is installed.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder_default)
+
+
+def _list_renderer_classes():
+    classes = [
+        FastJSONRenderer if renderer is JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+    if msgpack is not None:
+        classes.append(MessagePackRenderer)
+    return classes
+
+
+# Renderers for the list endpoints: the project defaults with the fast JSON
+# encoder swapped in, plus MessagePack when available.
+LIST_RENDERER_CLASSES = _list_renderer_classes()
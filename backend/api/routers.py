@@ -0,0 +1,81 @@
+"""
+Database routing.
+
+ReplicaRouter sends reads made while serving safe (GET/HEAD/OPTIONS)
+requests to one of the aliases listed in settings.DATABASE_REPLICAS; every
+write, and every read made while serving a write request, goes to the
+primary. ReplicaPinningMiddleware decides per request and, after a
+successful write, pins the client to the primary for
+settings.REPLICA_PIN_SECONDS so it always reads its own writes.
+
+Enable with:
+    DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+    MIDDLEWARE += ['api.routers.ReplicaPinningMiddleware']
+    DATABASE_REPLICAS = ['replica']
+"""
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replicas = contextvars.ContextVar('use_replicas', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replicas.get() and replicas():
+            return random.choice(replicas())
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema and data through replication.
+        if db in replicas():
+            return False
+        return None
+
+
+def _pin_key(request):
+    # The router runs before DRF authenticates the request, so clients are
+    # identified by their credentials (JWT header or session cookie).
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'replica-pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = _pin_key(request)
+        safe = request.method in SAFE_METHODS
+        pinned = key is not None and safe and cache.get(key) is not None
+
+        token = _use_replicas.set(safe and not pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replicas.reset(token)
+
+        if not safe and key is not None and response.status_code < 400:
+            cache.set(key, True, timeout=getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+        return response
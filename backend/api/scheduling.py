@@ -0,0 +1,132 @@
+"""
+Round-robin schedules built with the circle method.
+"""
+from django.db import connections, router, transaction
+
+from api import changes
+from api.caching import bump_competition_version
+from api.models import Match
+
+
+def round_robin(participant_ids, double=False):
+    """
+    Split every pairing of `participant_ids` into rounds in which each
+    participant plays at most once. With an odd number of participants one
+    of them has a bye each round. A double round-robin repeats the rounds
+    with home and away swapped.
+
+    Returns a list of rounds, each a list of (participant1, participant2).
+    """
+    ids = list(participant_ids)
+    if len(ids) < 2:
+        return []
+    if len(ids) % 2:
+        ids.append(None)  # bye
+
+    n = len(ids)
+    rounds = []
+    for round_number in range(n - 1):
+        fixtures = []
+        for i in range(n // 2):
+            home, away = ids[i], ids[n - 1 - i]
+            if home is None or away is None:
+                continue
+            # Alternate sides every round so everyone gets a balanced share of both.
+            if round_number % 2:
+                home, away = away, home
+            fixtures.append((home, away))
+        rounds.append(fixtures)
+        # Keep the first participant fixed and rotate everyone else by one.
+        ids = [ids[0], ids[-1]] + ids[1:-1]
+
+    if double:
+        rounds += [[(away, home) for home, away in fixtures] for fixtures in rounds]
+    return rounds
+
+
+def create_fixtures(competition_id, fixtures, return_ids=False):
+    """
+    Create (participant1, participant2, played_at) fixtures as not_played
+    matches in one transaction. The change log gets a single `schedule` entry
+    for all of them (clients re-fetch the matches) rather than one per match.
+
+    Returns the ids of the new matches in fixture order when `return_ids`.
+    """
+    with transaction.atomic(using=router.db_for_write(Match)):
+        ids = insert_unplayed_matches(competition_id, fixtures, return_ids)
+        if fixtures:
+            played_at = [fixture[2] for fixture in fixtures]
+            changes.write_schedule(competition_id, len(fixtures), min(played_at), max(played_at))
+        bump_competition_version(competition_id)
+    return ids
+
+
+def insert_unplayed_matches(competition_id, fixtures, return_ids=False, chunk_size=1000):
+    """
+    Insert (participant1, participant2, played_at) fixtures as not_played matches.
+
+    A season can hold tens of thousands of fixtures, so rows are written in
+    chunks through one prepared INSERT (executemany) instead of building a
+    model instance and compiling its values per row like bulk_create does.
+    Values are prepared by the model fields themselves and every other column
+    gets its model default; no rating work is needed for unplayed matches, so
+    skipping Match.save is safe.
+
+    With `return_ids` the rows go in multi-row INSERTs with RETURNING where the
+    database supports it, otherwise they are read back; returns their ids.
+    """
+    using = router.db_for_write(Match)
+    connection = connections[using]
+    fields = [
+        field for field in Match._meta.concrete_fields
+        if not field.primary_key
+    ]
+    table = connection.ops.quote_name(Match._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    sql = f'INSERT INTO {table} ({columns}) VALUES '
+
+    defaults = Match(competition_id=competition_id)
+    played_at_field = Match._meta.get_field('played_at')
+    prepared_times = {}
+    template = [field.get_db_prep_save(field.pre_save(defaults, True), connection) for field in fields]
+    positions = {field.attname: i for i, field in enumerate(fields)}
+
+    def rows(chunk):
+        for participant1, participant2, played_at in chunk:
+            if played_at not in prepared_times:
+                prepared_times[played_at] = played_at_field.get_db_prep_save(played_at, connection)
+            row = list(template)
+            row[positions['participant1_id']] = participant1
+            row[positions['participant2_id']] = participant2
+            row[positions['played_at']] = prepared_times[played_at]
+            yield row
+
+    returning = return_ids and connection.features.can_return_rows_from_bulk_insert
+    with connection.cursor() as cursor:
+        if not returning:
+            last_id = Match.objects.using(using).order_by('-id').values_list('id', flat=True).first() or 0
+            for start in range(0, len(fixtures), chunk_size):
+                cursor.executemany(sql + placeholders, list(rows(fixtures[start:start + chunk_size])))
+            return _read_back_ids(using, competition_id, fixtures, last_id) if return_ids else None
+
+        returning_sql, _ = connection.ops.return_insert_columns([Match._meta.pk])
+        batch_size = connection.ops.bulk_batch_size(fields, fixtures) or len(fixtures)
+        ids = []
+        for start in range(0, len(fixtures), batch_size):
+            chunk = list(rows(fixtures[start:start + batch_size]))
+            cursor.execute(f"{sql}{', '.join([placeholders] * len(chunk))} {returning_sql}",
+                           [value for row in chunk for value in row])
+            ids += [row[0] for row in connection.ops.fetch_returned_insert_rows(cursor)]
+        return ids
+
+
+def _read_back_ids(using, competition_id, fixtures, last_id):
+    # Without RETURNING (MySQL) the new rows are matched on their fixture, so
+    # a match inserted concurrently can't be mistaken for one of them.
+    new_ids = {}
+    inserted = (Match.objects.using(using).filter(competition_id=competition_id, id__gt=last_id, winner="not_played")
+                .order_by('id').values_list('participant1_id', 'participant2_id', 'played_at', 'id'))
+    for participant1, participant2, played_at, match_id in inserted:
+        new_ids.setdefault((participant1, participant2, played_at), []).append(match_id)
+    return [new_ids[fixture].pop(0) for fixture in fixtures]
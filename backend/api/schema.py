@@ -0,0 +1,104 @@
+"""
+The OpenAPI schema, generated once per code version.
+
+drf-spectacular introspects every view on each request to /api/schema/.
+The schema only changes with the code, so it is generated once per process,
+or loaded from settings.SCHEMA_FILE when `manage.py generate_schema` wrote it
+during the deploy, and served from memory with an ETag. The code version is
+settings.SCHEMA_VERSION (e.g. the deployed commit) or, when unset, a hash of
+the sources of the api app and the URLconf; a schema file of another version
+is regenerated and rewritten on first use.
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular import __version__ as spectacular_version
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework.utils.encoders import JSONEncoder
+
+_sources_version = None
+_schema = {}    # version -> schema
+_rendered = {}  # (version, media type) -> (content, etag)
+
+
+def code_version():
+    global _sources_version
+    version = getattr(settings, 'SCHEMA_VERSION', None)
+    if version:
+        return str(version)
+    if _sources_version is None:
+        digest = hashlib.sha256(spectacular_version.encode())
+        urlconf = sys.modules[settings.ROOT_URLCONF].__file__
+        for path in sorted(Path(__file__).parent.rglob('*.py')) + [Path(urlconf)]:
+            digest.update(path.read_bytes())
+        _sources_version = digest.hexdigest()[:16]
+    return _sources_version
+
+
+def generate():
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def write(path, version, schema):
+    # Written next to the target and renamed, so workers never read half a file.
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as schema_file:
+        json.dump({'version': version, 'schema': schema}, schema_file, cls=JSONEncoder)
+    os.replace(tmp, path)
+
+
+def get_schema():
+    """The schema of the running code, from memory, the schema file or generated."""
+    version = code_version()
+    if version in _schema:
+        return _schema[version]
+
+    path = getattr(settings, 'SCHEMA_FILE', None)
+    schema = None
+    if path and os.path.exists(path):
+        with open(path) as schema_file:
+            stored = json.load(schema_file)
+        if stored.get('version') == version:
+            schema = stored['schema']
+    if schema is None:
+        schema = generate()
+        if path:
+            write(path, version, schema)
+    _schema[version] = schema
+    return schema
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """SpectacularAPIView serving the precomputed schema with an ETag."""
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if not self.serve_public or request.GET.get('lang') or request.GET.get('version'):
+            # Per user or per language schemas aren't cached.
+            return super().get(request, *args, **kwargs)
+
+        version = code_version()
+        renderer, media_type = request.accepted_renderer, request.accepted_media_type
+        key = (version, media_type)
+        if key not in _rendered:
+            content = renderer.render(get_schema(), media_type, {'request': request})
+            _rendered[key] = (content, quote_etag(hashlib.sha256(content).hexdigest()[:32]))
+        content, etag = _rendered[key]
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            charset = f'; charset={renderer.charset}' if renderer.charset else ''
+            response = HttpResponse(content, content_type=media_type + charset)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+        return response
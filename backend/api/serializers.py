@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from api.models import Competition, Match, Participant, ParticipantStats
+from api.models import ChangeLogEntry, Competition, Match, Participant, ParticipantStats, PlayerSummary, RatingDecay, RatingDecayEntry, Standing
 from django.contrib.auth import get_user_model
+from datetime import timedelta
 
 
 User = get_user_model()
@@ -19,9 +20,51 @@ class UserSerializer(serializers.ModelSerializer):
 class CompetitionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Competition
-        fields = ['id', 'name', 'created_at', 'created_by']
+        fields = ['id', 'name', 'created_at', 'created_by', 'deferred_ratings',
+                  'scoring', 'points_win', 'points_draw', 'points_loss', 'tiebreakers',
+                  'decay_after_days', 'decay_points', 'decay_floor']
         extra_kwargs = {'created_by': {'read_only': True}}
 
+    def validate_tiebreakers(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in Competition.TIEBREAKERS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown tiebreakers {unknown}, expected any of {Competition.TIEBREAKERS}.")
+        return ','.join(names)
+
+    def update(self, instance, validated_data):
+        competition = super().update(instance, validated_data)
+        if validated_data.keys() & {'points_win', 'points_draw', 'points_loss'}:
+            competition.recompute_points()
+        return competition
+
+
+class CompetitionSummarySerializer(CompetitionSerializer):
+    participant_count = serializers.IntegerField(read_only=True)
+    match_count = serializers.IntegerField(read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+    my_participant = serializers.IntegerField(read_only=True)
+    my_rating = serializers.IntegerField(read_only=True)
+    my_points = serializers.IntegerField(read_only=True)
+    my_rank = serializers.IntegerField(read_only=True)
+    leader = serializers.SerializerMethodField()
+
+    class Meta(CompetitionSerializer.Meta):
+        fields = CompetitionSerializer.Meta.fields + [
+            'participant_count', 'match_count', 'last_activity',
+            'my_participant', 'my_rating', 'my_points', 'my_rank', 'leader'
+        ]
+
+    def get_leader(self, obj) -> dict | None:
+        if obj.leader_participant is None:
+            return None
+        return {
+            'participant': obj.leader_participant,
+            'username': obj.leader_username,
+            'elo_rating': obj.leader_rating,
+            'points': obj.leader_points,
+        }
+
 
 class ParticipantSerializer(serializers.ModelSerializer):
     username = serializers.CharField(write_only=True)
@@ -47,11 +90,22 @@ class ParticipantSerializer(serializers.ModelSerializer):
         participant = Participant.objects.create(user=user, competition=competition, **validated_data)
         return participant
 
+class BulkParticipantRequestSerializer(serializers.Serializer):
+    usernames = serializers.ListField(child=serializers.CharField(max_length=150), allow_empty=False, max_length=1000)
+
+class ParticipantErrorSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    error = serializers.CharField()
+
+class BulkParticipantSerializer(serializers.Serializer):
+    created = ParticipantSerializer(many=True)
+    errors = ParticipantErrorSerializer(many=True)
+
 class MatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = Match
-        fields = ['id', 'competition', 'participant1', 'participant2', 'winner', 'played_at', 'participant1_elo_change', 'participant2_elo_change']
-        read_only_fields = ['competition']
+        fields = ['id', 'competition', 'participant1', 'participant2', 'winner', 'played_at', 'participant1_elo_change', 'participant2_elo_change', 'rating_pending', 'participant1_score', 'participant2_score']
+        read_only_fields = ['competition', 'rating_pending']
 
     def validate(self, data):
         participant1 = data.get('participant1')
@@ -83,5 +137,175 @@ class MatchSerializer(serializers.ModelSerializer):
 class ParticipantStatsSerializer(serializers.ModelSerializer):
     class Meta:
         model = ParticipantStats
-        fields = ['id', 'matches_played', 'wins', 'losses', 'draws', 'peak_elo']
+        fields = ['id', 'matches_played', 'wins', 'losses', 'draws', 'peak_elo',
+                  'current_streak', 'longest_win_streak', 'form', 'win_rate']
+        read_only_fields = ['current_streak', 'longest_win_streak', 'form', 'win_rate']
+
+class ParticipantStatsBatchSerializer(ParticipantStatsSerializer):
+    elo_rating = serializers.IntegerField(read_only=True)
+
+    class Meta(ParticipantStatsSerializer.Meta):
+        fields = ParticipantStatsSerializer.Meta.fields + ['elo_rating']
+
+class PlayerSummarySerializer(serializers.ModelSerializer):
+    competition_name = serializers.CharField(source='competition.name')
+    scoring = serializers.CharField(source='competition.scoring')
+    rank = serializers.IntegerField()
+
+    class Meta:
+        model = PlayerSummary
+        fields = ['competition', 'competition_name', 'scoring', 'participant', 'elo_rating', 'rank', 'points',
+                  'matches_played', 'wins', 'draws', 'losses', 'win_rate', 'current_streak', 'longest_win_streak',
+                  'form', 'last_played_at']
+
+class PlayerProfileSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    username = serializers.CharField()
+    participations = PlayerSummarySerializer(many=True)
+
+class ChangeLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChangeLogEntry
+        fields = ['seq', 'kind', 'object_id', 'action', 'data', 'created_at']
+
+class ChangeFeedSerializer(serializers.Serializer):
+    changes = ChangeLogEntrySerializer(many=True)
+    cursor = serializers.IntegerField()
+    has_more = serializers.BooleanField()
+
+class DeletionStatusSerializer(serializers.ModelSerializer):
+    rows_total = serializers.IntegerField(source='purge_total', allow_null=True)
+    rows_deleted = serializers.IntegerField(source='purged_rows')
+
+    class Meta:
+        model = Competition
+        fields = ['id', 'deleted_at', 'rows_total', 'rows_deleted']
+
+class RatingDecaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RatingDecay
+        fields = ['id', 'created_at', 'inactive_since', 'points', 'floor', 'participant_count', 'reverted_at']
+
+class RatingDecayEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RatingDecayEntry
+        fields = ['participant', 'amount']
+
+class RatingDecayDetailSerializer(RatingDecaySerializer):
+    entries = RatingDecayEntrySerializer(many=True)
+
+    class Meta(RatingDecaySerializer.Meta):
+        fields = RatingDecaySerializer.Meta.fields + ['entries']
+
+class RatingQueueSerializer(serializers.Serializer):
+    pending = serializers.IntegerField()
+    oldest_pending_at = serializers.DateTimeField(allow_null=True)
+    lag_seconds = serializers.FloatField()
+
+class PredictedResultSerializer(serializers.Serializer):
+    participant1 = serializers.IntegerField()
+    participant2 = serializers.IntegerField()
+    winner = serializers.CharField()
+    expected_score1 = serializers.FloatField()
+    participant1_elo_change = serializers.IntegerField()
+    participant2_elo_change = serializers.IntegerField()
+
+class PredictionSerializer(serializers.Serializer):
+    participants = serializers.ListField(child=serializers.IntegerField())
+    ratings = serializers.ListField(child=serializers.IntegerField())
+    expected = serializers.ListField(child=serializers.ListField(child=serializers.FloatField()))
+    results = PredictedResultSerializer(many=True)
+    ratings_after = serializers.DictField(child=serializers.IntegerField())
+
+class ParticipantProjectionSerializer(serializers.Serializer):
+    participant = serializers.IntegerField()
+    elo_rating = serializers.IntegerField()
+    rating_mean = serializers.FloatField()
+    rating_p5 = serializers.FloatField()
+    rating_p50 = serializers.FloatField()
+    rating_p95 = serializers.FloatField()
+    rank_mean = serializers.FloatField()
+    rank_p5 = serializers.FloatField()
+    rank_p50 = serializers.FloatField()
+    rank_p95 = serializers.FloatField()
+    p_first = serializers.FloatField()
+
+class ProjectionSerializer(serializers.Serializer):
+    runs = serializers.IntegerField()
+    remaining_fixtures = serializers.IntegerField()
+    participants = ParticipantProjectionSerializer(many=True)
+
+class DistributionSummarySerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    mean = serializers.FloatField(allow_null=True)
+    std = serializers.FloatField(allow_null=True)
+    min = serializers.IntegerField(allow_null=True)
+    p10 = serializers.IntegerField(allow_null=True)
+    p25 = serializers.IntegerField(allow_null=True)
+    p50 = serializers.IntegerField(allow_null=True)
+    p75 = serializers.IntegerField(allow_null=True)
+    p90 = serializers.IntegerField(allow_null=True)
+    max = serializers.IntegerField(allow_null=True)
+
+class RatingBucketSerializer(serializers.Serializer):
+    min_rating = serializers.IntegerField()
+    max_rating = serializers.IntegerField()
+    count = serializers.IntegerField()
+
+class RatingTierSerializer(serializers.Serializer):
+    top_percent = serializers.FloatField()
+    min_rating = serializers.IntegerField(allow_null=True)
+    participants = serializers.IntegerField()
+
+class RatingChangeCountSerializer(serializers.Serializer):
+    change = serializers.IntegerField()
+    count = serializers.IntegerField()
+
+class WeeklyRatingChangesSerializer(serializers.Serializer):
+    week = serializers.DateField()
+    summary = DistributionSummarySerializer()
+    histogram = RatingChangeCountSerializer(many=True)
+
+class RatingAnalyticsSerializer(serializers.Serializer):
+    summary = DistributionSummarySerializer()
+    bucket_size = serializers.IntegerField()
+    histogram = RatingBucketSerializer(many=True)
+    tiers = RatingTierSerializer(many=True)
+    weekly_changes = WeeklyRatingChangesSerializer(many=True)
+
+class PairingRequestSerializer(serializers.Serializer):
+    avoid_rounds = serializers.IntegerField(default=2, min_value=0)
+    played_at = serializers.DateTimeField(required=False)
+
+class PairingSerializer(serializers.Serializer):
+    participant1 = serializers.IntegerField()
+    participant2 = serializers.IntegerField()
+    rating_gap = serializers.IntegerField()
+    rematch = serializers.BooleanField()
+    match = serializers.IntegerField(required=False)
+
+class PairingRoundSerializer(serializers.Serializer):
+    pairings = PairingSerializer(many=True)
+    bye = serializers.IntegerField(allow_null=True)
+    total_gap = serializers.IntegerField()
+
+class ScheduleRequestSerializer(serializers.Serializer):
+    double = serializers.BooleanField(default=False)
+    start = serializers.DateTimeField(required=False)
+    round_interval = serializers.DurationField(default=timedelta(days=7))
+
+class ScheduleSerializer(serializers.Serializer):
+    rounds = serializers.IntegerField()
+    fixtures = serializers.IntegerField()
+    first_played_at = serializers.DateTimeField(allow_null=True)
+    last_played_at = serializers.DateTimeField(allow_null=True)
+
+class StandingSerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='participant.user.username', read_only=True)
+
+    class Meta:
+        model = Standing
+        fields = ['position', 'participant', 'username', 'points', 'played', 'wins', 'draws', 'losses',
+                  'score_for', 'score_against', 'score_difference']
 
@@ -0,0 +1,216 @@
+"""
+Horizontal sharding of competitions.
+
+Every competition, with everything hanging off it (participants, matches,
+stats, standings, ...), lives on one shard chosen when it is created and
+recorded in the global CompetitionShard lookup table. Users and the lookup
+table stay on the default database; users are copied to every shard so that
+foreign keys and joins to them keep working there.
+
+Requests are routed by ShardMiddleware, which sets the current shard from the
+`competition_id` URL argument, so views, serializers and Match.save need no
+changes. Code running outside a request uses `competition_context()`.
+
+Enable with:
+    COMPETITION_SHARDS = ['default', 'shard1', 'shard2']
+    DATABASE_ROUTERS = ['api.sharding.ShardRouter', ...]
+    MIDDLEWARE += ['api.sharding.ShardMiddleware']
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import JsonResponse
+
+# api models stored on the default database only.
+GLOBAL_MODELS = {'competitionshard'}
+
+_current_shard = contextvars.ContextVar('current_shard', default=None)
+
+
+def shards():
+    return list(getattr(settings, 'COMPETITION_SHARDS', None) or [])
+
+
+def enabled():
+    return bool(shards())
+
+
+def shard_aliases():
+    """Databases to visit for a query spanning all competitions (None: default routing)."""
+    return shards() or [None]
+
+
+def current_shard():
+    """The shard the current request or competition_context() is routed to (None: default routing)."""
+    return _current_shard.get()
+
+
+def choose_shard():
+    return random.choice(shards())
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'api' and model._meta.model_name not in GLOBAL_MODELS
+
+
+def placement_ttl():
+    """Seconds a placement may be cached, so also how long other workers may route on an old one."""
+    return getattr(settings, 'COMPETITION_PLACEMENT_TTL', 60)
+
+
+def _placement_key(competition_id):
+    return f'competition-shard:{competition_id}'
+
+
+def placement(competition_id):
+    """(shard, moving) of a competition, cached briefly unless it is moving."""
+    from api.models import CompetitionShard
+
+    key = _placement_key(competition_id)
+    value = cache.get(key)
+    if value is None:
+        row = CompetitionShard.objects.filter(pk=competition_id).values_list('shard', 'moving').first()
+        # Competitions created before sharding was enabled stay on the default database.
+        value = row or (DEFAULT_DB_ALIAS, False)
+        # A move ends with the competition on another shard, so its placement
+        # is read from the table until then.
+        if not value[1]:
+            cache.set(key, value, timeout=placement_ttl())
+    return value
+
+
+def forget_placement(competition_id):
+    cache.delete(_placement_key(competition_id))
+
+
+def shard_for(competition_id):
+    if not enabled():
+        return None
+    return placement(competition_id)[0]
+
+
+@contextmanager
+def competition_context(competition_id):
+    """Route queries on sharded models to the shard of `competition_id`."""
+    token = _current_shard.set(shard_for(competition_id))
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+@contextmanager
+def shard_context(shard):
+    token = _current_shard.set(shard)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+class ShardRouter:
+    def _db_for(self, model, instance=None):
+        if not enabled() or not is_sharded(model):
+            return None
+        if instance is not None:
+            if instance._state.db is not None:
+                return instance._state.db
+            competition_id = getattr(instance, 'competition_id', None)
+            if competition_id is None and model._meta.model_name == 'competition':
+                competition_id = instance.pk
+            if competition_id is not None:
+                return shard_for(competition_id)
+        return _current_shard.get()
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users are copied to every shard, so cross database relations to them are fine.
+        if enabled():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not enabled():
+            return None
+        if app_label == 'api' and model_name in GLOBAL_MODELS:
+            return db == DEFAULT_DB_ALIAS
+        return db == DEFAULT_DB_ALIAS or db in shards()
+
+
+class ShardMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_shard.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        competition_id = view_kwargs.get('competition_id')
+        if not enabled() or competition_id is None:
+            return None
+
+        shard, moving = placement(competition_id)
+        if moving and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response = JsonResponse(
+                {'detail': 'This competition is being moved, please retry shortly.'}, status=503
+            )
+            response['Retry-After'] = '30'
+            return response
+        _current_shard.set(shard)
+        return None
+
+
+def replicate_user(user, delete=False):
+    """Copy (or delete) a user on every shard besides the default database."""
+    for shard in shards():
+        if shard == DEFAULT_DB_ALIAS:
+            continue
+        if delete:
+            type(user)._base_manager.using(shard).filter(pk=user.pk).delete()
+        else:
+            user.save(using=shard)
+
+
+def sharded_models_in_dependency_order():
+    """api models stored on shards, parents before the models referring to them."""
+    models = [model for model in apps.get_app_config('api').get_models() if is_sharded(model)]
+    ordered = []
+    while models:
+        for model in models:
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if not parents & set(models):
+                ordered.append(model)
+                models.remove(model)
+                break
+    return ordered
+
+
+def competition_rows(model, competition_id):
+    """Queryset of the rows of `model` belonging to a competition."""
+    if model._meta.model_name == 'competition':
+        return model._base_manager.filter(pk=competition_id)
+    field_names = {field.name for field in model._meta.concrete_fields}
+    if 'competition' in field_names:
+        return model._base_manager.filter(competition_id=competition_id)
+    # ParticipantStats only refers to its participant.
+    for field in model._meta.concrete_fields:
+        if field.is_relation and field.related_model._meta.model_name == 'participant':
+            return model._base_manager.filter(**{f'{field.name}__competition_id': competition_id})
+    raise ValueError(f"Don't know how {model.__name__} belongs to a competition")
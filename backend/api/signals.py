@@ -1,8 +1,46 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Participant, ParticipantStats
+from . import changes, sharding
+from .caching import bump_competition_version
+from .models import Competition, Match, Participant, ParticipantStats, PlayerSummary, Standing
 
 @receiver(post_save, sender=Participant)
 def create_participant_stats(sender, instance, created, **kwargs):
     if created:
-        ParticipantStats.objects.create(id=instance)
\ No newline at end of file
+        ParticipantStats.objects.create(id=instance, competition_id=instance.competition_id)
+        Standing.objects.create(participant=instance, competition_id=instance.competition_id)
+        PlayerSummary.objects.create(participant=instance, user_id=instance.user_id,
+                                     competition_id=instance.competition_id, elo_rating=instance.elo_rating)
+
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def invalidate_competition_cache(sender, instance, using, **kwargs):
+    bump_competition_version(instance.competition_id, using=using)
+
+@receiver(post_save, sender=Participant)
+def log_participant_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        changes.record(instance.competition_id, 'participant', instance.pk, 'create' if created else 'update',
+                       changes.participant_data(instance))
+
+@receiver(post_delete, sender=Participant)
+@receiver(post_delete, sender=Match)
+def log_deletion(sender, instance, origin=None, **kwargs):
+    # Nothing to log when the whole competition goes (deleted as an instance or a queryset).
+    if not isinstance(origin, Competition) and getattr(origin, 'model', None) is not Competition:
+        changes.record(instance.competition_id, sender._meta.model_name, instance.pk, 'delete')
+
+@receiver(post_save, sender=User)
+def replicate_user(sender, instance, using, raw=False, **kwargs):
+    # Users live on the default database and are copied to every shard.
+    if using == DEFAULT_DB_ALIAS and not raw:
+        sharding.replicate_user(instance)
+
+@receiver(post_delete, sender=User)
+def delete_replicated_user(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        sharding.replicate_user(instance, delete=True)
@@ -0,0 +1,71 @@
+"""
+Monte Carlo projection of the remaining fixtures of a competition.
+
+Every fixture is decided with the Elo win probability of the ratings at that
+point of the simulated season (draws are not simulated), and ratings are
+updated exactly like Match.update_elo_ratings does. All runs are simulated at
+once: the state is an (n participants x runs) rating array and each fixture
+is a handful of vectorized operations over its two rows.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from api.elo import K_FACTOR
+
+
+def simulate_final_ratings(ratings, fixtures, runs, seed=None, k=K_FACTOR):
+    """
+    ratings: (n,) current ratings, fixtures: (m, 2) participant indices in
+    the order the fixtures are played. Returns the final ratings, (n, runs).
+    """
+    rng = np.random.default_rng(seed)
+    current = np.repeat(np.asarray(ratings, dtype=np.float64)[:, np.newaxis], runs, axis=1)
+
+    for a, b in fixtures:
+        rating_a, rating_b = current[a], current[b]
+        expected_a = 1.0 / (1.0 + 10.0 ** ((rating_b - rating_a) / 400.0))
+        expected_b = 1.0 / (1.0 + 10.0 ** ((rating_a - rating_b) / 400.0))
+        a_wins = rng.random(runs) < expected_a
+        current[a] += np.round(k * (a_wins - expected_a))
+        current[b] += np.round(k * (~a_wins - expected_b))
+
+    return current.astype(np.int32)
+
+
+def _simulate_chunk(args):
+    return simulate_final_ratings(*args)
+
+
+def simulate_parallel(ratings, fixtures, runs, seed=None, workers=None, k=K_FACTOR):
+    """Split the runs over a process pool, each chunk with an independent random stream."""
+    workers = workers or 1
+    chunk_sizes = [len(chunk) for chunk in np.array_split(np.arange(runs), workers) if len(chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    jobs = [(ratings, fixtures, size, chunk_seed, k) for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        return np.concatenate(list(pool.map(_simulate_chunk, jobs)), axis=1)
+
+
+def summarize(final_ratings):
+    """Per participant rating and rank distribution of the simulated seasons."""
+    runs = final_ratings.shape[1]
+    # rank 1 is the highest rating of a run
+    order = np.argsort(-final_ratings, axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, final_ratings.shape[0] + 1)[:, np.newaxis], axis=0)
+
+    rating_percentiles = np.percentile(final_ratings, [5, 50, 95], axis=1)
+    rank_percentiles = np.percentile(ranks, [5, 50, 95], axis=1)
+    return {
+        'rating_mean': final_ratings.mean(axis=1),
+        'rating_p5': rating_percentiles[0],
+        'rating_p50': rating_percentiles[1],
+        'rating_p95': rating_percentiles[2],
+        'rank_mean': ranks.mean(axis=1),
+        'rank_p5': rank_percentiles[0],
+        'rank_p50': rank_percentiles[1],
+        'rank_p95': rank_percentiles[2],
+        'p_first': (ranks == 1).sum(axis=1) / runs,
+    }
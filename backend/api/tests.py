@@ -1,10 +1,32 @@
 from django.urls import reverse
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APITransactionTestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Competition, Participant, Match
+from .models import ChangeLogEntry, Competition, CompetitionShard, Participant, Match, MatchArchive, ParticipantStats, PlayerSummary, RatingTask, Standing
 from django.utils import timezone
+from django.core.management import call_command
+from io import StringIO
+from rest_framework.renderers import JSONRenderer
+from .serializers import MatchSerializer, ParticipantSerializer
+from .renderers import msgpack
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from .queries import competition_summaries
+from .query_plans import check_plan
+from . import simulation
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections
+from django.http import HttpResponse
+from .routers import ReplicaPinningMiddleware, ReplicaRouter
+from . import decay, schema, sharding
+from django.conf import settings
+from django.core.management.base import CommandError
 
 User = get_user_model()
 
@@ -532,3 +554,1542 @@ class UpdateDeleteCompetitions(APITestCase):
         self.assertEqual(resp.status_code, 403)
 
 
+class DeferredRatingTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1, deferred_ratings=True)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+
+        played_at = timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0))
+        Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                             played_at=played_at)
+
+    def test_result_is_queued(self):
+        response = self.client.put('/api/competitions/1/matches/1/', {'winner': "1"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['rating_pending'])
+
+        # ratings are untouched until the worker runs
+        self.assertEqual(Participant.objects.get(id=self.part1_1.id).elo_rating, 1200)
+
+        response = self.client.get('/api/competitions/1/rating-queue/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pending'], 1)
+
+    def test_worker_applies_results_in_order(self):
+        url = '/api/competitions/1/matches/1/'
+        self.client.put(url, {'winner': "1"}, format='json')
+        self.client.put(url, {'winner': "2"}, format='json')
+
+        call_command('rating_worker', '--once', '--workers', '1', stdout=StringIO())
+
+        self.assertEqual(RatingTask.objects.count(), 0)
+        self.assertLess(Participant.objects.get(id=self.part1_1.id).elo_rating, 1200)
+        self.assertGreater(Participant.objects.get(id=self.part2_1.id).elo_rating, 1200)
+
+        response = self.client.get(url)
+        self.assertFalse(response.data['rating_pending'])
+
+        response = self.client.get('/api/competitions/1/stats/2/')
+        self.assertEqual(response.data['wins'], 1)
+        self.assertEqual(response.data['matches_played'], 1)
+
+    def test_batch_with_shared_participants(self):
+        user3 = User.objects.create_user(username='user3', password='testpass123')
+        part3_1 = Participant.objects.create(user=user3, competition=self.comp1)
+        synchronous = Competition.objects.create(name='Synchronous', created_by=self.user1)
+        players = [Participant.objects.create(user=user, competition=synchronous)
+                   for user in (self.user1, self.user2, user3)]
+
+        played_at = timezone.make_aware(timezone.datetime(2023, 10, 2, 14, 0, 0))
+        results = [(0, 1, "1"), (0, 2, "1"), (1, 2, "draw"), (0, 1, "2")]
+        for competition, participants in ((self.comp1, [self.part1_1, self.part2_1, part3_1]), (synchronous, players)):
+            for participant1, participant2, winner in results:
+                Match.objects.create(competition=competition, participant1=participants[participant1],
+                                     participant2=participants[participant2], played_at=played_at, winner=winner)
+        # A corrected result is reversed with the Elo changes applied earlier in the same batch.
+        for competition in (self.comp1, synchronous):
+            match = Match.objects.filter(competition=competition).order_by('id').last()
+            match.winner = "1"
+            match.save()
+
+        call_command('rating_worker', '--once', '--workers', '1', stdout=StringIO())
+        self.assertEqual(
+            [participant.elo_rating for participant in Participant.objects.filter(competition=self.comp1).order_by('id')],
+            [participant.elo_rating for participant in Participant.objects.filter(competition=synchronous).order_by('id')]
+        )
+        self.assertEqual(ParticipantStats.objects.get(id=self.part1_1).wins, 3)
+
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='us\u00e9r2', password='testpass123')
+
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+
+        Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                             played_at=timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0)))
+        Match.objects.create(competition=self.comp1, participant1=self.part2_1, participant2=self.part1_1,
+                             played_at=timezone.make_aware(timezone.datetime(2023, 10, 2, 9, 30, 15, 123456)),
+                             winner="2")
+
+    def test_match_list_matches_serializer_output(self):
+        response = self.client.get('/api/competitions/1/matches/', HTTP_ACCEPT='application/json')
+        expected = JSONRenderer().render(MatchSerializer(Match.objects.filter(competition=self.comp1), many=True).data)
+        self.assertEqual(response.content, expected)
+
+    def test_participant_list_matches_serializer_output(self):
+        response = self.client.get('/api/competitions/1/participants/', HTTP_ACCEPT='application/json')
+        expected = JSONRenderer().render(
+            ParticipantSerializer(Participant.objects.filter(competition=self.comp1), many=True).data
+        )
+        self.assertEqual(response.content, expected)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/competitions/1/matches/?fields=winner,id')
+        self.assertEqual(response.json(), [{'id': 1, 'winner': 'not_played'}, {'id': 2, 'winner': '2'}])
+        response = self.client.get('/api/competitions/1/matches/?fields=id,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expand_participants(self):
+        # user, competition, permission check, then a single joined query for the matches
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/competitions/1/matches/?fields=id,participant1,participant2'
+                                       '&expand=participant1.user,participant2&include_archived=false')
+        self.assertEqual(response.json()[0], {
+            'id': 1,
+            'participant1': {'id': self.part1_1.id, 'user': {'id': self.user1.id, 'username': 'user1'},
+                             'competition': 1, 'elo_rating': 1216},
+            'participant2': {'id': self.part2_1.id, 'user': self.user2.id, 'competition': 1, 'elo_rating': 1184},
+        })
+        response = self.client.get('/api/competitions/1/participants/?fields=id,user&expand=user')
+        self.assertEqual(response.json()[1], {'id': self.part2_1.id, 'user': {'id': self.user2.id, 'username': 'us\u00e9r2'}})
+
+    def test_expand_archived_matches(self):
+        url = '/api/competitions/1/matches/?expand=participant1.user,participant2'
+        before = self.client.get(url).json()
+        call_command('archive_matches', stdout=StringIO())
+        self.assertEqual(MatchArchive.objects.count(), 1)
+        self.assertEqual(sorted(self.client.get(url).json(), key=lambda match: match['id']), before)
+
+    def test_expand_archived_deleted_participant(self):
+        call_command('archive_matches', stdout=StringIO())
+        deleted_id = self.part2_1.id
+        self.part2_1.delete()
+
+        response = self.client.get('/api/competitions/1/matches/?expand=participant1,participant2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the unplayed match wasn't archived and went with the participant
+        [match] = response.json()
+        self.assertEqual(match['participant1'], deleted_id)
+        self.assertEqual(match['participant2']['id'], self.part1_1.id)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_match_list_msgpack(self):
+        response = self.client.get('/api/competitions/1/matches/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data, self.client.get('/api/competitions/1/matches/', HTTP_ACCEPT='application/json').json())
+
+
+class MyCompetitionsTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.user3 = User.objects.create_user(username='user3', password='testpass123')
+
+        refresh2 = RefreshToken.for_user(self.user2)
+        self.client2 = APIClient()
+        self.client2.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh2.access_token}')
+
+        # user2 owns comp2 and plays in comp1
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.comp2 = Competition.objects.create(name='Competition 2', created_by=self.user2)
+        self.comp3 = Competition.objects.create(name='Competition 3', created_by=self.user3)
+
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.part3_1 = Participant.objects.create(user=self.user3, competition=self.comp1)
+
+        played_at = timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0))
+        Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                             played_at=played_at, winner="1")
+        Match.objects.create(competition=self.comp1, participant1=self.part3_1, participant2=self.part2_1,
+                             played_at=played_at)
+
+    def test_list_my_competitions(self):
+        response = self.client2.get('/api/competitions/mine/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.data], [self.comp1.id, self.comp2.id])
+
+        comp1 = response.data[0]
+        self.assertEqual(comp1['participant_count'], 3)
+        self.assertEqual(comp1['match_count'], 2)
+        self.assertIsNotNone(comp1['last_activity'])
+        self.assertEqual(comp1['my_participant'], self.part2_1.id)
+        self.assertLess(comp1['my_rating'], 1200)
+        self.assertEqual(comp1['my_rank'], 3)
+        self.assertEqual(comp1['leader']['participant'], self.part1_1.id)
+        self.assertEqual(comp1['leader']['username'], 'user1')
+
+        comp2 = response.data[1]
+        self.assertEqual(comp2['participant_count'], 0)
+        self.assertIsNone(comp2['my_rank'])
+        self.assertIsNone(comp2['leader'])
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            list(competition_summaries(self.user2))
+
+
+class PredictionTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.user3 = User.objects.create_user(username='user3', password='testpass123')
+
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1, elo_rating=1400)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.part3_1 = Participant.objects.create(user=self.user3, competition=self.comp1, elo_rating=1000)
+
+    def test_expected_matrix(self):
+        response = self.client.get('/api/competitions/1/predictions/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['participants'], [1, 2, 3])
+        self.assertEqual(data['ratings'], [1400, 1200, 1000])
+        expected = data['expected']
+        self.assertEqual(expected[0][0], 0.5)
+        self.assertGreater(expected[0][1], 0.5)
+        self.assertAlmostEqual(expected[0][2] + expected[2][0], 1, places=3)
+
+    def test_preview_results_does_not_write(self):
+        response = self.client.get('/api/competitions/1/predictions/?participants=2,3&results=3-1-1,3-2-draw')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['expected']), 2)
+        self.assertEqual(data['results'][0]['participant1_elo_change'], 29)
+        self.assertEqual(data['results'][0]['participant2_elo_change'], -29)
+        self.assertEqual(data['ratings_after']['3'], 1000 + 29 + data['results'][1]['participant1_elo_change'])
+
+        self.assertEqual(Participant.objects.get(id=3).elo_rating, 1000)
+        self.assertEqual(Match.objects.count(), 0)
+
+    def test_unknown_participant(self):
+        response = self.client.get('/api/competitions/1/predictions/?participants=1,99')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProjectionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.user3 = User.objects.create_user(username='user3', password='testpass123')
+
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1, elo_rating=1600)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.part3_1 = Participant.objects.create(user=self.user3, competition=self.comp1)
+
+        played_at = timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0))
+        self.match = Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                                          played_at=played_at)
+        Match.objects.create(competition=self.comp1, participant1=self.part2_1, participant2=self.part3_1,
+                             played_at=played_at)
+
+    def test_projection(self):
+        response = self.client.get('/api/competitions/1/projection/?runs=2000&seed=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['remaining_fixtures'], 2)
+
+        participants = response.data['participants']
+        self.assertEqual(participants[0]['participant'], self.part1_1.id)
+        self.assertAlmostEqual(sum(p['p_first'] for p in participants), 1.0, places=4)
+        for p in participants:
+            self.assertLessEqual(p['rating_p5'], p['rating_p95'])
+
+    def test_projection_cached_until_match_change(self):
+        url = '/api/competitions/1/projection/?runs=500'
+        first = self.client.get(url).data
+        self.assertEqual(self.client.get(url).data, first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.winner = "1"
+            self.match.save()
+
+        self.assertEqual(self.client.get(url).data['remaining_fixtures'], 1)
+
+    def test_parallel_simulation(self):
+        final_ratings = simulation.simulate_parallel([1200, 1300], [(0, 1), (1, 0)], runs=100, seed=3, workers=2)
+        self.assertEqual(final_ratings.shape, (2, 100))
+        # Elo is zero-sum within a match
+        self.assertTrue((final_ratings.sum(axis=0) == 2500).all())
+
+
+class PairingTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(1, 6)]
+
+        refresh = RefreshToken.for_user(self.users[0])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        refresh2 = RefreshToken.for_user(self.users[1])
+        self.client2 = APIClient()
+        self.client2.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh2.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.users[0])
+        # ratings 1400, 1300, 1200, 1100, 1000
+        self.parts = [
+            Participant.objects.create(user=user, competition=self.comp1, elo_rating=1400 - 100 * i)
+            for i, user in enumerate(self.users)
+        ]
+
+    def test_propose_pairings(self):
+        response = self.client2.get('/api/competitions/1/pairings/')
+        self.assertEqual(response.status_code, 200)
+        pairs = [(p['participant1'], p['participant2']) for p in response.data['pairings']]
+        self.assertEqual(pairs, [(1, 2), (3, 4)])
+        self.assertEqual(response.data['bye'], 5)
+        self.assertEqual(response.data['total_gap'], 200)
+        self.assertEqual(Match.objects.count(), 0)
+
+    def test_avoid_rematch(self):
+        played_at = timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0))
+        Match.objects.create(competition=self.comp1, participant1=self.parts[0], participant2=self.parts[1],
+                             played_at=played_at)
+
+        response = self.client.get('/api/competitions/1/pairings/')
+        pairs = [(p['participant1'], p['participant2']) for p in response.data['pairings']]
+        self.assertEqual(pairs, [(1, 3), (2, 4)])
+        self.assertFalse(any(p['rematch'] for p in response.data['pairings']))
+
+    def test_create_pairings(self):
+        response = self.client.post('/api/competitions/1/pairings/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Match.objects.filter(competition=self.comp1, winner="not_played").count(), 2)
+        self.assertEqual(Match.objects.get(id=response.data['pairings'][0]['match']).participant1_id, 1)
+
+    @override_settings(THROTTLE_EXEMPT_USERS=['user1'])
+    def test_bye_rotates(self):
+        byes = []
+        for day in range(1, 7):
+            response = self.client.post('/api/competitions/1/pairings/',
+                                        {'played_at': f'2024-01-0{day}T10:00:00Z'}, format='json')
+            byes.append(response.data['bye'])
+        # proposals don't count as a bye
+        self.assertEqual(self.client.get('/api/competitions/1/pairings/').data['bye'], 4)
+
+        # lowest rated first, everyone once, then round again
+        self.assertEqual(byes, [5, 4, 3, 2, 1, 5])
+        self.assertEqual(Participant.objects.get(pk=5).byes, 2)
+
+    def test_created_match_ids(self):
+        response = self.client.post('/api/competitions/1/pairings/', {}, format='json')
+        created = [(p['match'], p['participant1'], p['participant2']) for p in response.data['pairings']]
+        self.assertEqual(created, list(Match.objects.order_by('id').values_list('id', 'participant1_id', 'participant2_id')))
+
+        # databases without INSERT ... RETURNING read the new ids back
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post('/api/competitions/1/pairings/', {'avoid_rounds': 0}, format='json')
+        created = [(p['match'], p['participant1'], p['participant2']) for p in response.data['pairings']]
+        self.assertEqual(created, list(Match.objects.order_by('id').values_list('id', 'participant1_id', 'participant2_id')[2:]))
+
+    def test_create_pairings_non_owner(self):
+        response = self.client2.post('/api/competitions/1/pairings/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ScheduleTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(1, 6)]
+
+        refresh = RefreshToken.for_user(self.users[0])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        refresh2 = RefreshToken.for_user(self.users[1])
+        self.client2 = APIClient()
+        self.client2.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh2.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.users[0])
+        for user in self.users:
+            Participant.objects.create(user=user, competition=self.comp1)
+
+    def test_round_robin(self):
+        data = {'start': '2024-01-01T10:00:00Z', 'round_interval': '1 00:00:00'}
+        response = self.client.post('/api/competitions/1/schedule/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['rounds'], 5)
+        self.assertEqual(response.data['fixtures'], 10)
+        self.assertEqual(response.data['last_played_at'], '2024-01-05T10:00:00Z')
+
+        pairs = {frozenset(p) for p in Match.objects.values_list('participant1_id', 'participant2_id')}
+        self.assertEqual(len(pairs), 10)
+        self.assertFalse(Match.objects.exclude(winner="not_played").exists())
+
+        # one change log entry for the whole schedule
+        logged = ChangeLogEntry.objects.get(competition=self.comp1, kind='schedule')
+        self.assertEqual((logged.kind, logged.data['matches']), ('schedule', 10))
+        self.assertEqual(logged.data['last_played_at'], '2024-01-05T10:00:00Z')
+
+    def test_double_round_robin(self):
+        response = self.client.post('/api/competitions/1/schedule/', {'double': True}, format='json')
+        self.assertEqual(response.data['fixtures'], 20)
+        self.assertEqual(Match.objects.count(), 20)
+
+    def test_fixture_creation_budget(self):
+        # the full size league; the open event is smaller than the default 50,000 to keep the suite fast
+        output = StringIO()
+        call_command('benchmark_fixtures', '--open', '5000', stdout=output)
+        self.assertIn('schedule  x200', output.getvalue())
+
+    def test_schedule_non_owner(self):
+        response = self.client2.post('/api/competitions/1/schedule/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StandingsTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(1, 4)]
+
+        refresh = RefreshToken.for_user(self.users[0])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.users[0], scoring="points")
+        self.parts = [Participant.objects.create(user=user, competition=self.comp1) for user in self.users]
+
+        self.played_at = timezone.make_aware(timezone.datetime(2023, 10, 1, 14, 0, 0))
+
+    def play(self, participant1, participant2, winner, score1=None, score2=None):
+        return Match.objects.create(competition=self.comp1, participant1=participant1, participant2=participant2,
+                                    played_at=self.played_at, winner=winner,
+                                    participant1_score=score1, participant2_score=score2)
+
+    def test_points_table(self):
+        self.play(self.parts[0], self.parts[1], "1", 3, 1)
+        self.play(self.parts[1], self.parts[2], "draw", 2, 2)
+
+        response = self.client.get('/api/competitions/1/standings/')
+        self.assertEqual(response.status_code, 200)
+        table = [(row['participant'], row['points']) for row in response.data]
+        self.assertEqual(table, [(1, 3), (3, 1), (2, 1)])  # 3 ahead of 2 on score difference
+        self.assertEqual(response.data[0]['score_difference'], 2)
+        self.assertEqual(response.data[0]['position'], 1)
+
+    def test_head_to_head(self):
+        self.comp1.tiebreakers = "head_to_head,wins"
+        self.comp1.save()
+        self.play(self.parts[2], self.parts[1], "1")
+        self.play(self.parts[1], self.parts[0], "1")
+        self.play(self.parts[0], self.parts[2], "1")
+        self.play(self.parts[1], self.parts[2], "1")
+        self.play(self.parts[0], self.parts[1], "draw")
+        self.play(self.parts[2], self.parts[0], "draw")
+
+        # 1: 3+1+1 = 5, 2: 3+3+1 = 7, 3: 3+1 = 4
+        response = self.client.get('/api/competitions/1/standings/')
+        self.assertEqual([row['participant'] for row in response.data], [2, 1, 3])
+
+    def test_head_to_head_includes_archived_matches(self):
+        self.comp1.tiebreakers = "head_to_head,wins"
+        self.comp1.save()
+        self.play(self.parts[1], self.parts[0], "1")
+        self.play(self.parts[0], self.parts[2], "1")
+
+        # 1 and 2 are level on points and wins, 2 won their match
+        before = [row['participant'] for row in self.client.get('/api/competitions/1/standings/').data]
+        self.assertEqual(before, [2, 1, 3])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_matches', '1', stdout=StringIO())
+        self.assertFalse(Match.objects.exists())
+        after = [row['participant'] for row in self.client.get('/api/competitions/1/standings/').data]
+        self.assertEqual(after, before)
+
+    def test_deleted_match_leaves_standings(self):
+        self.play(self.parts[0], self.parts[1], "1", 3, 1)
+        deleted = self.play(self.parts[1], self.parts[2], "2", 0, 2)
+        self.play(self.parts[2], self.parts[0], "draw", 1, 1)
+        self.play(self.parts[0], self.parts[2], "not_played")
+
+        response = self.client.delete(f'/api/competitions/1/matches/{deleted.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # the same as replaying the remaining matches
+        columns = ('played', 'wins', 'draws', 'losses', 'points', 'score_for', 'score_against', 'score_difference')
+        expected = {participant.id: dict.fromkeys(columns, 0) for participant in self.parts}
+        for match in Match.objects.select_related('competition'):
+            deltas = match.standing_deltas(match.winner, (match.participant1_score, match.participant2_score), 1)
+            for participant_id, delta in zip((match.participant1_id, match.participant2_id), deltas):
+                for name, value in delta.items():
+                    expected[participant_id][name] += value
+        self.assertEqual({standing.participant_id: {name: getattr(standing, name) for name in columns}
+                          for standing in Standing.objects.all()}, expected)
+
+        stats = ParticipantStats.objects.get(id=self.parts[2])
+        self.assertEqual((stats.matches_played, stats.wins, stats.draws, stats.form), (1, 0, 1, "D"))
+        self.assertEqual(PlayerSummary.objects.get(participant=self.parts[2]).points, 1)
+
+    def test_result_change_updates_standings(self):
+        match = self.play(self.parts[0], self.parts[1], "1", 2, 0)
+        self.client.put(f'/api/competitions/1/matches/{match.id}/',
+                        {'winner': "2", 'participant1_score': 0, 'participant2_score': 1}, format='json')
+
+        standing1 = Standing.objects.get(participant=self.parts[0])
+        standing2 = Standing.objects.get(participant=self.parts[1])
+        self.assertEqual((standing1.points, standing1.wins, standing1.losses, standing1.score_difference), (0, 0, 1, -1))
+        self.assertEqual((standing2.points, standing2.wins, standing2.played, standing2.score_for), (3, 1, 1, 1))
+
+    def test_point_values_recomputed(self):
+        self.play(self.parts[0], self.parts[1], "1")
+        self.play(self.parts[0], self.parts[2], "draw")
+        response = self.client.put('/api/competitions/1/', {'points_win': 2, 'points_draw': 1}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Standing.objects.get(participant=self.parts[0]).points, 3)
+
+    def test_invalid_tiebreaker(self):
+        response = self.client.put('/api/competitions/1/', {'tiebreakers': 'coin_toss'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_my_competitions_points_leader(self):
+        self.play(self.parts[1], self.parts[0], "1")
+        response = self.client.get('/api/competitions/mine/')
+        self.assertEqual(response.data[0]['leader']['participant'], self.parts[1].id)
+        self.assertEqual(response.data[0]['leader']['points'], 3)
+        self.assertEqual(response.data[0]['my_rank'], 2)
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+
+        for day, winner in ((1, "1"), (2, "draw"), (3, "2"), (4, "not_played")):
+            Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                                 played_at=timezone.make_aware(timezone.datetime(2023, 10, day, 14, 0, 0)),
+                                 winner=winner, participant1_score=day)
+
+    def test_archive_keeps_history(self):
+        before = self.client.get('/api/competitions/1/matches/').json()
+
+        call_command('archive_matches', '1', '--before', '2023-10-03', '--chunk-size', '1', stdout=StringIO())
+
+        self.assertEqual(Match.objects.count(), 2)
+        self.assertEqual(MatchArchive.objects.count(), 2)
+        self.assertEqual(MatchArchive.objects.order_by('id')[0].summary[str(self.part1_1.id)]['wins'], 1)
+
+        # history reads are unchanged, the hot table only has the recent matches
+        after = self.client.get('/api/competitions/1/matches/').json()
+        self.assertEqual(sorted(after, key=lambda m: m['id']), before)
+        response = self.client.get('/api/competitions/1/matches/?include_archived=false')
+        self.assertEqual(len(response.json()), 2)
+
+        # stats don't depend on the archived rows
+        self.assertEqual(ParticipantStats.objects.get(id=self.part1_1).matches_played, 3)
+
+    def test_unplayed_matches_stay_hot(self):
+        call_command('archive_matches', stdout=StringIO())
+        self.assertEqual(list(Match.objects.values_list('winner', flat=True)), ["not_played"])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=30)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, method, status_code=200, **extra):
+        seen = {}
+
+        def view(request):
+            seen['read'] = self.router.db_for_read(Match)
+            seen['write'] = self.router.db_for_write(Match)
+            return HttpResponse(status=status_code)
+
+        request = getattr(self.factory, method)('/api/competitions/1/matches/', **extra)
+        ReplicaPinningMiddleware(view)(request)
+        return seen
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.route('get', HTTP_AUTHORIZATION='Bearer a'), {'read': 'replica', 'write': 'default'})
+
+    def test_writes_use_primary(self):
+        self.assertEqual(self.route('post', HTTP_AUTHORIZATION='Bearer a'), {'read': None, 'write': 'default'})
+
+    def test_read_your_writes(self):
+        self.route('post', HTTP_AUTHORIZATION='Bearer a')
+        self.assertIsNone(self.route('get', HTTP_AUTHORIZATION='Bearer a')['read'])
+        # other clients are not pinned
+        self.assertEqual(self.route('get', HTTP_AUTHORIZATION='Bearer b')['read'], 'replica')
+
+    def test_failed_write_does_not_pin(self):
+        self.route('post', status_code=400, HTTP_AUTHORIZATION='Bearer a')
+        self.assertEqual(self.route('get', HTTP_AUTHORIZATION='Bearer a')['read'], 'replica')
+
+    def test_outside_requests_use_primary(self):
+        self.assertIsNone(self.router.db_for_read(Match))
+        self.assertFalse(self.router.allow_migrate('replica', 'api'))
+
+
+@unittest.skipUnless(settings.DATABASES.get('replica', {}).get('TEST', {}).get('MIRROR') == 'default',
+                     "needs a database aliased replica with TEST: {'MIRROR': 'default'}")
+@override_settings(DATABASE_ROUTERS=['api.routers.ReplicaRouter'],
+                   MIDDLEWARE=settings.MIDDLEWARE + ['api.routers.ReplicaPinningMiddleware'],
+                   DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=30)
+class ReplicaMirrorTests(APITransactionTestCase):
+    # committed rows, the replica connection can't see the primary's test transaction
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.url = f'/api/competitions/{self.comp1.id}/matches/'
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user1).access_token}')
+
+    def request(self, method, *args, **kwargs):
+        """The response and the queries it ran on the primary and on the replica."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(*args, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_routing(self):
+        response, primary, replica = self.request('get', self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((primary, replica > 0), (0, True))
+
+        response, primary, replica = self.request('post', self.url, {
+            'participant1': self.part1_1.id, 'participant2': self.part2_1.id, 'winner': '1',
+            'played_at': '2023-10-01T14:00:00Z',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((primary > 0, replica), (True, 0))
+
+        # pinned to the primary after the write, the new match is read back from there
+        response, primary, replica = self.request('get', self.url)
+        self.assertEqual((primary > 0, replica), (True, 0))
+        self.assertEqual(len(response.json()), 1)
+
+
+
+@override_settings(COMPETITION_SHARDS=['default'])
+class ShardingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='testpass123')
+        refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.factory = RequestFactory()
+
+    def test_new_competition_is_placed_on_a_shard(self):
+        response = self.client.post('/api/competitions/', {'name': 'Sharded'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CompetitionShard.objects.get(pk=response.data['id']).shard, 'default')
+        self.assertEqual(sharding.shard_for(response.data['id']), 'default')
+
+    def test_moving_competition_refuses_writes(self):
+        competition = Competition.objects.create(name='Moving', created_by=self.user)
+        CompetitionShard.objects.filter(pk=competition.pk).update(moving=True)
+        middleware = sharding.ShardMiddleware(lambda request: HttpResponse())
+
+        response = middleware.process_view(self.factory.post('/'), None, (), {'competition_id': competition.pk})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertIsNone(middleware.process_view(self.factory.get('/'), None, (), {'competition_id': competition.pk}))
+
+    def test_move_to_same_shard_is_rejected(self):
+        competition = Competition.objects.create(name='Staying', created_by=self.user)
+        with self.assertRaises(CommandError):
+            call_command('move_competition', competition.pk, 'default', stdout=StringIO())
+
+    def test_rows_are_copied_parents_first(self):
+        order = sharding.sharded_models_in_dependency_order()
+        self.assertEqual(order[0], Competition)
+        self.assertLess(order.index(Participant), order.index(Match))
+        self.assertLess(order.index(Match), order.index(RatingTask))
+        self.assertNotIn(CompetitionShard, order)
+
+        competition = Competition.objects.create(name='Rows', created_by=self.user)
+        participant = Participant.objects.create(user=self.user, competition=competition)
+        self.assertEqual(list(sharding.competition_rows(ParticipantStats, competition.pk)),
+                         [ParticipantStats.objects.get(id=participant)])
+
+    def test_lookup_table_stays_on_default_database(self):
+        router = sharding.ShardRouter()
+        self.assertFalse(router.allow_migrate('shard1', 'api', 'competitionshard'))
+        self.assertTrue(router.allow_migrate('default', 'api', 'competitionshard'))
+
+
+@unittest.skipUnless('shard1' in settings.DATABASES, "needs a second database aliased shard1")
+@override_settings(COMPETITION_SHARDS=['default', 'shard1'], DATABASE_ROUTERS=['api.sharding.ShardRouter'],
+                   MIDDLEWARE=[name for name in settings.MIDDLEWARE if name != 'api.sharding.ShardMiddleware']
+                   + ['api.sharding.ShardMiddleware'])
+class ShardMoveTests(APITestCase):
+    # the test runner sets up every database listed here, even for skipped tests
+    databases = {'default', 'shard1'} & set(settings.DATABASES)
+
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def create_competition(self):
+        competition = self.client.post('/api/competitions/', {'name': 'Moved'}, format='json').data['id']
+        for username in ('user1', 'user2'):
+            self.client.post(f'/api/competitions/{competition}/participants/', {'username': username}, format='json')
+        participants = [row['id'] for row in self.client.get(f'/api/competitions/{competition}/participants/').json()]
+        self.client.post(f'/api/competitions/{competition}/matches/', {
+            'participant1': participants[0], 'participant2': participants[1], 'winner': '1',
+            'played_at': '2023-10-01T14:00:00Z',
+        }, format='json')
+        return competition
+
+    @override_settings(COMPETITION_PLACEMENT_TTL=0)
+    def test_move_competition(self):
+        competition = self.create_competition()
+        source = sharding.shard_for(competition)
+        target = 'shard1' if source == 'default' else 'default'
+        participants = self.client.get(f'/api/competitions/{competition}/participants/').json()
+
+        call_command('move_competition', competition, target, '--grace', '0', '--renumber', stdout=StringIO())
+
+        self.assertEqual(sharding.shard_for(competition), target)
+        for model in sharding.sharded_models_in_dependency_order():
+            self.assertFalse(sharding.competition_rows(model, competition).using(source).exists(), model)
+        moved = self.client.get(f'/api/competitions/{competition}/participants/').json()
+        self.assertEqual([row['elo_rating'] for row in moved], [row['elo_rating'] for row in participants])
+        matches = self.client.get(f'/api/competitions/{competition}/matches/').json()
+        self.assertEqual([matches[0]['participant1'], matches[0]['participant2']], [row['id'] for row in moved])
+
+    def test_grace_covers_placement_cache(self):
+        competition = self.create_competition()
+        target = 'shard1' if sharding.shard_for(competition) == 'default' else 'default'
+        with self.assertRaisesMessage(CommandError, "at least the placement cache TTL (60s)"):
+            call_command('move_competition', competition, target, '--grace', '5', stdout=StringIO())
+
+    def test_moving_placement_not_cached(self):
+        competition = self.create_competition()
+        CompetitionShard.objects.filter(pk=competition).update(moving=True)
+        sharding.forget_placement(competition)
+        self.assertTrue(sharding.placement(competition)[1])
+
+        CompetitionShard.objects.filter(pk=competition).update(moving=False)
+        self.assertFalse(sharding.placement(competition)[1])
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        refresh = RefreshToken.for_user(self.user1)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.url = f'/api/competitions/{self.comp1.id}/matches/'
+        self.data = {'participant1': self.part1_1.id, 'participant2': self.part2_1.id, 'winner': '1',
+                     'played_at': '2023-10-01T14:00:00Z'}
+
+    def test_retried_post_is_applied_once(self):
+        first = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        retry = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Match.objects.count(), 1)
+        self.part1_1.refresh_from_db()
+        self.assertEqual(self.part1_1.elo_rating, 1216)
+
+    def test_new_key_creates_new_match(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='def')
+        self.client.post(self.url, self.data, format='json')
+        self.assertEqual(Match.objects.count(), 3)
+
+    def test_reused_key_with_other_payload(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(self.url, {**self.data, 'winner': '2'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Match.objects.count(), 1)
+
+    def test_request_in_progress(self):
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        cache.clear()
+        with mock.patch('api.idempotency.cache.add', return_value=False):
+            response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Match.objects.count(), 1)
+
+    def test_expired_lock_taken_over_is_kept(self):
+        add = cache.add
+        locks = []
+
+        def add_then_expire(key, value, timeout):
+            added = add(key, value, timeout=timeout)
+            # the lock expires while the view runs and a retry takes it
+            cache.set(key, 'retry', timeout=timeout)
+            locks.append(key)
+            return added
+
+        with mock.patch('api.idempotency.cache.add', side_effect=add_then_expire):
+            response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(cache.get(locks[0]), 'retry')
+
+
+class WriteThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.url = f'/api/competitions/{self.comp1.id}/matches/'
+        self.data = {'participant1': self.part1_1.id, 'participant2': self.part2_1.id, 'winner': '1',
+                     'played_at': '2023-10-01T14:00:00Z'}
+
+    def post_matches(self, user, count):
+        client = APIClient()
+        client.force_authenticate(user)
+        return [client.post(self.url, self.data, format='json') for _ in range(count)]
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '3/min', 'user_writes': '100/min'}})
+    def test_competition_bucket_is_shared(self):
+        responses = self.post_matches(self.user1, 2) + self.post_matches(self.user2, 2)
+        self.assertEqual([response.status_code for response in responses], [201, 201, 201, 429])
+        self.assertEqual(responses[-1]['Retry-After'], '20')
+        # reads are not throttled
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '100/min', 'user_writes': '2/min'}})
+    def test_user_bucket(self):
+        self.assertEqual([response.status_code for response in self.post_matches(self.user1, 3)], [201, 201, 429])
+        self.assertEqual(self.post_matches(self.user2, 1)[0].status_code, status.HTTP_201_CREATED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '1/min', 'user_writes': '2/min'}})
+    def test_competition_rejection_keeps_user_tokens(self):
+        self.assertEqual([response.status_code for response in self.post_matches(self.user1, 2)], [201, 429])
+        comp2 = Competition.objects.create(name='Competition 2', created_by=self.user1)
+        self.data = {**self.data, 'participant1': Participant.objects.create(user=self.user1, competition=comp2).id,
+                     'participant2': Participant.objects.create(user=self.user2, competition=comp2).id}
+        self.url = f'/api/competitions/{comp2.id}/matches/'
+        self.assertEqual(self.post_matches(self.user1, 1)[0].status_code, status.HTTP_201_CREATED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '2/min', 'user_writes': '1/min'}})
+    def test_user_rejection_keeps_competition_tokens(self):
+        self.assertEqual([response.status_code for response in self.post_matches(self.user1, 2)], [201, 429])
+        self.assertEqual(self.post_matches(self.user2, 1)[0].status_code, status.HTTP_201_CREATED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '100/min', 'user_writes': '2/min'}})
+    def test_replays_are_free(self):
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        responses = [client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [201, 201, 201])
+        self.assertEqual(responses[-1]['Idempotent-Replayed'], 'true')
+        self.assertEqual([response.status_code for response in self.post_matches(self.user1, 2)], [201, 429])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                       'DEFAULT_THROTTLE_RATES': {'competition_writes': '1/min', 'user_writes': '1/min'}},
+                       THROTTLE_EXEMPT_USERS=['user1'])
+    def test_exempt_users(self):
+        self.assertEqual([response.status_code for response in self.post_matches(self.user1, 3)], [201, 201, 201])
+
+
+class StatsBatchTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.outsider = User.objects.create_user(username='outsider', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.owner)
+        users = [User.objects.create_user(username=f'player{i}', password='testpass123') for i in range(5)]
+        self.participants = [Participant.objects.create(user=user, competition=self.comp1) for user in users]
+        Match.objects.create(competition=self.comp1, participant1=self.participants[0], participant2=self.participants[1],
+                             played_at=timezone.now(), winner="1")
+        self.url = f'/api/competitions/{self.comp1.id}/stats/'
+
+    def test_selected_ids(self):
+        ids = [self.participants[0].id, self.participants[1].id]
+        # permission check, then one query for every requested participant
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], ids)
+        self.assertEqual((response.data[0]['wins'], response.data[0]['elo_rating']), (1, 1216))
+        self.assertEqual((response.data[1]['losses'], response.data[1]['elo_rating']), (1, 1184))
+
+    def test_other_competitions_are_not_returned(self):
+        other = Competition.objects.create(name='Competition 2', created_by=self.outsider)
+        stranger = Participant.objects.create(user=self.outsider, competition=other)
+        response = self.client.get(self.url, {'ids': f'{self.participants[0].id},{stranger.id}'})
+        self.assertEqual([row['id'] for row in response.data], [self.participants[0].id])
+
+    def test_all_paginated(self):
+        response = self.client.get(self.url, {'limit': 2, 'offset': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([row['id'] for row in response.data['results']],
+                         [participant.id for participant in self.participants[2:4]])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_ids_and_permissions(self):
+        self.assertEqual(self.client.get(self.url, {'ids': 'a,b'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user1)
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1_1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2_1 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.url = f'/api/competitions/{self.comp1.id}/changes/'
+
+    def feed(self, since=0, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def summary(self, changes):
+        return [(change['kind'], change['object_id'], change['action']) for change in changes]
+
+    def test_creates_and_rating_changes(self):
+        first = self.feed()
+        self.assertEqual(self.summary(first['changes']),
+                         [('participant', self.part1_1.id, 'create'), ('participant', self.part2_1.id, 'create')])
+        self.assertEqual(first['cursor'], 2)
+
+        match = Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                                     played_at=timezone.now(), winner="1")
+        second = self.feed(first['cursor'])
+        # one entry per object for the whole save
+        self.assertEqual(self.summary(second['changes']), [
+            ('participant', self.part1_1.id, 'update'), ('participant', self.part2_1.id, 'update'),
+            ('match', match.id, 'create'),
+        ])
+        self.assertEqual(second['changes'][0]['data']['elo_rating'], 1216)
+        self.assertEqual(second['changes'][2]['data']['participant1_elo_change'], 16)
+        self.assertEqual(self.feed(second['cursor'])['changes'], [])
+
+    def test_updates_and_deletes(self):
+        match = Match.objects.create(competition=self.comp1, participant1=self.part1_1, participant2=self.part2_1,
+                                     played_at=timezone.now(), winner="1")
+        cursor = self.feed()['cursor']
+        match_id = match.id
+        match.winner = "2"
+        match.save()
+        match.delete()
+
+        changes = self.feed(cursor)['changes']
+        self.assertEqual(self.summary(changes)[-2:], [('match', match_id, 'update'), ('match', match_id, 'delete')])
+        self.assertEqual(changes[-2]['data']['winner'], "2")
+        self.assertIsNone(changes[-1]['data'])
+
+    def test_paging(self):
+        page = self.feed(limit=1)
+        self.assertEqual((len(page['changes']), page['cursor'], page['has_more']), (1, 1, True))
+        page = self.feed(page['cursor'], limit=1)
+        self.assertEqual((len(page['changes']), page['cursor'], page['has_more']), (1, 2, False))
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_created_matches_are_logged(self):
+        cursor = self.feed()['cursor']
+        self.client.post(f'/api/competitions/{self.comp1.id}/schedule/', {}, format='json')
+        changes = self.feed(cursor)['changes']
+        self.assertEqual(self.summary(changes), [('schedule', self.comp1.id, 'create')])
+        self.assertEqual(changes[0]['data']['matches'], Match.objects.count())
+
+    def test_competition_save_keeps_sequence(self):
+        self.comp1.name = 'Renamed'
+        self.comp1.save()
+        Participant.objects.create(user=User.objects.create_user(username='user3'), competition=self.comp1)
+        self.assertEqual(self.feed()['cursor'], 3)
+        self.comp1.delete()
+
+
+class CompetitionPurgeTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user1)
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.comp2 = Competition.objects.create(name='Competition 2', created_by=self.user1)
+        for competition in (self.comp1, self.comp2):
+            part1 = Participant.objects.create(user=self.user1, competition=competition)
+            part2 = Participant.objects.create(user=self.user2, competition=competition)
+            for winner in ("1", "2", "draw"):
+                Match.objects.create(competition=competition, participant1=part1, participant2=part2,
+                                     played_at=timezone.now(), winner=winner)
+
+    def test_deleted_competition_is_hidden(self):
+        response = self.client.delete(f'/api/competitions/{self.comp1.id}/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Location'], f'/api/competitions/{self.comp1.id}/deletion/')
+
+        self.assertEqual([row['id'] for row in self.client.get('/api/competitions/').data], [self.comp2.id])
+        self.assertEqual([row['id'] for row in self.client.get('/api/competitions/mine/').data], [self.comp2.id])
+        self.assertEqual(self.client.put(f'/api/competitions/{self.comp1.id}/', {'name': 'x'}).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        for path in ('participants/', 'matches/', 'standings/', 'changes/'):
+            self.assertEqual(self.client.get(f'/api/competitions/{self.comp1.id}/{path}').status_code,
+                             status.HTTP_404_NOT_FOUND)
+        # nothing has been removed yet
+        self.assertEqual(Match.objects.filter(competition=self.comp1).count(), 3)
+
+    def test_purge_in_chunks(self):
+        self.client.delete(f'/api/competitions/{self.comp1.id}/')
+        progress = self.client.get(f'/api/competitions/{self.comp1.id}/deletion/').data
+        self.assertEqual((progress['rows_total'], progress['rows_deleted']), (None, 0))
+
+        out = StringIO()
+        call_command('purge_competitions', '--once', '--chunk-size', '2', stdout=out)
+        self.assertIn('Deleted', out.getvalue())
+
+        self.assertFalse(Competition.all_objects.filter(pk=self.comp1.pk).exists())
+        for model in (Participant, ParticipantStats, Standing, Match):
+            self.assertFalse(model.objects.filter(
+                **({'id__competition': self.comp1} if model is ParticipantStats else {'competition': self.comp1})
+            ).exists())
+        self.assertEqual(Match.objects.filter(competition=self.comp2).count(), 3)
+        self.assertEqual(self.client.get(f'/api/competitions/{self.comp1.id}/deletion/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_progress_only_for_owner(self):
+        self.client.delete(f'/api/competitions/{self.comp1.id}/')
+        other = APIClient()
+        other.force_authenticate(self.user2)
+        self.assertEqual(other.get(f'/api/competitions/{self.comp1.id}/deletion/').status_code,
+                         status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(f'/api/competitions/{self.comp2.id}/deletion/').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class BulkParticipantTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.owner)
+        self.users = [User.objects.create_user(username=f'player{i}', password='testpass123') for i in range(40)]
+        self.url = f'/api/competitions/{self.comp1.id}/participants/bulk/'
+
+    def test_bulk_add(self):
+        Participant.objects.create(user=self.users[0], competition=self.comp1)
+        response = self.client.post(self.url, {'usernames': ['player0', 'player1', 'nobody', 'player2', 'player1']},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['user'] for row in response.data['created']], [self.users[1].id, self.users[2].id])
+        self.assertEqual([(row['username'], row['error']) for row in response.data['errors']],
+                         [('player0', "User is already a participant."),
+                          ('nobody', "User with this username does not exist.")])
+
+        created = [row['id'] for row in response.data['created']]
+        self.assertEqual(ParticipantStats.objects.filter(id__in=created).count(), 2)
+        self.assertEqual(Standing.objects.filter(participant__in=created, competition=self.comp1).count(), 2)
+        feed = self.client.get(f'/api/competitions/{self.comp1.id}/changes/', {'since': 1}).data
+        self.assertEqual([(entry['object_id'], entry['action']) for entry in feed['changes']],
+                         [(created[0], 'create'), (created[1], 'create')])
+
+    def test_constant_number_of_queries(self):
+        def count_queries(usernames):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'usernames': usernames}, format='json')
+            self.assertEqual(len(response.data['created']), len(usernames))
+            return len(queries)
+
+        self.assertEqual(count_queries(['player0', 'player1']),
+                         count_queries([f'player{i}' for i in range(2, 40)]))
+
+    def test_only_owner(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(self.url, {'usernames': ['player1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Participant.objects.filter(competition=self.comp1).exists())
+
+
+class FormMetricsTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user1)
+
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.user1)
+        self.part1 = Participant.objects.create(user=self.user1, competition=self.comp1)
+        self.part2 = Participant.objects.create(user=self.user2, competition=self.comp1)
+        self.matches = [self.play(day, winner) for day, winner in ((2, "1"), (3, "1"), (4, "2"), (5, "1"))]
+
+    def play(self, day, winner):
+        return Match.objects.create(competition=self.comp1, participant1=self.part1, participant2=self.part2,
+                                    played_at=timezone.make_aware(timezone.datetime(2023, 10, day, 14, 0, 0)),
+                                    winner=winner)
+
+    def metrics(self, participant):
+        return ParticipantStats.objects.filter(id=participant).values_list(
+            'current_streak', 'longest_win_streak', 'form', 'win_rate', 'matches_played').get()
+
+    def assert_rebuild_unchanged(self):
+        before = (self.metrics(self.part1), self.metrics(self.part2))
+        call_command('rebuild_form', stdout=StringIO())
+        self.assertEqual((self.metrics(self.part1), self.metrics(self.part2)), before)
+
+    def test_new_results(self):
+        self.assertEqual(self.metrics(self.part1), (1, 2, "WLWW", 0.75, 4))
+        self.assertEqual(self.metrics(self.part2), (-1, 1, "LWLL", 0.25, 4))
+        self.assert_rebuild_unchanged()
+
+    def test_corrected_result_and_reset(self):
+        self.matches[1].winner = "draw"
+        self.matches[1].save()
+        self.assertEqual(self.metrics(self.part1), (1, 1, "WLDW", 0.5, 4))
+        self.assert_rebuild_unchanged()
+
+        self.matches[3].winner = "not_played"
+        self.matches[3].save()
+        self.assertEqual(self.metrics(self.part1), (-1, 1, "LDW", 1 / 3, 3))
+        self.assertEqual(self.metrics(self.part2), (1, 1, "WDL", 1 / 3, 3))
+        self.assert_rebuild_unchanged()
+
+    def test_result_entered_out_of_order(self):
+        self.play(1, "2")
+        self.assertEqual(self.metrics(self.part1)[:3], (1, 2, "WLWWL"))
+        self.play(6, "draw")
+        self.assertEqual(self.metrics(self.part1)[:3], (0, 2, "DWLWW"))
+        self.assert_rebuild_unchanged()
+
+    def test_rebuild_includes_archived_matches(self):
+        call_command('archive_matches', '--before', '2023-10-04', stdout=StringIO())
+        ParticipantStats.objects.update(current_streak=0, longest_win_streak=0, form='')
+        call_command('rebuild_form', str(self.comp1.id), stdout=StringIO())
+        self.assertEqual(self.metrics(self.part1), (1, 2, "WLWW", 0.75, 4))
+
+    def test_rank_by_metrics(self):
+        url = f'/api/competitions/{self.comp1.id}/stats/'
+        response = self.client.get(url, {'ordering': '-win_rate'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.part1.id, self.part2.id])
+        self.assertEqual(response.data['results'][0]['form'], "WLWW")
+
+        response = self.client.get(url, {'max_streak': -1, 'min_matches': 4})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.part2.id])
+        self.assertEqual(self.client.get(url, {'ordering': 'form'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'min_win_rate': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "The expected plans are SQLite's")
+class QueryPlanTests(APITestCase):
+    def setUp(self):
+        users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(30)]
+        for c in range(2):
+            competition = Competition.objects.create(name=f'Competition {c}', created_by=users[c])
+            participants = [Participant.objects.create(user=user, competition=competition) for user in users]
+            Match.objects.bulk_create(
+                Match(competition=competition, participant1=participants[i % 30], participant2=participants[(i + 1) % 30],
+                      played_at=timezone.now(), winner="1")
+                for i in range(50)
+            )
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', '--max-rows', '10', stdout=out)
+        self.assertIn('ok   match list', out.getvalue())
+        self.assertNotIn('FAIL', out.getvalue())
+
+    def test_lost_index_is_reported(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Match._meta.db_table)
+            for name, constraint in constraints.items():
+                if constraint['index'] and 'competition_id' in constraint['columns']:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_query_plans', '--max-rows', '10', stdout=out)
+        self.assertIn('FAIL match list: full scan of api_match (~100 rows)', out.getvalue())
+
+    def test_sorts_are_reported(self):
+        plan, problems = check_plan(Match.objects.order_by('participant1_score'), max_rows=10)
+        self.assertEqual(problems, ["full scan of api_match (~100 rows)", "temporary B-tree for ORDER BY (~100 rows)"])
+        self.assertEqual(check_plan(Match.objects.order_by('participant1_score'), max_rows=100)[1], [])
+
+
+class SchemaCacheTests(APITestCase):
+    def setUp(self):
+        schema._schema.clear()
+        schema._rendered.clear()
+        self.addCleanup(schema._schema.clear)
+        self.addCleanup(schema._rendered.clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = os.path.join(directory.name, 'schema.json')
+
+    def test_generated_once_and_served_with_etag(self):
+        with mock.patch('api.schema.generate', wraps=schema.generate) as generate:
+            response = self.client.get('/api/schema/')
+            again = self.client.get('/api/schema/', HTTP_ACCEPT='application/vnd.oai.openapi+json')
+            not_modified = self.client.get('/api/schema/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'/api/competitions/{competition_id}/participants/bulk/', response.content)
+        self.assertEqual(json.loads(again.content)['openapi'], '3.0.3')
+        self.assertNotEqual(again['ETag'], response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schema_file_of_the_same_version(self):
+        with override_settings(SCHEMA_FILE=self.schema_file, SCHEMA_VERSION='v1'):
+            call_command('generate_schema', stdout=StringIO())
+            with mock.patch('api.schema.generate') as generate:
+                response = self.client.get('/api/schema/', HTTP_ACCEPT='application/vnd.oai.openapi+json')
+            generate.assert_not_called()
+            self.assertIn('/api/competitions/', json.loads(response.content)['paths'])
+
+        schema._schema.clear()
+        with override_settings(SCHEMA_FILE=self.schema_file, SCHEMA_VERSION='v2'), \
+                mock.patch('api.schema.generate', return_value={'openapi': '3.0.3', 'paths': {}}) as generate:
+            response = self.client.get('/api/schema/', HTTP_ACCEPT='application/vnd.oai.openapi+json')
+            self.assertEqual(generate.call_count, 1)
+            self.assertEqual(json.loads(response.content)['paths'], {})
+            with open(self.schema_file) as schema_file:
+                self.assertEqual(json.load(schema_file)['version'], 'v2')
+
+
+class AdminTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(self.admin)
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.admin)
+        self.comp2 = Competition.objects.create(name='Competition 2', created_by=self.admin)
+        self.players = [Participant.objects.create(user=User.objects.create_user(username=f'player{i}'),
+                                                   competition=self.comp1) for i in range(2)]
+        self.other = [Participant.objects.create(user=User.objects.create_user(username=f'other{i}'),
+                                                 competition=self.comp2) for i in range(2)]
+
+    def add_matches(self, participants, n):
+        for _ in range(n):
+            Match.objects.create(competition=participants[0].competition, participant1=participants[0],
+                                 participant2=participants[1], winner="1", played_at=timezone.now())
+
+    def test_changelist_queries_do_not_grow(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/admin/api/match/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.add_matches(self.players, 2)
+        few = count_queries()
+        self.add_matches(self.players, 20)
+        self.add_matches(self.other, 20)
+        self.assertEqual(count_queries(), few)
+
+    def test_competition_id_filter(self):
+        self.add_matches(self.players, 2)
+        self.add_matches(self.other, 3)
+        response = self.client.get('/admin/api/match/', {'competition_id': self.comp2.id})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, f'name="competition_id" value="{self.comp2.id}"')
+        response = self.client.get('/admin/api/match/', {'competition_id': 'abc'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_estimated_count_of_large_tables(self):
+        self.add_matches(self.players, 2)
+        with mock.patch('api.admin.estimated_count', return_value=5_000_000):
+            response = self.client.get('/admin/api/match/')
+            self.assertEqual(response.context['cl'].result_count, 5_000_000)
+            filtered = self.client.get('/admin/api/match/', {'competition_id': self.comp1.id})
+            self.assertEqual(filtered.context['cl'].result_count, 2)
+
+    def test_change_form_uses_raw_id_widgets(self):
+        self.add_matches(self.players, 1)
+        match = Match.objects.get()
+        response = self.client.get(f'/admin/api/match/{match.id}/change/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'vForeignKeyRawIdAdminField', count=3)
+
+
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.owner)
+        self.url = f'/api/competitions/{self.comp1.id}/analytics/'
+        ratings = [1000, 1100, 1150, 1200, 1200, 1200, 1210, 1300, 1390, 1500]
+        self.players = [Participant.objects.create(user=User.objects.create_user(username=f'player{i}'),
+                                                   competition=self.comp1, elo_rating=rating)
+                        for i, rating in enumerate(ratings)]
+
+    def test_rating_distribution(self):
+        data = self.client.get(self.url, {'bucket': 100, 'tiers': '10,25,50'}).json()
+        self.assertEqual(data['summary'], {'count': 10, 'mean': 1225.0, 'std': 135.07, 'min': 1000, 'p10': 1000,
+                                           'p25': 1150, 'p50': 1200, 'p75': 1300, 'p90': 1390, 'max': 1500})
+        self.assertEqual([bucket['count'] for bucket in data['histogram']], [1, 2, 4, 2, 0, 1])
+        self.assertEqual((data['histogram'][2]['min_rating'], data['histogram'][2]['max_rating']), (1200, 1299))
+        self.assertEqual([(tier['top_percent'], tier['min_rating'], tier['participants']) for tier in data['tiers']],
+                         [(10, 1500, 1), (25, 1300, 3), (50, 1200, 7)])
+
+    def test_weekly_rating_changes(self):
+        now = timezone.now()
+        for days_ago in (0, 1, 7, 8, 30):
+            Match.objects.create(competition=self.comp1, participant1=self.players[3], participant2=self.players[4],
+                                 played_at=now - timezone.timedelta(days=days_ago, minutes=1), winner="1")
+        call_command('archive_matches', str(self.comp1.id), '--before', (now - timezone.timedelta(days=6)).isoformat(),
+                     stdout=StringIO())
+
+        weeks = self.client.get(self.url, {'weeks': 3}).json()['weekly_changes']
+        self.assertEqual(len(weeks), 3)
+        self.assertEqual(weeks[-1]['week'], (timezone.localdate() - timezone.timedelta(days=timezone.localdate().weekday())).isoformat())
+        self.assertEqual(sum(week['summary']['count'] for week in weeks), 8)
+        for week in weeks:
+            self.assertEqual(sum(row['count'] for row in week['histogram']), week['summary']['count'])
+            for row in week['histogram']:
+                self.assertTrue(row['change'] > 0 or row['change'] < 0)
+
+    def test_cached_until_the_competition_changes(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries))
+
+        self.players[1].elo_rating = 1800
+        with self.captureOnCommitCallbacks(execute=True):
+            self.players[1].save()
+        self.assertEqual(self.client.get(self.url).json()['summary']['max'], 1800)
+
+    def test_invalid_parameters(self):
+        for params in ({'bucket': 0}, {'weeks': 'x'}, {'tiers': '0'}, {'tiers': '50,101'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+        outsider = APIClient()
+        outsider.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(outsider.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PlayerProfileTests(APITestCase):
+    def setUp(self):
+        self.player = User.objects.create_user(username='player', password='testpass123')
+        self.rival = User.objects.create_user(username='rival', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.player)
+        self.url = f'/api/users/{self.player.id}/profile/'
+
+    def play(self, competition, winners):
+        me = Participant.objects.get(user=self.player, competition=competition)
+        rival = Participant.objects.get(user=self.rival, competition=competition)
+        for day, winner in enumerate(winners, start=1):
+            Match.objects.create(competition=competition, participant1=me, participant2=rival, winner=winner,
+                                 played_at=timezone.make_aware(timezone.datetime(2024, 1, day, 12, 0, 0)))
+
+    def add_competition(self, name, **kwargs):
+        competition = Competition.objects.create(name=name, created_by=self.rival, **kwargs)
+        Participant.objects.create(user=self.player, competition=competition)
+        Participant.objects.create(user=self.rival, competition=competition)
+        return competition
+
+    def test_profile_follows_results(self):
+        comp1 = self.add_competition('Competition 1')
+        comp2 = self.add_competition('Competition 2', scoring="points")
+        self.play(comp1, ["1", "1", "2"])
+        self.play(comp2, ["2", "draw"])
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['username'], 'player')
+        first, second = data['participations']
+        stats = ParticipantStats.objects.get(id__user=self.player, competition=comp1)
+        self.assertEqual((first['competition'], first['competition_name'], first['rank']), (comp1.id, 'Competition 1', 1))
+        self.assertEqual(first['elo_rating'], Participant.objects.get(user=self.player, competition=comp1).elo_rating)
+        self.assertEqual((first['matches_played'], first['wins'], first['losses'], first['form']),
+                         (3, 2, 1, stats.form))
+        self.assertEqual((second['scoring'], second['points'], second['draws'], second['rank']), ("points", 1, 1, 2))
+
+        # A corrected result is copied over too.
+        match = Match.objects.filter(competition=comp1).order_by('played_at').last()
+        match.winner = "1"
+        match.save()
+        first = self.client.get(self.url).json()['participations'][0]
+        self.assertEqual((first['wins'], first['losses'], first['current_streak']), (3, 0, 3))
+
+    def test_new_point_values_reach_the_profile(self):
+        competition = self.add_competition('Points', scoring="points")
+        self.play(competition, ["1", "2", "2"])
+        owner = APIClient()
+        owner.force_authenticate(self.rival)
+        owner.put(f'/api/competitions/{competition.id}/', {'name': 'Points', 'points_win': 1, 'points_loss': 5},
+                  format='json')
+
+        row = self.client.get(self.url).json()['participations'][0]
+        standing = Standing.objects.get(participant__user=self.player, competition=competition)
+        self.assertEqual((row['points'], row['rank']), (standing.points, 1))
+        self.assertEqual(row['points'], 11)
+
+    def test_single_read(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.play(self.add_competition('Competition 1'), ["1"])
+        few = count_queries()
+        for i in range(5):
+            self.play(self.add_competition(f'Other {i}'), ["2", "1"])
+        self.assertEqual(count_queries(), few)
+        self.assertEqual(few, 2)  # the user, then the summaries
+
+    def test_other_users_see_shared_competitions(self):
+        shared = self.add_competition('Shared')
+        private = Competition.objects.create(name='Private', created_by=self.player)
+        Participant.objects.create(user=self.player, competition=private)
+        viewer = APIClient()
+        viewer.force_authenticate(self.rival)
+        competitions = [row['competition'] for row in viewer.get(self.url).json()['participations']]
+        self.assertEqual(competitions, [shared.id])
+        self.assertEqual(len(self.client.get(self.url).json()['participations']), 2)
+        self.assertEqual(self.client.get('/api/users/9999/profile/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deferred_and_bulk_participants(self):
+        competition = self.add_competition('Deferred', deferred_ratings=True)
+        self.play(competition, ["1"])
+        self.assertEqual(self.client.get(self.url).json()['participations'][0]['matches_played'], 0)
+        call_command('rating_worker', '--once', '--workers', '1', stdout=StringIO())
+        row = self.client.get(self.url).json()['participations'][0]
+        self.assertEqual((row['matches_played'], row['wins'], row['form']), (1, 1, "W"))
+
+        owner = APIClient()
+        owner.force_authenticate(self.rival)
+        other = self.add_competition('Bulk')
+        newcomer = User.objects.create_user(username='newcomer')
+        owner.post(f'/api/competitions/{other.id}/participants/bulk/', {'usernames': ['newcomer']}, format='json')
+        rows = owner.get(f'/api/users/{newcomer.id}/profile/').json()['participations']
+        self.assertEqual([(row['competition'], row['elo_rating'], row['rank']) for row in rows], [(other.id, 1200, 1)])
+
+
+class RatingDecayTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.comp1 = Competition.objects.create(name='Competition 1', created_by=self.owner, decay_after_days=7)
+        self.idle, self.near_floor, self.active, self.new, self.low = [
+            Participant.objects.create(user=User.objects.create_user(username=name), competition=self.comp1)
+            for name in ('idle', 'near_floor', 'active', 'new', 'low')
+        ]
+        now = timezone.now()
+        for participant, days_ago in ((self.idle, 10), (self.near_floor, 10), (self.active, 2)):
+            Match.objects.create(competition=self.comp1, participant1=participant, participant2=self.low, winner="1",
+                                 played_at=now - timezone.timedelta(days=days_ago))
+        for participant, rating in ((self.idle, 1300), (self.near_floor, 1210), (self.active, 1300),
+                                    (self.new, 1300), (self.low, 1150)):
+            Participant.objects.filter(pk=participant.pk).update(elo_rating=rating)
+
+    def ratings(self):
+        return {participant.user.username: participant.elo_rating
+                for participant in Participant.objects.filter(competition=self.comp1).select_related('user')}
+
+    def test_decay_inactive_participants(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('decay_ratings', stdout=StringIO())
+        self.assertEqual(self.ratings(), {'idle': 1275, 'near_floor': 1200, 'active': 1300, 'new': 1300, 'low': 1150})
+        rating_updates = [query for query in queries if query['sql'].startswith('UPDATE "api_participant" ')]
+        self.assertEqual(len(rating_updates), 1)
+        self.assertEqual(PlayerSummary.objects.get(participant=self.idle).elo_rating, 1275)
+
+        # Nobody is due again until another period of inactivity has passed.
+        out = StringIO()
+        call_command('decay_ratings', str(self.comp1.id), stdout=out)
+        self.assertIn("nobody due", out.getvalue())
+        decay.decay_competition(self.comp1, now=timezone.now() + timezone.timedelta(days=8))
+        self.assertEqual(self.ratings()['idle'], 1250)
+
+    def test_decays_are_visible_and_reversible(self):
+        call_command('decay_ratings', stdout=StringIO())
+        decays = self.client.get(f'/api/competitions/{self.comp1.id}/decays/').json()
+        self.assertEqual([(row['points'], row['participant_count'], row['reverted_at']) for row in decays],
+                         [(25, 2, None)])
+        detail = self.client.get(f'/api/competitions/{self.comp1.id}/decays/{decays[0]["id"]}/').json()
+        self.assertEqual(sorted((row['participant'], row['amount']) for row in detail['entries']),
+                         [(self.idle.id, 25), (self.near_floor.id, 10)])
+        feed = self.client.get(f'/api/competitions/{self.comp1.id}/changes/', {'since': 0}).json()['changes']
+        self.assertEqual(sorted((entry['object_id'], entry['action'], entry['data']['elo_rating']) for entry in feed[-2:]),
+                         [(self.idle.id, 'update', 1275), (self.near_floor.id, 'update', 1200)])
+
+        call_command('decay_ratings', str(self.comp1.id), '--revert', str(decays[0]['id']), stdout=StringIO())
+        self.assertEqual(self.ratings()['idle'], 1300)
+        self.assertEqual(self.ratings()['near_floor'], 1210)
+        self.assertIsNotNone(self.client.get(f'/api/competitions/{self.comp1.id}/decays/').json()[0]['reverted_at'])
+        with self.assertRaises(CommandError):
+            call_command('decay_ratings', str(self.comp1.id), '--revert', str(decays[0]['id']), stdout=StringIO())
+
+    def test_disabled_competitions_are_skipped(self):
+        Competition.objects.filter(pk=self.comp1.pk).update(decay_after_days=None)
+        call_command('decay_ratings', stdout=StringIO())
+        self.assertEqual(self.ratings()['idle'], 1300)
+        out = StringIO()
+        Competition.objects.filter(pk=self.comp1.pk).update(decay_after_days=7)
+        call_command('decay_ratings', '--dry-run', stdout=out)
+        self.assertIn("2 participant(s) due", out.getvalue())
+        self.assertEqual(self.ratings()['idle'], 1300)
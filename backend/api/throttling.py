@@ -0,0 +1,113 @@
+"""
+Token bucket throttles for the match and participant write endpoints.
+
+Rates use DRF's format in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] and are
+read as a bucket: '20/s' holds 20 tokens refilled at 20 per second, so a
+client can burst up to the bucket size and is then held to the refill
+rate. The bucket is stored as a single timestamp per key (the generic cell
+rate algorithm), one cache read and at most one write per request.
+Requests rejected by a throttle get 429 with Retry-After.
+
+Writes go through WriteThrottle, which checks the competition and the user
+bucket before taking anything: a request takes a token from both or, when
+either is empty, from neither. Users listed in settings.THROTTLE_EXEMPT_USERS
+(bulk importers) and retries answered from a stored idempotent response are
+not throttled.
+"""
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+from . import idempotency
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _not_throttled(request):
+    return (request.method in SAFE_METHODS
+            or request.user.get_username() in getattr(settings, 'THROTTLE_EXEMPT_USERS', ())
+            or idempotency.has_stored_response(request))
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    default_rate = None
+
+    def get_rate(self):
+        rates = getattr(settings, 'REST_FRAMEWORK', {}).get('DEFAULT_THROTTLE_RATES', {})
+        return rates.get(self.scope, self.default_rate)
+
+    def reserve(self, request, view):
+        """Work out the bucket with one more token taken and set wait_seconds, without writing it."""
+        self.wait_seconds = 0
+        self.key = self.get_cache_key(request, view) if self.rate is not None else None
+        if self.key is None:
+            return None
+
+        capacity, period = self.num_requests, self.duration
+        interval = period / capacity
+        self.now = self.timer()
+        # The bucket is empty once `tat` is `period` ahead of now; each request moves it by one interval.
+        tat = max(self.cache.get(self.key, self.now), self.now) + interval
+        self.wait_seconds = tat - period - self.now
+        return tat
+
+    def take(self, tat):
+        if tat is not None:
+            self.cache.set(self.key, tat, timeout=int(tat - self.now) + 1)
+
+    def allow_request(self, request, view):
+        if _not_throttled(request):
+            return True
+        tat = self.reserve(request, view)
+        if self.wait_seconds > 0:
+            return False
+        self.take(tat)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class CompetitionWriteThrottle(TokenBucketThrottle):
+    """Shared by everyone writing to one competition."""
+    scope = 'competition_writes'
+    default_rate = '20/s'
+
+    def get_cache_key(self, request, view):
+        competition_id = view.kwargs.get('competition_id')
+        if competition_id is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': competition_id}
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    """Per user, across all competitions."""
+    scope = 'user_writes'
+    default_rate = '10/s'
+
+    def get_cache_key(self, request, view):
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class WriteThrottle(BaseThrottle):
+    """The competition and the user bucket together, a write takes a token from both or from neither."""
+    bucket_classes = (CompetitionWriteThrottle, UserWriteThrottle)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        if _not_throttled(request):
+            return True
+        buckets = [bucket_class() for bucket_class in self.bucket_classes]
+        reserved = [(bucket, bucket.reserve(request, view)) for bucket in buckets]
+        self.wait_seconds = max(bucket.wait_seconds for bucket in buckets)
+        if self.wait_seconds > 0:
+            return False
+        for bucket, tat in reserved:
+            bucket.take(tat)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+WRITE_THROTTLE_CLASSES = [WriteThrottle]
@@ -4,11 +4,26 @@ from .views import list_create_participants
 
 urlpatterns = [
     path('competitions/', views.list_create_competition, name='list_create_competition'),
+    path('competitions/mine/', views.list_my_competitions, name='list_my_competitions'),
     path('competitions/<int:competition_id>/', views.update_delete_competition, name='update_delete_competition'),
+    path('competitions/<int:competition_id>/deletion/', views.get_deletion_status, name='competition_deletion'),
     path('competitions/<int:competition_id>/participants/', list_create_participants, name='participant_list_create'),
+    path('competitions/<int:competition_id>/participants/bulk/', views.bulk_create_participants, name='participant_bulk_create'),
     path('competitions/<int:competition_id>/matches/', views.list_create_matches, name='matches'),
     path('competitions/<int:competition_id>/matches/<int:match_id>/', views.update_delete_detail_match, name='update_delete_detail_match'),
+    path('competitions/<int:competition_id>/pairings/', views.list_create_pairings, name='pairings'),
+    path('competitions/<int:competition_id>/predictions/', views.get_predictions, name='predictions'),
+    path('competitions/<int:competition_id>/projection/', views.get_projection, name='projection'),
+    path('competitions/<int:competition_id>/analytics/', views.get_analytics, name='analytics'),
+    path('competitions/<int:competition_id>/schedule/', views.create_schedule, name='schedule'),
+    path('competitions/<int:competition_id>/rating-queue/', views.get_rating_queue, name='rating_queue'),
+    path('competitions/<int:competition_id>/decays/', views.list_rating_decays, name='rating_decays'),
+    path('competitions/<int:competition_id>/decays/<int:decay_id>/', views.get_rating_decay, name='rating_decay'),
+    path('competitions/<int:competition_id>/changes/', views.get_changes, name='changes'),
+    path('competitions/<int:competition_id>/standings/', views.get_standings, name='standings'),
+    path('competitions/<int:competition_id>/stats/', views.get_stats_batch, name='stats_batch'),
     path('competitions/<int:competition_id>/stats/<int:id>/', views.get_stats_detail, name='stats_details'),
-    path('competitions/<int:competition_id>/participants/<int:participant_id>/', views.update_delete_participants, name="update_delete_participants")
+    path('competitions/<int:competition_id>/participants/<int:participant_id>/', views.update_delete_participants, name="update_delete_participants"),
+    path('users/<int:user_id>/profile/', views.get_player_profile, name='player_profile'),
 ]
 
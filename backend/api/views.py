@@ -1,14 +1,36 @@
 from django.shortcuts import render
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.response import Response
-from api.models import Competition, Match, Participant, ParticipantStats
-from .serializers import CompetitionSerializer, MatchSerializer, ParticipantSerializer, ParticipantStatsSerializer, UserSerializer
+from api.models import ChangeLogEntry, Competition, Match, Participant, ParticipantStats, RatingDecay
+from .serializers import BulkParticipantRequestSerializer, BulkParticipantSerializer, ChangeFeedSerializer, CompetitionSerializer, DeletionStatusSerializer, CompetitionSummarySerializer, MatchSerializer, ParticipantSerializer, ParticipantStatsBatchSerializer, ParticipantStatsSerializer, PairingRequestSerializer, PairingRoundSerializer, PlayerProfileSerializer, PredictionSerializer, ProjectionSerializer, RatingAnalyticsSerializer, RatingDecayDetailSerializer, RatingDecaySerializer, RatingQueueSerializer, ScheduleRequestSerializer, ScheduleSerializer, StandingSerializer, UserSerializer
+from .rating_queue import queue_lag
+from .listing import MATCH_EXPANSIONS, MATCH_FIELDS, PARTICIPANT_EXPANSIONS, PARTICIPANT_FIELDS, match_rows, parse_expand, parse_fields, participant_rows
+from .archive import archived_match_rows
+from .renderers import LIST_RENDERER_CLASSES
+from .queries import competition_summaries, player_profile, standings_table
+from . import elo, sharding
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+import numpy as np
+import os
+from .caching import bump_competition_version, cached_for_competition
+from .idempotency import idempotent
+from .throttling import WRITE_THROTTLE_CLASSES
+from . import analytics, simulation
+from .onboarding import add_participants
+from .pairing import propose_pairings
+from .scheduling import create_fixtures, round_robin
+from django.db import router, transaction
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.pagination import LimitOffsetPagination
+from django.db.models import F
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db import IntegrityError
 from rest_framework.exceptions import NotFound, PermissionDenied
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
+from django.urls import reverse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 from rest_framework import generics
 from django.contrib.auth.models import User
 
@@ -91,10 +113,19 @@ from django.contrib.auth.models import User
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def list_create_competition(request):
 
     if request.method == 'GET':
-        competitions = Competition.objects.all().filter(created_by=request.user)
+        # Competitions are spread over the shards, each one is asked in turn.
+        competitions = sorted(
+            (
+                competition
+                for shard in sharding.shard_aliases()
+                for competition in Competition.objects.using(shard).filter(created_by=request.user)
+            ),
+            key=lambda competition: competition.id
+        )
         serializer = CompetitionSerializer(competitions, many=True)
         return Response(serializer.data)
 
@@ -105,10 +136,64 @@ def list_create_competition(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@extend_schema(
+    methods=["GET"],
+    summary="List my competitions",
+    description="Retrieve every competition the authenticated user owns or plays in, with participant and match counts, "
+                "last activity, the user's own rating and rank, and the current leader.",
+    responses={
+        200: OpenApiResponse(response=CompetitionSummarySerializer(many=True), description="Competition summaries retrieved successfully"),
+    },
+    tags=["competitions"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_my_competitions(request):
+    summaries = [
+        summary
+        for shard in sharding.shard_aliases()
+        for summary in competition_summaries(request.user).using(shard)
+    ]
+    serializer = CompetitionSummarySerializer(sorted(summaries, key=lambda summary: summary.id), many=True)
+    return Response(serializer.data)
+
+@extend_schema(
+    methods=["GET"],
+    summary="Get a player profile",
+    description="Retrieve every participation of a user with its rating, rank (by points in points mode), points, "
+                "statistics and recent form. Other users' profiles only include the competitions the authenticated "
+                "user owns or plays in.",
+    responses={
+        200: OpenApiResponse(response=PlayerProfileSerializer, description="Profile retrieved successfully"),
+        404: OpenApiResponse(description="User not found")
+    },
+    tags=["participants", "statistics"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_player_profile(request, user_id):
+    user = get_object_or_404(User, pk=user_id)
+    participations = [
+        summary
+        for shard in sharding.shard_aliases()
+        for summary in player_profile(user, request.user).using(shard)
+    ]
+    serializer = PlayerProfileSerializer({
+        'user': user.pk,
+        'username': user.username,
+        'participations': sorted(participations, key=lambda summary: summary.competition_id),
+    })
+    return Response(serializer.data)
+
 @extend_schema(
     methods=["GET"],
     summary="List participants",
-    description="Retrieve a list of all participants for a specific competition.",
+    description="Retrieve a list of all participants for a specific competition. Use `fields` to select columns "
+                "and `expand=user` to inline the user.",
+    parameters=[
+        OpenApiParameter('fields', str, description="Comma separated fields to return, e.g. `id,elo_rating`."),
+        OpenApiParameter('expand', str, description="Related objects to inline: `user`."),
+    ],
     responses={
         200: OpenApiResponse(response=ParticipantSerializer(many=True), description="List of participants retrieved successfully"),
         404: OpenApiResponse(description="Competition not found")
@@ -129,6 +214,9 @@ def list_create_competition(request):
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+@throttle_classes(WRITE_THROTTLE_CLASSES)
+@idempotent
 def list_create_participants(request, competition_id):
     try:
         competition = Competition.objects.get(id=competition_id)
@@ -138,8 +226,9 @@ def list_create_participants(request, competition_id):
     if request.method == 'GET':
         # Handle GET request to list participants for a competition
         participants = Participant.objects.filter(competition_id=competition_id)
-        serializer = ParticipantSerializer(participants, many=True)
-        return Response(serializer.data)
+        fields = parse_fields(request.query_params.get('fields'), PARTICIPANT_FIELDS)
+        expand = parse_expand(request.query_params.get('expand'), PARTICIPANT_EXPANSIONS, fields)
+        return Response(participant_rows(participants, fields, expand))
 
     elif request.method == 'POST':
         # Handle POST request to create a participant for a competition
@@ -151,6 +240,45 @@ def list_create_participants(request, competition_id):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(
+    methods=["POST"],
+    summary="Add participants in bulk",
+    description="Add every user in `usernames` (up to 1000) to a competition with a constant number of queries. "
+                "Names that don't exist or are already participants are skipped and reported in `errors`. "
+                "Only the competition owner can add participants in bulk.",
+    request=BulkParticipantRequestSerializer,
+    responses={
+        201: OpenApiResponse(response=BulkParticipantSerializer, description="Participants added"),
+        200: OpenApiResponse(response=BulkParticipantSerializer, description="No participants added"),
+        400: OpenApiResponse(description="Invalid data provided"),
+        403: OpenApiResponse(description="Not authorized to add participants"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["participants"]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes(WRITE_THROTTLE_CLASSES)
+@idempotent
+def bulk_create_participants(request, competition_id):
+    competition = get_object_or_404(Competition, id=competition_id)
+    if request.user.pk != competition.created_by_id:
+        raise PermissionDenied("Only the owner of a competition can add participants in bulk")
+
+    serializer = BulkParticipantRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        participants, errors = add_participants(competition, serializer.validated_data['usernames'])
+    except IntegrityError:
+        # Someone added one of the users in the meantime, nothing was created.
+        return Response({'detail': "Participants were added concurrently, please retry."},
+                        status=status.HTTP_409_CONFLICT)
+
+    data = BulkParticipantSerializer({'created': participants, 'errors': errors}).data
+    return Response(data, status=status.HTTP_201_CREATED if participants else status.HTTP_200_OK)
+
+
 @extend_schema(
     methods=["PUT"],
     summary="Update participant",
@@ -176,6 +304,8 @@ def list_create_participants(request, competition_id):
     tags=["participants"]
 )
 @api_view(["PUT", "DELETE"])
+@throttle_classes(WRITE_THROTTLE_CLASSES)
+@idempotent
 def update_delete_participants(request, competition_id, participant_id):
     try:
         competition = Competition.objects.get(id=competition_id)
@@ -221,7 +351,9 @@ def update_delete_participants(request, competition_id, participant_id):
 @extend_schema(
     methods=["DELETE"],
     summary="Delete competition",
-    description="Delete an existing competition. Only the creator of the competition can delete it.",
+    description="Delete an existing competition. Only the creator of the competition can delete it. The competition "
+                "disappears immediately and its rows are removed in the background; the `Location` header points "
+                "to the deletion progress.",
     responses={
         202: OpenApiResponse(description="Competition deleted successfully"),
         403: OpenApiResponse(description="Not authorized to delete this competition"),
@@ -231,6 +363,7 @@ def update_delete_participants(request, competition_id, participant_id):
 )
 @api_view(['PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_delete_competition(request, competition_id):
     try:
         competition = Competition.objects.get(id=competition_id)
@@ -249,14 +382,45 @@ def update_delete_competition(request, competition_id):
 
     elif request.method == "DELETE":
         if request.user == competition.created_by:
-            competition.delete()
-            return Response(status=status.HTTP_202_ACCEPTED)
+            # Hide it right away, purge_competitions removes the rows in the background.
+            Competition.objects.filter(pk=competition.pk).update(deleted_at=timezone.now())
+            bump_competition_version(competition.id)
+            return Response(status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': reverse('competition_deletion', args=[competition.id])})
         raise PermissionDenied("You are not authorized to delete competitions")  
 
+@extend_schema(
+    methods=["GET"],
+    summary="Get deletion progress",
+    description="Follow the removal of a deleted competition's rows. Returns 404 once the competition is "
+                "completely removed. Only the competition owner can view this.",
+    responses={
+        200: OpenApiResponse(response=DeletionStatusSerializer, description="Deletion progress retrieved successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="No deleted competition with this id")
+    },
+    tags=["competitions"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_deletion_status(request, competition_id):
+    competition = get_object_or_404(Competition.all_objects, id=competition_id, deleted_at__isnull=False)
+    if request.user.pk != competition.created_by_id:
+        raise PermissionDenied("Only the owner of a competition can view its deletion")
+    return Response(DeletionStatusSerializer(competition).data)
+
 @extend_schema(
     methods=["GET"],
     summary="List competition matches",
-    description="Retrieve a list of all matches for a specific competition. User must be the competition owner or a participant.",
+    description="Retrieve a list of all matches for a specific competition, including archived matches unless "
+                "`include_archived=false`. Use `fields` to select columns and `expand` to inline the participants "
+                "and their users. User must be the competition owner or a participant.",
+    parameters=[
+        OpenApiParameter('fields', str, description="Comma separated fields to return, e.g. `id,winner`."),
+        OpenApiParameter('expand', str, description="Related objects to inline: `participant1`, `participant1.user`, "
+                                                    "`participant2`, `participant2.user`."),
+        OpenApiParameter('include_archived', bool, description="Include archived matches (default true)."),
+    ],
     responses={
         200: OpenApiResponse(response=MatchSerializer(many=True), description="List of matches retrieved successfully"),
         403: OpenApiResponse(description="Not authorized to view these matches"),
@@ -279,6 +443,9 @@ def update_delete_competition(request, competition_id):
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+@throttle_classes(WRITE_THROTTLE_CLASSES)
+@idempotent
 def list_create_matches(request, competition_id):
     try:
         competition = Competition.objects.get(id=competition_id)
@@ -286,13 +453,18 @@ def list_create_matches(request, competition_id):
         raise NotFound('Competition not found.')
 
     is_participant = Participant.objects.filter(user=request.user, competition=competition).exists()
-    if request.user != competition.created_by and not is_participant:
+    if request.user.pk != competition.created_by_id and not is_participant:
         raise PermissionDenied("You are not authorized to view these matches.")
 
     if request.method == 'GET':
         matches = Match.objects.filter(competition=competition_id)
-        serializer = MatchSerializer(matches, many=True)
-        return Response(serializer.data)
+        fields = parse_fields(request.query_params.get('fields'), MATCH_FIELDS)
+        expand = parse_expand(request.query_params.get('expand'), MATCH_EXPANSIONS, fields)
+        rows = match_rows(matches, fields, expand)
+        # Archived history is served transparently unless the caller opts out.
+        if request.query_params.get('include_archived', 'true').lower() != 'false':
+            rows = archived_match_rows(competition_id, fields, expand) + rows
+        return Response(rows)
 
     elif request.method == 'POST':
         # Handle POST request to create a participant for a competition
@@ -339,6 +511,8 @@ def list_create_matches(request, competition_id):
 )
 @api_view(['PUT', 'DELETE', 'GET'])
 @permission_classes([IsAuthenticated])  # Restrict actions to authenticated users
+@throttle_classes(WRITE_THROTTLE_CLASSES)
+@idempotent
 def update_delete_detail_match(request, competition_id, match_id):
     match = get_object_or_404(Match, id=match_id, competition_id=competition_id)
 
@@ -367,6 +541,72 @@ def update_delete_detail_match(request, competition_id, match_id):
         raise PermissionDenied("Only the owner of a competition can delete matches") 
 
 
+class StatsPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+# Each has an index on (competition, -column), see ParticipantStats.Meta.
+STATS_ORDERINGS = ['id', '-win_rate', '-current_streak', '-longest_win_streak', 'current_streak']
+STATS_FILTERS = {
+    'min_matches': ('matches_played__gte', int),
+    'min_win_rate': ('win_rate__gte', float),
+    'min_streak': ('current_streak__gte', int),
+    'max_streak': ('current_streak__lte', int),
+}
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Get statistics of many participants",
+    description="Retrieve the statistics and current rating of several participants in one call. Pass `ids` as a "
+                "comma separated list of participant ids (at most 1000), or leave it out to page through every "
+                "participant of the competition with `limit` and `offset`. `ordering` and the `min_`/`max_` filters "
+                "rank participants by win rate and streaks. User must be the competition owner or a participant.",
+    parameters=[
+        OpenApiParameter('ids', str, description="Comma separated participant ids."),
+        OpenApiParameter('limit', int, description="Page size when `ids` is not given (default 100, at most 1000)."),
+        OpenApiParameter('offset', int, description="Page start when `ids` is not given."),
+        OpenApiParameter('ordering', str, enum=STATS_ORDERINGS,
+                         description="Sort by win rate or streak (wins positive, losses negative). Default `id`."),
+        OpenApiParameter('min_matches', int, description="Only participants with at least this many matches."),
+        OpenApiParameter('min_win_rate', float, description="Only participants with at least this win rate (0 to 1)."),
+        OpenApiParameter('min_streak', int, description="Only current streaks of at least this, e.g. `3` wins in a row."),
+        OpenApiParameter('max_streak', int, description="Only current streaks of at most this, e.g. `-3` losses in a row."),
+    ],
+    responses={
+        200: OpenApiResponse(response=ParticipantStatsBatchSerializer(many=True), description="Statistics retrieved successfully"),
+        400: OpenApiResponse(description="Invalid ids"),
+        403: OpenApiResponse(description="Not authorized to view these statistics"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["participants", "statistics"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_stats_batch(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+
+    ordering = request.query_params.get('ordering', 'id')
+    if ordering not in STATS_ORDERINGS:
+        raise ValidationError({'ordering': f"Must be one of {', '.join(STATS_ORDERINGS)}."})
+    stats = (
+        ParticipantStats.objects.filter(competition_id=competition_id, **parse_stats_filters(request.query_params))
+        .annotate(elo_rating=F('id__elo_rating'))
+        .order_by(ordering, 'id')
+    )
+    ids = parse_id_list(request.query_params.get('ids'), 'ids')
+    if ids is not None:
+        if len(ids) > StatsPagination.max_limit:
+            raise ValidationError({'ids': f"At most {StatsPagination.max_limit} ids per request."})
+        return Response(ParticipantStatsBatchSerializer(stats.filter(id__in=ids), many=True).data)
+
+    paginator = StatsPagination()
+    page = paginator.paginate_queryset(stats, request)
+    return paginator.get_paginated_response(ParticipantStatsBatchSerializer(page, many=True).data)
+
+
 @extend_schema(
     methods=["GET"],
     summary="Get participant statistics",
@@ -403,17 +643,535 @@ def get_stats_detail(request, id, competition_id):
     raise PermissionDenied("You are not in the competition of this participant")
 
 
+@extend_schema(
+    methods=["GET"],
+    summary="Get rating queue lag",
+    description="Report how many match results of a competition are still waiting for the rating worker. User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=RatingQueueSerializer, description="Queue state retrieved successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_rating_queue(request, competition_id):
+    if is_participant_or_owner(request.user, competition_id):
+        serializer = RatingQueueSerializer(queue_lag(competition_id))
+        return Response(serializer.data, 200)
+    raise PermissionDenied("You are not in this competition")
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="List rating decays",
+    description="Inactivity decay runs of a competition, newest first (see `decay_after_days`, `decay_points` and "
+                "`decay_floor` of the competition). User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=RatingDecaySerializer(many=True), description="Decays retrieved successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["participants"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_rating_decays(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+    decays = RatingDecay.objects.filter(competition_id=competition_id).order_by('-created_at', '-id')
+    return Response(RatingDecaySerializer(decays, many=True).data)
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Get a rating decay",
+    description="A decay run with the points each participant lost. User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=RatingDecayDetailSerializer, description="Decay retrieved successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition or decay not found")
+    },
+    tags=["participants"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_rating_decay(request, competition_id, decay_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+    decay = get_object_or_404(
+        RatingDecay.objects.prefetch_related('entries'), pk=decay_id, competition_id=competition_id
+    )
+    return Response(RatingDecayDetailSerializer(decay).data)
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Predict match outcomes",
+    description="Read-only Elo predictions for a competition. `expected[i][j]` is the expected score of `participants[i]` "
+                "against `participants[j]`. Pass `participants=1,2,3` to restrict the matrix (defaults to the whole "
+                "competition) and `results=1-2-1,3-4-draw` to preview the rating changes of hypothetical results "
+                "(`<participant1>-<participant2>-<winner>`, applied in order). Nothing is written. "
+                "User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=PredictionSerializer, description="Predictions computed successfully"),
+        400: OpenApiResponse(description="Invalid participants or results"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def get_predictions(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+
+    participant_ids = parse_id_list(request.query_params.get('participants'), 'participants')
+    results = parse_results(request.query_params.get('results'))
+
+    max_size = getattr(settings, 'PREDICTION_MATRIX_MAX_SIZE', 2000)
+    if participant_ids is not None and len(participant_ids) > max_size:
+        raise ValidationError({'participants': f"At most {max_size} participants can be compared at once."})
+
+    participants = Participant.objects.filter(competition_id=competition_id)
+    if participant_ids is None:
+        matrix_ratings = dict(participants.order_by('id').values_list('id', 'elo_rating')[:max_size + 1])
+        if len(matrix_ratings) > max_size:
+            raise ValidationError({'participants': f"At most {max_size} participants can be compared at once."})
+        participant_ids = list(matrix_ratings)
+    else:
+        participant_ids = list(dict.fromkeys(participant_ids))
+
+    wanted = set(participant_ids)
+    for participant1, participant2, winner in results:
+        wanted.update((participant1, participant2))
+    ratings = dict(participants.filter(id__in=wanted).values_list('id', 'elo_rating'))
+    missing = sorted(wanted - ratings.keys())
+    if missing:
+        raise ValidationError({'participants': f"Not participants of this competition: {missing}"})
+
+    matrix_ratings = [ratings[participant_id] for participant_id in participant_ids]
+    previews, ratings_after = elo.preview_results(ratings, results)
+
+    # Built by hand rather than through PredictionSerializer: the matrix can
+    # hold millions of values and is rendered straight from the NumPy array.
+    return Response({
+        'participants': participant_ids,
+        'ratings': matrix_ratings,
+        'expected': np.round(elo.expected_matrix(matrix_ratings), 4),
+        'results': [
+            {
+                'participant1': participant1,
+                'participant2': participant2,
+                'winner': winner,
+                'expected_score1': round(expected1, 4),
+                'participant1_elo_change': change1,
+                'participant2_elo_change': change2,
+            }
+            for (participant1, participant2, winner), (expected1, change1, change2) in zip(results, previews)
+        ],
+        'ratings_after': {
+            participant_id: ratings_after[participant_id]
+            for participant_id in sorted({p for result in results for p in result[:2]})
+        },
+    })
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Project the season",
+    description="Simulate the remaining (`not_played`) fixtures `runs` times using Elo win probabilities and report each "
+                "participant's distribution of final rating and rank, and probability of finishing first. Results are "
+                "cached until the next match or participant change. User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=ProjectionSerializer, description="Projection computed successfully"),
+        400: OpenApiResponse(description="Invalid parameters"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def get_projection(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+
+    max_runs = getattr(settings, 'PROJECTION_MAX_RUNS', 100_000)
+    try:
+        runs = int(request.query_params.get('runs', 10_000))
+        seed = request.query_params.get('seed')
+        seed = int(seed) if seed is not None else None
+    except ValueError:
+        raise ValidationError("runs and seed must be integers.")
+    if not 1 <= runs <= max_runs:
+        raise ValidationError({'runs': f"runs must be between 1 and {max_runs}."})
+
+    data = cached_for_competition(
+        competition_id, 'projection', {'runs': runs, 'seed': seed},
+        lambda: project_season(competition_id, runs, seed)
+    )
+    return Response(ProjectionSerializer(data).data)
+
+
+def project_season(competition_id, runs, seed):
+    participant_ids, ratings = [], []
+    for participant_id, rating in Participant.objects.filter(competition_id=competition_id).order_by('id').values_list('id', 'elo_rating'):
+        participant_ids.append(participant_id)
+        ratings.append(rating)
+    index = {participant_id: i for i, participant_id in enumerate(participant_ids)}
+
+    fixtures = np.array(
+        [
+            (index[participant1], index[participant2])
+            for participant1, participant2 in Match.objects.filter(competition_id=competition_id, winner="not_played")
+            .order_by('played_at', 'id').values_list('participant1_id', 'participant2_id')
+        ],
+        dtype=np.intp
+    ).reshape(-1, 2)
+
+    if len(participant_ids) * runs > getattr(settings, 'PROJECTION_MAX_CELLS', 20_000_000):
+        raise ValidationError({'runs': "Too many runs for a competition of this size."})
+
+    # Large simulations are split over a process pool.
+    if runs * len(fixtures) >= getattr(settings, 'PROJECTION_PROCESS_POOL_THRESHOLD', 20_000_000):
+        final_ratings = simulation.simulate_parallel(ratings, fixtures, runs, seed, workers=os.cpu_count())
+    else:
+        final_ratings = simulation.simulate_final_ratings(ratings, fixtures, runs, seed)
+
+    summary = simulation.summarize(final_ratings) if participant_ids else {}
+    return {
+        'runs': runs,
+        'remaining_fixtures': len(fixtures),
+        'participants': sorted(
+            [
+                dict(
+                    {name: round(float(values[i]), 4) for name, values in summary.items()},
+                    participant=participant_id, elo_rating=ratings[i]
+                )
+                for i, participant_id in enumerate(participant_ids)
+            ],
+            key=lambda row: (row['rank_mean'], row['participant'])
+        ),
+    }
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Rating analytics",
+    description="Distribution of the participants' ratings (summary, histogram of `bucket` wide buckets and the lowest "
+                "rating of each top `tiers` percentage) and of the Elo changes of the last `weeks` weeks, per week. "
+                "Results are cached until the next match or participant change. "
+                "User must be the competition owner or a participant.",
+    parameters=[
+        OpenApiParameter('bucket', int, description="Width of the rating histogram buckets (default 50, 1 to 1000)."),
+        OpenApiParameter('tiers', str, description="Comma separated top percentages, default `1,5,10,25,50`."),
+        OpenApiParameter('weeks', int, description="Number of weeks of rating changes, this one included (default 12)."),
+    ],
+    responses={
+        200: OpenApiResponse(response=RatingAnalyticsSerializer, description="Analytics computed successfully"),
+        400: OpenApiResponse(description="Invalid parameters"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["statistics"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def get_analytics(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+
+    max_weeks = getattr(settings, 'ANALYTICS_MAX_WEEKS', 520)
+    try:
+        bucket = int(request.query_params.get('bucket', 50))
+        weeks = int(request.query_params.get('weeks', 12))
+        tiers = request.query_params.get('tiers')
+        tiers = [float(part) for part in tiers.split(',') if part.strip()] if tiers else list(analytics.DEFAULT_TIERS)
+    except ValueError:
+        raise ValidationError("bucket and weeks must be integers and tiers numbers.")
+    if not 1 <= bucket <= 1000:
+        raise ValidationError({'bucket': "bucket must be between 1 and 1000."})
+    if not 1 <= weeks <= max_weeks:
+        raise ValidationError({'weeks': f"weeks must be between 1 and {max_weeks}."})
+    if not 1 <= len(tiers) <= 20 or not all(0 < tier <= 100 for tier in tiers):
+        raise ValidationError({'tiers': "tiers must be 1 to 20 percentages above 0 and at most 100."})
+
+    def compute():
+        data = analytics.rating_distribution(competition_id, bucket, tiers)
+        data['weekly_changes'] = analytics.rating_changes_by_week(competition_id, weeks)
+        return data
+
+    # The first week is part of the key, so the weekly window moves on with the calendar.
+    data = cached_for_competition(
+        competition_id, 'analytics',
+        {'bucket': bucket, 'tiers': tiers, 'weeks': weeks, 'since': analytics.first_week(weeks)},
+        compute
+    )
+    return Response(RatingAnalyticsSerializer(data).data)
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Propose next round pairings",
+    description="Propose pairings for the next round: participants are paired with their closest rated opponent, "
+                "avoiding opponents met in the last `avoid_rounds` rounds. With an odd number of participants the lowest "
+                "rated one among those with the fewest byes so far gets a bye. User must be the competition owner or a participant.",
+    parameters=[PairingRequestSerializer],
+    responses={
+        200: OpenApiResponse(response=PairingRoundSerializer, description="Pairings proposed successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@extend_schema(
+    methods=["POST"],
+    summary="Create next round pairings",
+    description="Propose the next round's pairings and create them as `not_played` matches at `played_at` in one "
+                "transaction. Only the competition owner can create pairings.",
+    request=PairingRequestSerializer,
+    responses={
+        201: OpenApiResponse(response=PairingRoundSerializer, description="Pairings created successfully"),
+        400: OpenApiResponse(description="Invalid data provided"),
+        403: OpenApiResponse(description="Not authorized to create matches"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+@idempotent
+def list_create_pairings(request, competition_id):
+    competition = get_object_or_404(Competition, id=competition_id)
+
+    if request.method == 'GET':
+        if not is_participant_or_owner(request.user, competition_id):
+            raise PermissionDenied("You are not in this competition")
+        serializer = PairingRequestSerializer(data=request.query_params)
+    else:
+        if request.user != competition.created_by:
+            raise PermissionDenied("Only the owner of a competition can create matches")
+        serializer = PairingRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = Participant.objects.filter(competition=competition).values_list('id', 'elo_rating', 'byes')
+    ratings, byes = {}, {}
+    for participant_id, rating, count in rows:
+        ratings[participant_id], byes[participant_id] = rating, count
+    recent_window = serializer.validated_data['avoid_rounds'] * (len(ratings) // 2)
+    recent_pairs = {
+        frozenset(pair) for pair in
+        Match.objects.filter(competition=competition).order_by('-played_at', '-id')
+        .values_list('participant1_id', 'participant2_id')[:recent_window]
+    } if recent_window else set()
+
+    pairs, bye = propose_pairings(ratings.items(), recent_pairs, byes=byes)
+    pairings = [
+        {
+            'participant1': participant1,
+            'participant2': participant2,
+            'rating_gap': abs(ratings[participant1] - ratings[participant2]),
+            'rematch': frozenset((participant1, participant2)) in recent_pairs,
+        }
+        for participant1, participant2 in pairs
+    ]
+
+    if request.method == 'POST':
+        played_at = serializer.validated_data.get('played_at', timezone.now())
+        with transaction.atomic(using=router.db_for_write(Match)):
+            match_ids = create_fixtures(competition.id, [(participant1, participant2, played_at)
+                                                         for participant1, participant2 in pairs], return_ids=True)
+            if bye is not None:
+                Participant.objects.filter(pk=bye).update(byes=F('byes') + 1)
+        for pairing, match_id in zip(pairings, match_ids):
+            pairing['match'] = match_id
+
+    data = {
+        'pairings': pairings,
+        'bye': bye,
+        'total_gap': sum(pairing['rating_gap'] for pairing in pairings),
+    }
+    return Response(data, status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
+
+
+@extend_schema(
+    methods=["POST"],
+    summary="Generate round-robin schedule",
+    description="Create a (double) round-robin between all participants using the circle method. Round `n` is played "
+                "at `start + n * round_interval` and every fixture is created as a `not_played` match in a single "
+                "transaction. Only the competition owner can generate schedules.",
+    request=ScheduleRequestSerializer,
+    responses={
+        201: OpenApiResponse(response=ScheduleSerializer, description="Schedule created successfully"),
+        400: OpenApiResponse(description="Invalid data provided"),
+        403: OpenApiResponse(description="Not authorized to create matches"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["matches"]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def create_schedule(request, competition_id):
+    competition = get_object_or_404(Competition, id=competition_id)
+    if request.user != competition.created_by:
+        raise PermissionDenied("Only the owner of a competition can create matches")
+
+    serializer = ScheduleRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    start = serializer.validated_data.get('start', timezone.now())
+    interval = serializer.validated_data['round_interval']
+
+    participant_ids = Participant.objects.filter(competition=competition).order_by('id').values_list('id', flat=True)
+    rounds = round_robin(participant_ids, double=serializer.validated_data['double'])
+
+    fixtures = [
+        (participant1, participant2, start + round_number * interval)
+        for round_number, round_fixtures in enumerate(rounds)
+        for participant1, participant2 in round_fixtures
+    ]
+    create_fixtures(competition.id, fixtures)
+
+    data = {
+        'rounds': len(rounds),
+        'fixtures': len(fixtures),
+        'first_played_at': start if rounds else None,
+        'last_played_at': start + (len(rounds) - 1) * interval if rounds else None,
+    }
+    return Response(ScheduleSerializer(data).data, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Changes since a cursor",
+    description="Creates, updates and deletes of the competition's matches and participants (rating changes are "
+                "participant updates) after sequence number `since`, oldest first. Start with `since=0` and pass "
+                "the returned `cursor` next time; fetch again straight away while `has_more` is true. Fixtures "
+                "created in bulk (schedules, pairing rounds) are one `schedule` entry, re-fetch the matches between "
+                "its `first_played_at` and `last_played_at`. User must be the competition owner or a participant.",
+    parameters=[
+        OpenApiParameter('since', int, description="Cursor returned by the previous call (default 0)."),
+        OpenApiParameter('limit', int, description="Maximum number of changes (default 500, at most 5000)."),
+    ],
+    responses={
+        200: OpenApiResponse(response=ChangeFeedSerializer, description="Changes retrieved successfully"),
+        400: OpenApiResponse(description="Invalid cursor or limit"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["competitions"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(LIST_RENDERER_CLASSES)
+def get_changes(request, competition_id):
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+    try:
+        since = int(request.query_params.get('since', 0))
+        limit = int(request.query_params.get('limit', 500))
+    except ValueError:
+        raise ValidationError("since and limit must be integers.")
+    if since < 0 or not 1 <= limit <= 5000:
+        raise ValidationError("since can't be negative and limit must be between 1 and 5000.")
+
+    entries = list(
+        ChangeLogEntry.objects.filter(competition_id=competition_id, seq__gt=since).order_by('seq')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    data = {
+        'changes': entries,
+        'cursor': entries[-1].seq if entries else since,
+        'has_more': has_more,
+    }
+    return Response(ChangeFeedSerializer(data).data)
+
+
+@extend_schema(
+    methods=["GET"],
+    summary="Get points table",
+    description="Retrieve the points table of a competition, ordered by points and then by the competition's tiebreakers "
+                "(head_to_head, score_difference, score_for, wins). User must be the competition owner or a participant.",
+    responses={
+        200: OpenApiResponse(response=StandingSerializer(many=True), description="Standings retrieved successfully"),
+        403: OpenApiResponse(description="Not authorized to view this competition"),
+        404: OpenApiResponse(description="Competition not found")
+    },
+    tags=["participants", "statistics"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_standings(request, competition_id):
+    competition = get_object_or_404(Competition, id=competition_id)
+    if not is_participant_or_owner(request.user, competition_id):
+        raise PermissionDenied("You are not in this competition")
+
+    serializer = StandingSerializer(standings_table(competition), many=True)
+    return Response(serializer.data)
+
+
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
 
+def parse_id_list(value, name):
+    """Parse a comma separated query parameter of ids, None when it is absent."""
+    if value is None or value == '':
+        return None
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValidationError({name: "Expected a comma separated list of ids."})
+
+
+def parse_stats_filters(params):
+    """ParticipantStats lookups of the STATS_FILTERS query parameters that are present."""
+    filters = {}
+    for name, (lookup, convert) in STATS_FILTERS.items():
+        if params.get(name) is not None:
+            try:
+                filters[lookup] = convert(params[name])
+            except ValueError:
+                raise ValidationError({name: "Must be a number."})
+    return filters
+
+
+def parse_results(value):
+    """Parse `results=1-2-1,3-4-draw` into (participant1, participant2, winner) tuples."""
+    results = []
+    for part in (value or '').split(','):
+        if not part.strip():
+            continue
+        try:
+            participant1, participant2, winner = part.strip().split('-')
+            participant1, participant2 = int(participant1), int(participant2)
+        except ValueError:
+            raise ValidationError({'results': f"Invalid result '{part}', expected <participant1>-<participant2>-<winner>."})
+        if winner not in ("1", "2", "draw"):
+            raise ValidationError({'results': "winner should be one of 1, 2, draw"})
+        if participant1 == participant2:
+            raise ValidationError({'results': "Both participants must be different."})
+        results.append((participant1, participant2, winner))
+    return results
+
+
 def is_participant_or_owner(request_id, competition_id):
     is_participant = Participant.objects.filter(user=request_id, competition=competition_id).exists()
     competition = get_object_or_404(Competition, id=competition_id)
 
-    return is_participant or competition.created_by == request_id
+    return is_participant or competition.created_by_id == request_id.pk
 
 # match = Match.objects.all().filter(id=)
 # @api_view(['GET', 'POST'])